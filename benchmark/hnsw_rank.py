@@ -0,0 +1,104 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+Benchmark of recall vs speed of `HnswRanker` against exact `ImplicitRanker`.
+
+Factors are generated the same way as in `benchmark.quantized_rank`.
+Prints index build time and for every `efSearch` value ranking time and recall@k
+of recommendations relative to the exact ranker. Requires `nmslib`.
+
+Usage:
+    python -m benchmark.hnsw_rank --n-objects 1000000 --n-factors 128 --ef-search 50 100 400
+"""
+
+import argparse
+import time
+import typing as tp
+
+import numpy as np
+from scipy import sparse
+
+from benchmark.quantized_rank import calc_recall, make_factors
+from rectools.models.rank import Distance, ImplicitRanker
+from rectools.models.rank_hnsw import HnswRanker
+
+
+def run(
+    n_subjects: int,
+    n_objects: int,
+    n_factors: int,
+    k: int,
+    distance: Distance,
+    ef_search_values: tp.Sequence[int],
+    n_viewed: int,
+    seed: int,
+) -> None:
+    """Run benchmark and print results."""
+    rng = np.random.default_rng(seed)
+    basis = rng.normal(size=(max(n_factors // 8, 1), n_factors)).astype(np.float32)
+    subject_factors = make_factors(rng, n_subjects, n_factors, basis)
+    object_factors = make_factors(rng, n_objects, n_factors, basis)
+    subject_ids = np.arange(n_subjects)
+    viewed = sparse.random(n_subjects, n_objects, density=n_viewed / n_objects, format="csr", random_state=seed)
+    print(
+        f"{n_subjects} subjects, {n_objects} objects, {n_factors} factors, k={k}, {distance.name} distance, "
+        f"{n_viewed} viewed objects per subject"
+    )
+
+    start = time.perf_counter()
+    expected = ImplicitRanker(distance, subject_factors, object_factors).rank(subject_ids, k, viewed)
+    print(f"{'exact':>16}: {time.perf_counter() - start:8.3f} s, recall 1.0000")
+
+    ranker = HnswRanker(distance, subject_factors, object_factors)
+    start = time.perf_counter()
+    ranker._get_index()  # pylint: disable=protected-access
+    print(f"{'index build':>16}: {time.perf_counter() - start:8.3f} s")
+
+    for ef_search in ef_search_values:
+        ranker.index_query_time_params = {"efSearch": ef_search}
+        ranker._get_index().setQueryTimeParams(ranker.index_query_time_params)  # pylint: disable=protected-access
+        start = time.perf_counter()
+        actual = ranker.rank(subject_ids, k, viewed)
+        elapsed = time.perf_counter() - start
+        recall = calc_recall(expected, actual, k)  # type: ignore
+        print(f"{f'efSearch {ef_search}':>16}: {elapsed:8.3f} s, recall {recall:.4f}")
+
+
+def main() -> None:
+    """Parse arguments and run benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-subjects", type=int, default=1000, help="Number of subjects to rank for")
+    parser.add_argument("--n-objects", type=int, default=200_000, help="Number of objects")
+    parser.add_argument("--n-factors", type=int, default=64, help="Number of factors")
+    parser.add_argument("--k", type=int, default=10, help="Number of recommendations for every subject")
+    parser.add_argument("--distance", choices=[d.name for d in Distance], default=Distance.DOT.name)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[50, 100, 400], help="Values of efSearch")
+    parser.add_argument("--n-viewed", type=int, default=20, help="Average number of filtered objects per subject")
+    parser.add_argument("--seed", type=int, default=32)
+    args = parser.parse_args()
+    run(
+        args.n_subjects,
+        args.n_objects,
+        args.n_factors,
+        args.k,
+        Distance[args.distance],
+        args.ef_search,
+        args.n_viewed,
+        args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
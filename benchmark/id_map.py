@@ -0,0 +1,82 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+Benchmark of `IdMap` conversions latency.
+
+Measures time of a single `convert_to_internal` / `convert_to_external` call
+for batches of different sizes against a big id map.
+The first call (that builds lookup structures) is reported separately.
+
+Usage:
+    python -m benchmark.id_map --n-ids 50000000 --batch-sizes 10 1000 1000000
+"""
+
+import argparse
+import time
+import typing as tp
+
+import numpy as np
+
+from rectools.dataset import IdMap
+
+
+def _measure(func: tp.Callable[[], tp.Any], n_repeats: int) -> float:
+    timings = []
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def run(n_ids: int, batch_sizes: tp.Sequence[int], n_repeats: int, string_ids: bool, seed: int) -> None:
+    """Run benchmark and print results."""
+    rng = np.random.default_rng(seed)
+    external_ids = rng.permutation(n_ids * 2)[:n_ids]
+    if string_ids:
+        external_ids = external_ids.astype(str).astype("O")
+    id_map = IdMap(external_ids)
+    print(f"IdMap with {n_ids} {'string' if string_ids else 'integer'} ids")
+
+    start = time.perf_counter()
+    id_map.convert_to_internal(external_ids[:1])
+    print(f"First call (lookup building): {time.perf_counter() - start:.4f} s")
+
+    for batch_size in batch_sizes:
+        internal = rng.integers(0, n_ids, batch_size)
+        external = external_ids[internal]
+        to_internal_time = _measure(lambda: id_map.convert_to_internal(external), n_repeats)
+        to_external_time = _measure(lambda: id_map.convert_to_external(internal), n_repeats)
+        print(
+            f"Batch {batch_size:>10}: "
+            f"convert_to_internal {to_internal_time * 1000:10.3f} ms, "
+            f"convert_to_external {to_external_time * 1000:10.3f} ms"
+        )
+
+
+def main() -> None:
+    """Parse arguments and run benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-ids", type=int, default=50_000_000, help="Number of ids in map")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 1000, 1_000_000])
+    parser.add_argument("--n-repeats", type=int, default=5, help="Number of measurements per batch size")
+    parser.add_argument("--string-ids", action="store_true", help="Use string external ids instead of integers")
+    parser.add_argument("--seed", type=int, default=32)
+    args = parser.parse_args()
+    run(args.n_ids, args.batch_sizes, args.n_repeats, args.string_ids, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+Benchmark of recall vs memory of `QuantizedRanker` against exact `ImplicitRanker`.
+
+Factors are generated from a low rank model with noise, so that scores are not uniformly distributed.
+For every storage type and re-rank factor prints memory of prepared objects factors,
+ranking time and recall@k of recommendations relative to the exact ranker.
+
+Usage:
+    python -m benchmark.quantized_rank --n-objects 1000000 --n-factors 128 --rerank-factors 0 2 5
+"""
+
+import argparse
+import time
+import typing as tp
+
+import numpy as np
+
+from rectools.models.rank import Distance, ImplicitRanker
+from rectools.models.rank_quantized import QUANTIZATION_DTYPES, QuantizedRanker
+
+
+def make_factors(rng: np.random.Generator, n_rows: int, n_factors: int, basis: np.ndarray) -> np.ndarray:
+    """Generate factors from a low rank model with noise."""
+    weights = rng.normal(size=(n_rows, basis.shape[0])).astype(np.float32)
+    noise = rng.normal(scale=0.3, size=(n_rows, n_factors)).astype(np.float32)
+    return weights @ basis + noise
+
+
+def calc_recall(expected: tp.Tuple[np.ndarray, ...], actual: tp.Tuple[np.ndarray, ...], k: int) -> float:
+    """Return share of expected (subject, object) pairs found in actual recommendations."""
+    expected_pairs = expected[0].astype(np.int64) * (expected[1].max() + 1) + expected[1]
+    actual_pairs = actual[0].astype(np.int64) * (expected[1].max() + 1) + actual[1]
+    return np.isin(actual_pairs, expected_pairs).sum() / (k * np.unique(expected[0]).size)
+
+
+def run(
+    n_subjects: int,
+    n_objects: int,
+    n_factors: int,
+    k: int,
+    distance: Distance,
+    rerank_factors: tp.Sequence[int],
+    seed: int,
+) -> None:
+    """Run benchmark and print results."""
+    rng = np.random.default_rng(seed)
+    basis = rng.normal(size=(max(n_factors // 8, 1), n_factors)).astype(np.float32)
+    subject_factors = make_factors(rng, n_subjects, n_factors, basis)
+    object_factors = make_factors(rng, n_objects, n_factors, basis)
+    subject_ids = np.arange(n_subjects)
+    print(f"{n_subjects} subjects, {n_objects} objects, {n_factors} factors, k={k}, {distance.name} distance")
+
+    exact_ranker = ImplicitRanker(distance, subject_factors, object_factors)
+    start = time.perf_counter()
+    expected = exact_ranker.rank(subject_ids, k)
+    exact_time = time.perf_counter() - start
+    exact_factors, exact_norms = exact_ranker._prepare_objects(None)  # pylint: disable=protected-access
+    exact_nbytes = exact_factors.nbytes + (exact_norms.nbytes if exact_norms is not None else 0)
+    print(f"{'float32 exact':>24}: {exact_nbytes / 2**20:10.1f} MB, {exact_time:8.3f} s, recall 1.0000")
+
+    for dtype in QUANTIZATION_DTYPES:
+        for rerank_factor in rerank_factors:
+            ranker = QuantizedRanker(
+                distance, subject_factors, object_factors, dtype=dtype, rerank_factor=rerank_factor or None
+            )
+            nbytes = ranker.objects_nbytes  # objects are prepared here, not during ranking
+            start = time.perf_counter()
+            actual = ranker.rank(subject_ids, k)
+            elapsed = time.perf_counter() - start
+            recall = calc_recall(expected, actual, k)  # type: ignore
+            name = f"{dtype} rerank x{rerank_factor}" if rerank_factor else dtype
+            print(f"{name:>24}: {nbytes / 2**20:10.1f} MB, {elapsed:8.3f} s, recall {recall:.4f}")
+
+
+def main() -> None:
+    """Parse arguments and run benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-subjects", type=int, default=1000, help="Number of subjects to rank for")
+    parser.add_argument("--n-objects", type=int, default=200_000, help="Number of objects")
+    parser.add_argument("--n-factors", type=int, default=64, help="Number of factors")
+    parser.add_argument("--k", type=int, default=10, help="Number of recommendations for every subject")
+    parser.add_argument("--distance", choices=[d.name for d in Distance], default=Distance.DOT.name)
+    parser.add_argument(
+        "--rerank-factors", type=int, nargs="+", default=[0, 3], help="Re-rank factors, 0 means no re-ranking"
+    )
+    parser.add_argument("--seed", type=int, default=32)
+    args = parser.parse_args()
+    run(
+        args.n_subjects,
+        args.n_objects,
+        args.n_factors,
+        args.k,
+        Distance[args.distance],
+        args.rerank_factors,
+        args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,8 @@ models.
 Data Containers
 ---------------
 `dataset.IdMap` - Mapping between external and internal identifiers.
+`dataset.AppendableIdMap` - Mapping between external and internal identifiers optimized for adding new ids.
+`dataset.CompactStringIdMap` - Memory efficient mapping for string external identifiers.
 `dataset.DenseFeatures` - Container for dense features.
 `dataset.SparseFeatures` - Container for sparse features.
 `dataset.Interactions` - Container for interactions.
@@ -31,12 +33,15 @@ Data Containers
 """
 
 
+from .compact_identifiers import CompactStringIdMap
 from .dataset import Dataset
 from .features import DenseFeatures, Features, SparseFeatures
-from .identifiers import IdMap
+from .identifiers import AppendableIdMap, IdMap
 from .interactions import Interactions
 
 __all__ = (
+    "AppendableIdMap",
+    "CompactStringIdMap",
     "Dataset",
     "DenseFeatures",
     "SparseFeatures",
@@ -0,0 +1,417 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Compact mapping between string external ids and internal ids."""
+
+import typing as tp
+from pathlib import Path
+
+import attr
+import numpy as np
+import pandas as pd
+import typing_extensions as tpe
+
+from rectools import ExternalIds, InternalIds
+
+from .identifiers import IdMap
+
+PathLike = tp.Union[str, Path]
+
+
+class CompactStringIdMapFiles:
+    """Fixed file names for `CompactStringIdMap` saving and loading."""
+
+    Offsets = "offsets.npy"
+    Data = "data.npy"
+    SortedIds = "sorted_ids.npy"
+
+
+def _encode(values: np.ndarray) -> tp.Tuple[np.ndarray, np.ndarray]:
+    """Encode strings to UTF-8 and pack them to contiguous buffer. Return lengths and buffer."""
+    encoded = []
+    for value in values:
+        if not isinstance(value, str):
+            raise TypeError(f"Only string ids are supported, got {type(value)}")
+        encoded.append(value.encode("utf-8"))
+    lengths = np.fromiter((len(value) for value in encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return lengths, data
+
+
+def _to_fixed_width_bytes(values: np.ndarray) -> tp.Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert array of possible ids to fixed width bytes array.
+    Return array and mask of values that are strings (other values can't be present in the map).
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == "U":
+        is_str_mask = np.ones(values.size, dtype=bool)
+    elif values.dtype.kind == "O":
+        is_str_mask = np.fromiter((isinstance(value, str) for value in values), dtype=bool, count=values.size)
+    else:
+        is_str_mask = np.zeros(values.size, dtype=bool)
+
+    strings = values[is_str_mask].astype(str)
+    encoded = np.char.encode(strings, "utf-8") if strings.size > 0 else np.array([], dtype="S1")
+    fixed_width: np.ndarray = np.zeros(values.size, dtype=encoded.dtype)
+    fixed_width[is_str_mask] = encoded
+    return fixed_width, is_str_mask
+
+
+@attr.s(frozen=True, slots=True)
+class CompactStringIdMap:
+    """
+    Memory efficient mapping between string external object ids and internal object ids.
+
+    External ids are encoded to UTF-8 and stored in one contiguous bytes buffer with offsets
+    (like string arrays in Apache Arrow), so there are no python objects per id.
+    Lookup of external ids is done with vectorized binary search over ids sorted by their bytes.
+    All arrays can be saved to disk with `save` method and memory-mapped back with `load` method,
+    so several processes can share one map through the page cache.
+
+    Object has the same interface as `IdMap` and can be used instead of it.
+    Note that `external_ids`, `to_internal` and `to_external` materialize all ids as python objects,
+    use them only for small maps.
+
+    Usually you do not need to create this object directly, use `from_values` or `from_id_map` class methods instead.
+
+    Ids with trailing null characters are not supported.
+
+    Parameters
+    ----------
+    offsets : np.ndarray
+        Integer array with shape ``(n_objects + 1,)``.
+        Bytes of object with internal id ``i`` are ``data[offsets[i]:offsets[i + 1]]``.
+    data : np.ndarray
+        Array of ``uint8`` with UTF-8 encoded external ids.
+    sorted_ids : np.ndarray
+        Internal ids sorted by bytes of their external ids.
+    """
+
+    offsets: np.ndarray = attr.ib()
+    data: np.ndarray = attr.ib()
+    sorted_ids: np.ndarray = attr.ib()
+
+    @classmethod
+    def from_values(cls, values: ExternalIds) -> "CompactStringIdMap":
+        """
+        Create CompactStringIdMap from list of external ids (possibly not unique).
+
+        Parameters
+        ----------
+        values: iterable(str)
+            List of all external ids (may be not unique).
+
+        Returns
+        -------
+        CompactStringIdMap
+
+        Raises
+        ------
+        TypeError
+            If some of ids are not strings.
+        """
+        unq_values = pd.unique(np.asarray(values, dtype="O"))
+        lengths, data = _encode(unq_values)
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        sorted_ids = np.argsort(unq_values, kind="stable")
+        return cls(offsets, data, sorted_ids)
+
+    @classmethod
+    def from_id_map(cls, id_map: IdMap) -> "CompactStringIdMap":
+        """
+        Create CompactStringIdMap from `IdMap` with string external ids. Internal ids are kept.
+
+        Parameters
+        ----------
+        id_map : IdMap
+            Id map with string external ids.
+
+        Returns
+        -------
+        CompactStringIdMap
+        """
+        return cls.from_values(id_map.external_ids)
+
+    def to_id_map(self) -> IdMap:
+        """Convert to regular `IdMap` with the same mapping."""
+        return IdMap(self.external_ids)
+
+    @property
+    def size(self) -> int:
+        """Return number of ids in map."""
+        return self.offsets.size - 1
+
+    @property
+    def external_dtype(self) -> tp.Type:
+        """Return dtype of external ids."""
+        return np.dtype("O")  # type: ignore[return-value]
+
+    @property
+    def external_ids(self) -> np.ndarray:
+        """Array of external ids sorted by internal ids. Materializes all ids as python strings."""
+        return self.convert_to_external(self.internal_ids)
+
+    @property
+    def to_internal(self) -> pd.Series:
+        """Map external->internal. Materializes all ids as python strings."""
+        return pd.Series(self.internal_ids, index=self.external_ids)
+
+    @property
+    def to_external(self) -> pd.Series:
+        """Map internal->external. Materializes all ids as python strings."""
+        return pd.Series(self.external_ids, index=pd.RangeIndex(0, self.size))
+
+    @property
+    def internal_ids(self) -> np.ndarray:
+        """Array of internal ids."""
+        return np.arange(self.size)
+
+    def get_sorted_internal(self) -> np.ndarray:
+        """Return array of sorted internal ids."""
+        return self.internal_ids
+
+    def get_external_sorted_by_internal(self) -> np.ndarray:
+        """Return array of external ids sorted by internal ids."""
+        return self.external_ids
+
+    def _take_fixed_width_bytes(self, internal_ids: np.ndarray) -> np.ndarray:
+        """Return external ids for given internal ids as fixed width bytes array."""
+        starts = self.offsets[internal_ids]
+        lengths = self.offsets[internal_ids + 1] - starts
+        width = max(int(lengths.max()) if lengths.size > 0 else 0, 1)
+        positions = np.arange(width)
+        valid_mask = positions < lengths[:, np.newaxis]
+        chars = np.zeros((internal_ids.size, width), dtype=np.uint8)
+        chars[valid_mask] = self.data[(starts[:, np.newaxis] + positions)[valid_mask]]
+        return chars.view(f"S{width}").ravel()
+
+    def _search(self, values: np.ndarray) -> np.ndarray:
+        """Vectorized binary search. Return positions in `sorted_ids` where `values` should be inserted."""
+        low = np.zeros(values.size, dtype=np.int64)
+        high = np.full(values.size, self.size, dtype=np.int64)
+        active = np.flatnonzero(low < high)
+        while active.size > 0:
+            middle = (low[active] + high[active]) // 2
+            is_less = self._take_fixed_width_bytes(self.sorted_ids[middle]) < values[active]
+            low[active[is_less]] = middle[is_less] + 1
+            high[active[~is_less]] = middle[~is_less]
+            active = active[low[active] < high[active]]
+        return low
+
+    def _get_indexer(self, external: ExternalIds) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """Return internal ids for given external ids (``-1`` for absent ones) and external ids as array."""
+        external_ids = np.asarray(external)
+        values, is_str_mask = _to_fixed_width_bytes(external_ids)
+        internal_ids = np.full(values.size, -1, dtype=np.int64)
+        if self.size == 0:
+            return internal_ids, external_ids
+
+        positions = np.minimum(self._search(values), self.size - 1)
+        candidates = self.sorted_ids[positions]
+        found_mask = is_str_mask & (self._take_fixed_width_bytes(candidates) == values)
+        internal_ids[found_mask] = candidates[found_mask]
+        return internal_ids, external_ids
+
+    @tp.overload
+    def convert_to_internal(  # noqa: D102
+        self, external: ExternalIds, strict: bool = ..., return_missing: tpe.Literal[False] = False
+    ) -> np.ndarray:  # pragma: no cover
+        ...
+
+    @tp.overload
+    def convert_to_internal(  # noqa: D102
+        self, external: ExternalIds, strict: bool = ..., *, return_missing: tpe.Literal[True]
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:  # pragma: no cover
+        ...
+
+    def convert_to_internal(
+        self, external: ExternalIds, strict: bool = True, return_missing: bool = False
+    ) -> tp.Union[np.ndarray, tp.Tuple[np.ndarray, np.ndarray]]:
+        """
+        Convert any sequence of external ids to array of internal ids (map external -> internal).
+
+        See `IdMap.convert_to_internal` for details.
+
+        Parameters
+        ----------
+        external : sequence(str)
+            Sequence of external ids to convert.
+        strict : bool, default ``True``
+            Whether to raise `KeyError` if some of given external ids do not exist in mapping or skip them.
+        return_missing : bool, default ``False``
+            If True, return a tuple of 2 arrays: internal ids and missing ids (that are not in map).
+            Works only if `strict` is False.
+
+        Returns
+        -------
+        np.ndarray
+            Array of internal ids.
+        np.ndarray, np.ndarray
+            Tuple of 2 arrays: internal ids and missing ids.
+            Only if `strict` is False and `return_missing` is True.
+        """
+        if strict and return_missing:
+            raise ValueError("You can't use `strict` and `return_missing` together")
+
+        internal_ids, external_ids = self._get_indexer(external)
+        found_mask = internal_ids >= 0
+        if strict:
+            if not found_mask.all():
+                raise KeyError("Some indices do not exist")
+            return internal_ids
+
+        if return_missing:
+            return internal_ids[found_mask], external_ids[~found_mask]
+        return internal_ids[found_mask]
+
+    @tp.overload
+    def convert_to_external(  # noqa: D102
+        self, internal: InternalIds, strict: bool = ..., return_missing: tpe.Literal[False] = False
+    ) -> np.ndarray:  # pragma: no cover
+        ...
+
+    @tp.overload
+    def convert_to_external(  # noqa: D102
+        self, internal: InternalIds, strict: bool = ..., *, return_missing: tpe.Literal[True]
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:  # pragma: no cover
+        ...
+
+    def convert_to_external(
+        self, internal: InternalIds, strict: bool = True, return_missing: bool = False
+    ) -> tp.Union[np.ndarray, tp.Tuple[np.ndarray, np.ndarray]]:
+        """
+        Convert any sequence of internal ids to array of external ids (map internal -> external).
+
+        See `IdMap.convert_to_external` for details.
+
+        Parameters
+        ----------
+        internal : sequence(int)
+            Sequence of internal ids to convert.
+        strict : bool, default ``True``
+            Whether to raise `KeyError` if some of given internal ids do not exist in mapping or skip them.
+        return_missing : bool, default ``False``
+            If True, return a tuple of 2 arrays: external ids and missing ids (that are not in map).
+            Works only if `strict` is False.
+
+        Returns
+        -------
+        np.ndarray
+            Array of external ids.
+        np.ndarray, np.ndarray
+            Tuple of 2 arrays: external ids and missing ids.
+            Only if `strict` is False and `return_missing` is True.
+        """
+        if strict and return_missing:
+            raise ValueError("You can't use `strict` and `return_missing` together")
+
+        internal_ids = np.asarray(internal)
+        if internal_ids.size == 0:
+            internal_ids = internal_ids.astype(np.int64)
+        if not np.issubdtype(internal_ids.dtype, np.integer):
+            raise TypeError("Internal ids are always integer")
+
+        found_mask = (internal_ids >= 0) & (internal_ids < self.size)
+        if strict and not found_mask.all():
+            raise KeyError("Some indices do not exist")
+
+        external_ids = np.char.decode(self._take_fixed_width_bytes(internal_ids[found_mask]), "utf-8").astype("O")
+        if return_missing:
+            return external_ids, internal_ids[~found_mask]
+        return external_ids
+
+    def add_ids(self, values: ExternalIds, raise_if_already_present: bool = False) -> "CompactStringIdMap":
+        """
+        Add new external ids to current map and return new map.
+        Mapping for old ids does not change.
+        New ids are added to the end of list of external ids.
+
+        Parameters
+        ----------
+        values : iterable(str)
+            List of new external ids (may be not unique).
+        raise_if_already_present : bool, default ``False``
+            If True and some of given ids are already present in the map
+            ValueError will be raised.
+
+        Returns
+        -------
+        CompactStringIdMap
+
+        Raises
+        ------
+        ValueError
+            If some of given ids are already present in the map and `raise_if_already_present` flag is ``True``.
+        """
+        unq = pd.unique(np.asarray(values, dtype="O"))
+        new_ids = unq[self._get_indexer(unq)[0] < 0]
+        if raise_if_already_present and new_ids.size < unq.size:
+            raise ValueError("Some of new ids are already present in map")
+
+        lengths, new_data = _encode(new_ids)
+        offsets = np.concatenate((self.offsets, self.offsets[-1] + np.cumsum(lengths)))
+        data = np.concatenate((self.data, new_data))
+
+        new_sorter = np.argsort(new_ids, kind="stable")
+        insert_positions = self._search(_to_fixed_width_bytes(new_ids[new_sorter])[0])
+        sorted_ids = np.insert(self.sorted_ids, insert_positions, self.size + new_sorter)
+        return self.__class__(offsets, data, sorted_ids)
+
+    def save(self, folder_name: PathLike, overwrite: bool = False) -> None:
+        """
+        Save map arrays to folder as `.npy` files.
+
+        Parameters
+        ----------
+        folder_name : str | Path
+            Destination folder.
+        overwrite : bool, default ``False``
+            Allow to overwrite files in the folder if they already exist.
+        """
+        folder = Path(folder_name)
+        folder.mkdir(parents=True, exist_ok=True)
+        mode = "wb" if overwrite else "xb"
+        for file_name, values in (
+            (CompactStringIdMapFiles.Offsets, self.offsets),
+            (CompactStringIdMapFiles.Data, self.data),
+            (CompactStringIdMapFiles.SortedIds, self.sorted_ids),
+        ):
+            with open(folder / file_name, mode) as f:
+                np.save(f, values, allow_pickle=False)
+
+    @classmethod
+    def load(cls, folder_name: PathLike, mmap: bool = False) -> "CompactStringIdMap":
+        """
+        Load map saved earlier with `save` method.
+
+        Parameters
+        ----------
+        folder_name : str | Path
+            Folder where map was saved.
+        mmap : bool, default ``False``
+            Whether to memory-map arrays (read-only) instead of reading them into memory.
+            Memory-mapped arrays are shared between processes through the page cache.
+
+        Returns
+        -------
+        CompactStringIdMap
+        """
+        folder = Path(folder_name)
+        mmap_mode: tp.Optional[tpe.Literal["r"]] = "r" if mmap else None
+        return cls(
+            offsets=np.load(folder / CompactStringIdMapFiles.Offsets, mmap_mode=mmap_mode, allow_pickle=False),
+            data=np.load(folder / CompactStringIdMapFiles.Data, mmap_mode=mmap_mode, allow_pickle=False),
+            sorted_ids=np.load(folder / CompactStringIdMapFiles.SortedIds, mmap_mode=mmap_mode, allow_pickle=False),
+        )
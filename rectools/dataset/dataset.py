@@ -15,16 +15,61 @@
 """Dataset - all data container."""
 
 import typing as tp
+from pathlib import Path
 
 import attr
+import numpy as np
 import pandas as pd
 from scipy import sparse
 
 from rectools import Columns
 
+from .compact_identifiers import CompactStringIdMap, PathLike
 from .features import AbsentIdError, DenseFeatures, Features, SparseFeatures
-from .identifiers import IdMap
+from .identifiers import AppendableIdMap, IdMap
 from .interactions import Interactions
+from .storage import (
+    load_features,
+    load_id_map,
+    load_interactions,
+    load_meta,
+    save_features,
+    save_id_map,
+    save_interactions,
+    save_meta,
+)
+
+DATASET_FORMAT_VERSION = 1
+
+
+class DatasetFolders:
+    """Fixed names of subfolders for `Dataset` saving and loading."""
+
+    UserIdMap = "user_id_map"
+    ItemIdMap = "item_id_map"
+    Interactions = "interactions"
+    UserFeatures = "user_features"
+    ItemFeatures = "item_features"
+
+
+def _extend_id_map(id_map: tp.Optional[AppendableIdMap], values: np.ndarray) -> AppendableIdMap:
+    if id_map is None:
+        return AppendableIdMap(pd.unique(values))
+    return id_map.add_ids(values)
+
+
+def _write_to_columns(columns: tp.Dict[str, np.ndarray], df: pd.DataFrame, n_filled: int, n_total: int) -> int:
+    n_new = n_filled + len(df)
+    if n_new > n_total:
+        raise ValueError("Number of interactions in chunks is greater than `n_interactions`")
+    for col in df.columns:
+        values = df[col].values
+        if col not in columns:
+            columns[col] = np.empty(n_total, dtype=values.dtype)
+        elif not np.can_cast(values.dtype, columns[col].dtype):
+            columns[col] = columns[col].astype(np.result_type(columns[col].dtype, values.dtype))
+        columns[col][n_filled:n_new] = values
+    return n_new
 
 
 @attr.s(slots=True, frozen=True)
@@ -67,7 +112,7 @@ class Dataset:
         Users with internal ids from `n_hot_users` to `dataset.user_id_map.size - 1` are warm
         (they aren't present in interactions, but they have features).
         """
-        return self.interactions.df[Columns.User].max() + 1
+        return self.interactions.n_users
 
     @property
     def n_hot_items(self) -> int:
@@ -77,7 +122,7 @@ class Dataset:
         Items with internal ids from `n_hot_items` to `dataset.item_id_map.size - 1` are warm
         (they aren't present in interactions, but they have features).
         """
-        return self.interactions.df[Columns.Item].max() + 1
+        return self.interactions.n_items
 
     def get_hot_user_features(self) -> tp.Optional[Features]:
         """User features for hot users."""
@@ -101,6 +146,7 @@ class Dataset:
         item_features_df: tp.Optional[pd.DataFrame] = None,
         cat_item_features: tp.Iterable[str] = (),
         make_dense_item_features: bool = False,
+        compact_interactions: bool = False,
     ) -> "Dataset":
         """Class method for convenient `Dataset` creation.
 
@@ -132,6 +178,9 @@ class Dataset:
             Used only if `user_features_df` (`item_features_df`) is not ``None``.
             - if ``False``, `SparseFeatures.from_flatten` method will be used;
             - if ``True``,  `DenseFeatures.from_dataframe` method will be used.
+        compact_interactions : bool, default ``False``
+            Whether to store interactions in compact layout to reduce memory usage.
+            See `Interactions` description for details.
 
         Returns
         -------
@@ -143,8 +192,197 @@ class Dataset:
                 raise KeyError(f"Column '{col}' must be present in `interactions_df`")
         user_id_map = IdMap.from_values(interactions_df[Columns.User].values)
         item_id_map = IdMap.from_values(interactions_df[Columns.Item].values)
-        interactions = Interactions.from_raw(interactions_df, user_id_map, item_id_map)
+        interactions = Interactions.from_raw(interactions_df, user_id_map, item_id_map, compact_interactions)
+        return cls._construct_with_features(
+            user_id_map,
+            item_id_map,
+            interactions,
+            user_features_df,
+            cat_user_features,
+            make_dense_user_features,
+            item_features_df,
+            cat_item_features,
+            make_dense_item_features,
+        )
+
+    @classmethod
+    def construct_from_chunks(
+        cls,
+        interactions_chunks: tp.Iterable[pd.DataFrame],
+        n_interactions: tp.Optional[int] = None,
+        user_features_df: tp.Optional[pd.DataFrame] = None,
+        cat_user_features: tp.Iterable[str] = (),
+        make_dense_user_features: bool = False,
+        item_features_df: tp.Optional[pd.DataFrame] = None,
+        cat_item_features: tp.Iterable[str] = (),
+        make_dense_item_features: bool = False,
+        compact_interactions: bool = False,
+    ) -> "Dataset":
+        """Class method for `Dataset` creation from raw interactions split into chunks.
+
+        Works the same way as `construct`, but doesn't need all raw interactions in memory at once.
+        Id maps are extended with every chunk and ids of every chunk are converted to internal ones right away,
+        so raw external ids are kept in memory only for one chunk.
+        If `n_interactions` is given, converted chunks are written straight into preallocated arrays,
+        otherwise they are concatenated in the end.
+
+        Parameters
+        ----------
+        interactions_chunks : iterable(pd.DataFrame)
+            Chunks of interactions table. Every chunk has the same structure as `interactions_df`
+            in `construct` method, all columns are required.
+        n_interactions : int, optional
+            Total number of interactions in all chunks. Pass it to avoid additional copying of interactions.
+        user_features_df, item_features_df, cat_user_features, cat_item_features, \
+        make_dense_user_features, make_dense_item_features, compact_interactions
+            Same as in `construct` method.
+
+        Returns
+        -------
+        Dataset
+            Container with all input data, converted to `rectools` structures.
+
+        Raises
+        ------
+        ValueError
+            If there are no interactions in chunks or their number differs from `n_interactions`.
+        """
+        user_id_map, item_id_map, interactions = cls._make_interactions_from_chunks(
+            interactions_chunks, n_interactions, compact_interactions
+        )
+        return cls._construct_with_features(
+            user_id_map,
+            item_id_map,
+            interactions,
+            user_features_df,
+            cat_user_features,
+            make_dense_user_features,
+            item_features_df,
+            cat_item_features,
+            make_dense_item_features,
+        )
+
+    @classmethod
+    def construct_from_parquet(
+        cls,
+        path: str,
+        batch_size: int = 1_000_000,
+        user_features_df: tp.Optional[pd.DataFrame] = None,
+        cat_user_features: tp.Iterable[str] = (),
+        make_dense_user_features: bool = False,
+        item_features_df: tp.Optional[pd.DataFrame] = None,
+        cat_item_features: tp.Iterable[str] = (),
+        make_dense_item_features: bool = False,
+        compact_interactions: bool = False,
+    ) -> "Dataset":
+        """Class method for `Dataset` creation from interactions stored in Parquet file.
+
+        File is read by batches with `pyarrow` (it must be installed), see `construct_from_chunks` for details.
+
+        Parameters
+        ----------
+        path : str
+            Path to Parquet file with interactions.
+            It must contain `Columns.User`, `Columns.Item`, `Columns.Weight` and `Columns.Datetime` columns,
+            other columns are not read.
+        batch_size : int, default 1_000_000
+            Maximum number of rows in one batch.
+        user_features_df, item_features_df, cat_user_features, cat_item_features, \
+        make_dense_user_features, make_dense_item_features, compact_interactions
+            Same as in `construct` method.
+
+        Returns
+        -------
+        Dataset
+            Container with all input data, converted to `rectools` structures.
+        """
+        from pyarrow import parquet  # pylint: disable=import-outside-toplevel
+
+        parquet_file = parquet.ParquetFile(path)
+        chunks = (
+            batch.to_pandas()
+            for batch in parquet_file.iter_batches(batch_size=batch_size, columns=Columns.Interactions)
+        )
+        return cls.construct_from_chunks(
+            chunks,
+            parquet_file.metadata.num_rows,
+            user_features_df,
+            cat_user_features,
+            make_dense_user_features,
+            item_features_df,
+            cat_item_features,
+            make_dense_item_features,
+            compact_interactions,
+        )
+
+    @staticmethod
+    def _make_interactions_from_chunks(
+        chunks: tp.Iterable[pd.DataFrame],
+        n_interactions: tp.Optional[int],
+        compact: bool,
+    ) -> tp.Tuple[IdMap, IdMap, Interactions]:
+        # pylint: disable=protected-access
+        user_id_map: tp.Optional[AppendableIdMap] = None
+        item_id_map: tp.Optional[AppendableIdMap] = None
+        converted_chunks: tp.List[pd.DataFrame] = []
+        columns: tp.Dict[str, np.ndarray] = {}
+        n_filled = 0
+        for chunk in chunks:
+            Interactions._check_columns_present(chunk)
+            if len(chunk) == 0:
+                continue
+
+            users = chunk[Columns.User].values
+            items = chunk[Columns.Item].values
+            user_id_map = _extend_id_map(user_id_map, users)
+            item_id_map = _extend_id_map(item_id_map, items)
+            converted = pd.DataFrame(
+                {
+                    Columns.User: user_id_map.convert_to_internal(users),
+                    Columns.Item: item_id_map.convert_to_internal(items),
+                    Columns.Weight: chunk[Columns.Weight].values,
+                    Columns.Datetime: chunk[Columns.Datetime].values,
+                }
+            )
+            if compact:
+                Interactions._convert_ids_types(converted)
+            Interactions._convert_weight_and_datetime_types(converted, compact)
 
+            if n_interactions is None:
+                converted_chunks.append(converted)
+                continue
+
+            n_filled = _write_to_columns(columns, converted, n_filled, n_interactions)
+
+        if user_id_map is None or item_id_map is None:
+            raise ValueError("There are no interactions in chunks")
+
+        if n_interactions is None:
+            df = pd.concat(converted_chunks, ignore_index=True)
+        elif n_filled < n_interactions:
+            raise ValueError("Number of interactions in chunks is less than `n_interactions`")
+        else:
+            df = pd.DataFrame(columns, copy=False)
+        del converted_chunks, columns
+
+        # Copy external ids to release spare capacity of appendable maps
+        user_id_map_final = IdMap(user_id_map.external_ids.copy())
+        item_id_map_final = IdMap(item_id_map.external_ids.copy())
+        return user_id_map_final, item_id_map_final, Interactions(df, compact)
+
+    @classmethod
+    def _construct_with_features(
+        cls,
+        user_id_map: IdMap,
+        item_id_map: IdMap,
+        interactions: Interactions,
+        user_features_df: tp.Optional[pd.DataFrame],
+        cat_user_features: tp.Iterable[str],
+        make_dense_user_features: bool,
+        item_features_df: tp.Optional[pd.DataFrame],
+        cat_item_features: tp.Iterable[str],
+        make_dense_item_features: bool,
+    ) -> "Dataset":
         user_features, user_id_map = cls._make_features(
             user_features_df,
             cat_user_features,
@@ -216,13 +454,70 @@ class Dataset:
         Returns
         -------
         csr_matrix
-            Resized user-item CSR matrix
+            Resized user-item CSR matrix.
+            It's cached inside `interactions` and shares arrays with cached matrix when `include_warm` is ``True``,
+            so don't modify it in place.
         """
         matrix = self.interactions.get_user_item_matrix(include_weights)
         if include_warm:
-            matrix.resize(self.user_id_map.size, self.item_id_map.size)
+            n_users, n_items = self.user_id_map.size, self.item_id_map.size
+            indptr = np.concatenate((matrix.indptr, np.full(n_users - matrix.shape[0], matrix.indptr[-1])))
+            matrix = sparse.csr_matrix((matrix.data, matrix.indices, indptr), shape=(n_users, n_items))
         return matrix
 
+    def append_interactions(self, interactions_df: pd.DataFrame) -> "Dataset":
+        """
+        Return new dataset with given interactions added.
+
+        New external ids are added to the end of id maps, ids of existing users and items don't change.
+        Cost is proportional to the number of new interactions (amortized, see `Interactions.append`):
+        current dataset is not changed and shares id maps and interactions buffers with the new one.
+        Id maps are converted to `AppendableIdMap` (except `CompactStringIdMap`) to make next appends cheap.
+
+        Note that if there are warm users (items) in dataset, they get into the range of hot ones
+        when new users (items) are added, so they become hot without interactions.
+
+        Parameters
+        ----------
+        interactions_df : pd.DataFrame
+            New interactions with external ids. Table has the same structure as `interactions_df` in `construct`.
+
+        Returns
+        -------
+        Dataset
+
+        Raises
+        ------
+        ValueError
+            If there are new users (items) in interactions and dataset has user (item) features.
+        """
+        Interactions._check_columns_present(interactions_df)  # pylint: disable=protected-access
+        user_id_map = self._extend_id_map(self.user_id_map, interactions_df[Columns.User].values, self.user_features)
+        item_id_map = self._extend_id_map(self.item_id_map, interactions_df[Columns.Item].values, self.item_features)
+        new_interactions_df = pd.DataFrame(
+            {
+                Columns.User: user_id_map.convert_to_internal(interactions_df[Columns.User].values),
+                Columns.Item: item_id_map.convert_to_internal(interactions_df[Columns.Item].values),
+                Columns.Weight: interactions_df[Columns.Weight].values,
+                Columns.Datetime: interactions_df[Columns.Datetime].values,
+            }
+        )
+        interactions = self.interactions.append(new_interactions_df)
+        return self.__class__(user_id_map, item_id_map, interactions, self.user_features, self.item_features)
+
+    @staticmethod
+    def _extend_id_map(id_map: IdMap, values: np.ndarray, features: tp.Optional[Features]) -> IdMap:
+        if not isinstance(id_map, (AppendableIdMap, CompactStringIdMap)):
+            id_map = AppendableIdMap(id_map.external_ids)
+        extended_id_map = id_map.add_ids(values, raise_if_already_present=False)
+        if features is not None and extended_id_map.size > id_map.size:
+            raise ValueError("New ids can't be added to dataset with features for them")
+        return extended_id_map
+
+    def release_cached_matrices(self) -> None:
+        """Remove all cached interactions matrices to free memory. They will be built again on demand."""
+        self.interactions.release_cached_matrices()
+
     def get_raw_interactions(self, include_weight: bool = True, include_datetime: bool = True) -> pd.DataFrame:
         """
         Return iteractions as a `pd.DataFrame` object with replacing internal user and item ids to external ones.
@@ -239,3 +534,79 @@ class Dataset:
         pd.DataFrame
         """
         return self.interactions.to_external(self.user_id_map, self.item_id_map, include_weight, include_datetime)
+
+    def save(self, folder_name: PathLike, overwrite: bool = False) -> None:
+        """
+        Save dataset to folder as a set of raw `.npy` files.
+
+        Id maps, interactions columns and features arrays (CSR ``indptr``, ``indices`` and ``data`` for sparse ones)
+        are saved to separate files, so they can be memory-mapped on loading with `load` method.
+
+        Parameters
+        ----------
+        folder_name : str | Path
+            Destination folder.
+        overwrite : bool, default ``False``
+            Allow to overwrite files in the folder if they already exist.
+        """
+        folder = Path(folder_name)
+        save_id_map(self.user_id_map, folder / DatasetFolders.UserIdMap, overwrite)
+        save_id_map(self.item_id_map, folder / DatasetFolders.ItemIdMap, overwrite)
+        save_interactions(self.interactions, folder / DatasetFolders.Interactions, overwrite)
+        for features, features_folder in (
+            (self.user_features, DatasetFolders.UserFeatures),
+            (self.item_features, DatasetFolders.ItemFeatures),
+        ):
+            if features is not None:
+                save_features(features, folder / features_folder, overwrite)
+        meta = {
+            "format_version": DATASET_FORMAT_VERSION,
+            "has_user_features": self.user_features is not None,
+            "has_item_features": self.item_features is not None,
+        }
+        save_meta(folder, meta, overwrite)
+
+    @classmethod
+    def load(cls, folder_name: PathLike, mmap: bool = False) -> "Dataset":
+        """
+        Load dataset saved earlier with `save` method.
+
+        Loading doesn't rebuild or validate anything: arrays are read as is (or memory-mapped)
+        and statistics of interactions are taken from saved metadata.
+        Folder content is partially pickled, so load only datasets from trusted sources.
+
+        Parameters
+        ----------
+        folder_name : str | Path
+            Folder where dataset was saved.
+        mmap : bool, default ``False``
+            Whether to memory-map arrays (read-only) instead of reading them into memory.
+            Memory-mapped arrays are shared between processes through the page cache
+            and are loaded lazily, so loading takes almost no time.
+            String external ids of `IdMap` are always read into memory.
+
+        Returns
+        -------
+        Dataset
+
+        Raises
+        ------
+        ValueError
+            If dataset was saved in unsupported format.
+        """
+        folder = Path(folder_name)
+        meta = load_meta(folder)
+        if meta["format_version"] != DATASET_FORMAT_VERSION:
+            raise ValueError(f"Unsupported dataset format version: {meta['format_version']}")
+
+        return cls(
+            user_id_map=load_id_map(folder / DatasetFolders.UserIdMap, mmap),  # type: ignore[arg-type]
+            item_id_map=load_id_map(folder / DatasetFolders.ItemIdMap, mmap),  # type: ignore[arg-type]
+            interactions=load_interactions(folder / DatasetFolders.Interactions, mmap),
+            user_features=(
+                load_features(folder / DatasetFolders.UserFeatures, mmap) if meta["has_user_features"] else None
+            ),
+            item_features=(
+                load_features(folder / DatasetFolders.ItemFeatures, mmap) if meta["has_item_features"] else None
+            ),
+        )
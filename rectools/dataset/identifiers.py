@@ -25,6 +25,90 @@ import typing_extensions as tpe
 from rectools import ExternalId, ExternalIds, InternalId, InternalIds
 from rectools.utils import fast_isin, get_from_series_by_index
 
+MAX_DENSE_LOOKUP_RANGE_TO_SIZE_RATIO = 4
+
+IdMapT = tp.TypeVar("IdMapT", bound="IdMap")
+
+
+class _DenseIntLookup:
+    """
+    Direct-address table for integer external ids with bounded range.
+
+    Table position ``external_id - min_id`` contains internal id or ``-1`` if there is no such external id.
+    """
+
+    __slots__ = ("min_id", "max_id", "table")
+
+    def __init__(self, external_ids: np.ndarray) -> None:
+        self.min_id = external_ids.min()
+        self.max_id = external_ids.max()
+        n_positions = int(self.max_id) - int(self.min_id) + 1
+        self.table: np.ndarray = np.full(n_positions, -1, dtype=np.int64)
+        self.table[external_ids - self.min_id] = np.arange(external_ids.size)
+
+    def get_indexer(self, values: np.ndarray) -> np.ndarray:
+        """Return internal ids for given external ids, ``-1`` for absent ones."""
+        in_range_mask = (values >= self.min_id) & (values <= self.max_id)
+        if in_range_mask.all():
+            return self.table[values - self.min_id]
+        indexer: np.ndarray = np.full(values.size, -1, dtype=np.int64)
+        indexer[in_range_mask] = self.table[values[in_range_mask] - self.min_id]
+        return indexer
+
+
+class _SortedIntLookup:
+    """Sorted integer external ids with `searchsorted` lookup, suitable for sparse ranges of ids."""
+
+    __slots__ = ("sorted_ids", "sorter")
+
+    def __init__(self, external_ids: np.ndarray) -> None:
+        self.sorter = np.argsort(external_ids, kind="stable")
+        self.sorted_ids = external_ids[self.sorter]
+
+    def get_indexer(self, values: np.ndarray) -> np.ndarray:
+        """Return internal ids for given external ids, ``-1`` for absent ones."""
+        positions = np.searchsorted(self.sorted_ids, values)
+        positions = np.minimum(positions, self.sorted_ids.size - 1)
+        found_mask = self.sorted_ids[positions] == values
+        return np.where(found_mask, self.sorter[positions], -1)
+
+
+IntLookup = tp.Union[_DenseIntLookup, _SortedIntLookup]
+
+
+def _get_wide_int_dtype(dtype: np.dtype) -> np.dtype:
+    """Return 64-bit integer dtype of the same signedness, ids are shifted in it without overflow."""
+    return np.dtype(np.uint64) if np.issubdtype(dtype, np.unsignedinteger) else np.dtype(np.int64)
+
+
+def _make_int_lookup(external_ids: np.ndarray) -> tp.Optional[IntLookup]:
+    if external_ids.size == 0 or not np.issubdtype(external_ids.dtype, np.integer):
+        return None
+    external_ids = external_ids.astype(_get_wide_int_dtype(external_ids.dtype), copy=False)
+    n_positions = int(external_ids.max()) - int(external_ids.min()) + 1
+    if n_positions <= MAX_DENSE_LOOKUP_RANGE_TO_SIZE_RATIO * external_ids.size:
+        return _DenseIntLookup(external_ids)
+    return _SortedIntLookup(external_ids)
+
+
+class _IdMapLookup:
+    """
+    Holder for lookup structures that are built lazily and reused by `IdMap` conversions.
+
+    It's mutable, so it can be filled in after a frozen `IdMap` is created.
+    Lookup structures are not pickled, they are rebuilt on demand after unpickling.
+    """
+
+    __slots__ = ("index", "int_lookup", "int_lookup_built")
+
+    def __init__(self) -> None:
+        self.index: tp.Optional[pd.Index] = None
+        self.int_lookup: tp.Optional[IntLookup] = None
+        self.int_lookup_built = False
+
+    def __reduce__(self) -> tp.Tuple[tp.Type["_IdMapLookup"], tp.Tuple[()]]:
+        return self.__class__, ()
+
 
 @attr.s(frozen=True, slots=True)
 class IdMap:
@@ -43,9 +127,10 @@ class IdMap:
     """
 
     external_ids: np.ndarray = attr.ib()
+    _lookup: _IdMapLookup = attr.ib(init=False, factory=_IdMapLookup, repr=False, eq=False)
 
     @classmethod
-    def from_values(cls, values: ExternalIds) -> "IdMap":
+    def from_values(cls: tp.Type[IdMapT], values: ExternalIds) -> IdMapT:
         """
         Create IdMap from list of external ids (possibly not unique).
 
@@ -103,10 +188,26 @@ class IdMap:
         """Return dtype of external ids."""
         return self.external_ids.dtype
 
+    def _get_external_index(self) -> pd.Index:
+        """Return index of external ids. It's built on first access and reused afterwards with its hash table."""
+        if self._lookup.index is None:
+            self._lookup.index = pd.Index(self.external_ids)
+        return self._lookup.index
+
+    def _get_int_lookup(self) -> tp.Optional[IntLookup]:
+        """
+        Return array-based lookup if external ids are integers, ``None`` otherwise.
+        Direct-address table is used for bounded range of ids, sorted array is used for sparse ranges.
+        """
+        if not self._lookup.int_lookup_built:
+            self._lookup.int_lookup = _make_int_lookup(self.external_ids)
+            self._lookup.int_lookup_built = True
+        return self._lookup.int_lookup
+
     @property
     def to_internal(self) -> pd.Series:
-        """Map internal->external."""
-        return pd.Series(np.arange(self.size), index=self.external_ids)
+        """Map external->internal."""
+        return pd.Series(np.arange(self.size), index=self._get_external_index())
 
     @property
     def to_external(self) -> pd.Series:
@@ -171,8 +272,37 @@ class IdMap:
         ValueError
             If `strict` and `return_missing` are both ``True``.
         """
-        result = get_from_series_by_index(self.to_internal, external, strict, return_missing)
-        return result
+        if strict and return_missing:
+            raise ValueError("You can't use `strict` and `return_missing` together")
+
+        internal_ids, external_ids = self._get_indexer(external)
+        found_mask = internal_ids >= 0
+        if strict:
+            if not found_mask.all():
+                raise KeyError("Some indices do not exist")
+            return internal_ids
+
+        if return_missing:
+            return internal_ids[found_mask], external_ids[~found_mask]
+        return internal_ids[found_mask]
+
+    def _get_indexer(self, external: ExternalIds) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """Return internal ids for given external ids (``-1`` for absent ones) and external ids as array."""
+        int_lookup = self._get_int_lookup()
+        int_external_ids = self._prepare_for_int_lookup(external) if int_lookup is not None else None
+        if int_lookup is not None and int_external_ids is not None:
+            return int_lookup.get_indexer(int_external_ids), int_external_ids
+
+        external_ids = pd.Index(external).values
+        return self._get_external_index().get_indexer(external_ids), external_ids
+
+    def _prepare_for_int_lookup(self, external: ExternalIds) -> tp.Optional[np.ndarray]:
+        """Return ids as integer array if they can be looked up without pandas, ``None`` otherwise."""
+        dtype = self.external_ids.dtype
+        external_ids = np.asarray(external)
+        if not np.issubdtype(external_ids.dtype, np.integer) or not np.can_cast(external_ids.dtype, dtype):
+            return None
+        return external_ids.astype(_get_wide_int_dtype(dtype), copy=False)
 
     @tp.overload
     def convert_to_external(  # noqa: D102
@@ -219,8 +349,22 @@ class IdMap:
         ValueError
             If `strict` and `return_missing` are both ``True``.
         """
-        result = get_from_series_by_index(self.to_external, internal, strict, return_missing)
-        return result
+        internal_ids = np.asarray(internal)
+        if not np.issubdtype(internal_ids.dtype, np.integer):
+            return get_from_series_by_index(self.to_external, internal, strict, return_missing)
+
+        if strict and return_missing:
+            raise ValueError("You can't use `strict` and `return_missing` together")
+
+        found_mask = (internal_ids >= 0) & (internal_ids < self.size)
+        if strict:
+            if not found_mask.all():
+                raise KeyError("Some indices do not exist")
+            return self.external_ids[internal_ids]
+
+        if return_missing:
+            return self.external_ids[internal_ids[found_mask]], internal_ids[~found_mask]
+        return self.external_ids[internal_ids[found_mask]]
 
     def add_ids(self, values: ExternalIds, raise_if_already_present: bool = False) -> "IdMap":
         """
@@ -251,3 +395,131 @@ class IdMap:
             raise ValueError("Some of new ids are already present in map")
         full_external_ids = np.concatenate((self.external_ids, new_ids))
         return self.__class__(full_external_ids)
+
+
+class _GrowableBuffer:
+    """Array with spare capacity. It's shared by `AppendableIdMap` objects created one from another."""
+
+    __slots__ = ("values", "n_used")
+
+    def __init__(self, values: np.ndarray, n_used: int) -> None:
+        self.values = values
+        self.n_used = n_used
+
+
+class _AppendableIdMapState:
+    """
+    Buffer and lookup segments of `AppendableIdMap`.
+
+    Each segment is a pair of the first internal id in segment and `IdMap` for segment external ids.
+    State is not pickled, it's initialized again on demand after unpickling.
+    """
+
+    __slots__ = ("buffer", "segments")
+
+    def __init__(self) -> None:
+        self.buffer: tp.Optional[_GrowableBuffer] = None
+        self.segments: tp.Tuple[tp.Tuple[int, IdMap], ...] = ()
+
+    def __reduce__(self) -> tp.Tuple[tp.Type["_AppendableIdMapState"], tp.Tuple[()]]:
+        return self.__class__, ()
+
+
+APPENDABLE_ID_MAP_GROWTH_FACTOR = 1.5
+
+
+@attr.s(frozen=True, slots=True)
+class AppendableIdMap(IdMap):
+    """
+    Mapping between external and internal object ids optimized for frequent adding of new ids.
+
+    Cost of `add_ids` is proportional to the number of given ids, not to the number of ids in map:
+        - external ids are kept in a buffer with spare capacity that grows geometrically,
+          so new ids are usually written to the end of the buffer without copying old ones;
+        - lookup of external ids is split into segments, only segment with new ids is built on adding,
+          small segments are merged from time to time, so the number of segments stays logarithmic.
+
+    Maps created with `add_ids` share the buffer with the original map.
+    It's safe since every map uses only its own part of the buffer.
+    If ids are added to a map which buffer was already extended by another map, buffer is copied.
+
+    Usually you do not need to create this object directly, use `from_values` class method instead.
+
+    Parameters
+    ----------
+    external_ids: np.ndarray
+        Array of *unique* external ids.
+    """
+
+    _state: _AppendableIdMapState = attr.ib(init=False, factory=_AppendableIdMapState, repr=False, eq=False)
+
+    def _get_state(self) -> _AppendableIdMapState:
+        if self._state.buffer is None:
+            self._state.buffer = _GrowableBuffer(self.external_ids, self.size)
+            self._state.segments = ((0, IdMap(self.external_ids)),)
+        return self._state
+
+    def _get_indexer(self, external: ExternalIds) -> tp.Tuple[np.ndarray, np.ndarray]:
+        segments = self._get_state().segments
+        internal_ids, external_ids = segments[0][1]._get_indexer(external)  # pylint: disable=protected-access
+        for start, segment in segments[1:]:
+            missing_positions = np.flatnonzero(internal_ids < 0)
+            if missing_positions.size == 0:
+                break
+            segment_ids, _ = segment._get_indexer(external_ids[missing_positions])  # pylint: disable=protected-access
+            found_mask = segment_ids >= 0
+            internal_ids[missing_positions[found_mask]] = segment_ids[found_mask] + start
+        return internal_ids, external_ids
+
+    def add_ids(self, values: ExternalIds, raise_if_already_present: bool = False) -> "AppendableIdMap":
+        """
+        Add new external ids to current map and return new map.
+        Mapping for old ids does not change.
+        New ids are added to the end of list of external ids.
+
+        Parameters
+        ----------
+        values : iterable(hashable)
+            List of new external ids (may be not unique).
+        raise_if_already_present : bool, default ``False``
+            If True and some of given ids are already present in the map
+            ValueError will be raised.
+
+        Returns
+        -------
+        AppendableIdMap
+
+        Raises
+        ------
+        ValueError
+            If some of given ids are already present in the map and `raise_if_already_present` flag is ``True``.
+        """
+        unq = pd.unique(values)
+        new_ids = unq[self._get_indexer(unq)[0] < 0]
+        if raise_if_already_present and new_ids.size < unq.size:
+            raise ValueError("Some of new ids are already present in map")
+
+        state = self._get_state()
+        buffer = state.buffer
+        size = self.size
+        new_size = size + new_ids.size
+        dtype = np.result_type(self.external_ids.dtype, new_ids.dtype)
+        if buffer is None or buffer.n_used != size or buffer.values.size < new_size or buffer.values.dtype != dtype:
+            capacity = max(new_size, int(new_size * APPENDABLE_ID_MAP_GROWTH_FACTOR))
+            buffer_values = np.empty(capacity, dtype=dtype)
+            buffer_values[:size] = self.external_ids
+            buffer = _GrowableBuffer(buffer_values, size)
+        buffer.values[size:new_size] = new_ids
+        buffer.n_used = new_size
+
+        segments = list(state.segments)
+        if new_ids.size > 0:
+            segments.append((size, IdMap(buffer.values[size:new_size])))
+        while len(segments) > 1 and segments[-2][1].size <= segments[-1][1].size:
+            start = segments[-2][0]
+            segments[-2:] = [(start, IdMap(buffer.values[start:new_size]))]
+
+        id_map = self.__class__(buffer.values[:new_size])
+        id_map._state.buffer = buffer  # pylint: disable=protected-access
+        id_map._state.segments = tuple(segments)  # pylint: disable=protected-access
+        return id_map
@@ -14,6 +14,9 @@
 
 """Structure for saving user-item interactions."""
 
+import typing as tp
+from datetime import datetime
+
 import attr
 import numpy as np
 import pandas as pd
@@ -23,6 +26,52 @@ from rectools import Columns
 
 from .identifiers import IdMap
 
+INTERACTIONS_BUFFER_GROWTH_FACTOR = 1.5
+
+# Statistics that are computed when interactions are created
+PRECOMPUTED_STATS = ("n_users", "n_items", "time_range")
+
+
+def _resize_csr(matrix: sparse.csr_matrix, n_rows: int, n_cols: int) -> sparse.csr_matrix:
+    """Add empty rows and columns to the end of CSR matrix without copying its data."""
+    indptr = np.concatenate((matrix.indptr, np.full(n_rows - matrix.shape[0], matrix.indptr[-1])))
+    return sparse.csr_matrix((matrix.data, matrix.indices, indptr), shape=(n_rows, n_cols))
+
+
+def _get_min_int_dtype(values: np.ndarray) -> tp.Type[np.signedinteger]:
+    int32_info = np.iinfo(np.int32)
+    if values.size == 0 or (values.min() >= int32_info.min and values.max() <= int32_info.max):
+        return np.int32
+    return np.int64
+
+
+class _InteractionsBuffer:
+    """Columns with spare capacity. They are shared by `Interactions` objects created one from another with `append`."""
+
+    __slots__ = ("columns", "n_used")
+
+    def __init__(self, columns: tp.Dict[str, np.ndarray], n_used: int) -> None:
+        self.columns = columns
+        self.n_used = n_used
+
+
+class _InteractionsCache:
+    """
+    Holder for matrices and statistics that are computed from interactions once and reused afterwards,
+    and for buffer used for appending interactions.
+    Cached values are not pickled.
+    """
+
+    __slots__ = ("matrices", "stats", "buffer")
+
+    def __init__(self) -> None:
+        self.matrices: tp.Dict[tp.Tuple[str, bool], sparse.csr_matrix] = {}
+        self.stats: tp.Dict[str, tp.Any] = {}
+        self.buffer: tp.Optional[_InteractionsBuffer] = None
+
+    def __reduce__(self) -> tp.Tuple[tp.Type["_InteractionsCache"], tp.Tuple[()]]:
+        return self.__class__, ()
+
 
 @attr.s(frozen=True, slots=True)
 class Interactions:
@@ -40,9 +89,20 @@ class Interactions:
                 - `Columns.Weight` - weight of interaction, float, use ``1`` if interactions have no weight;
                 - `Columns.Datetime` - timestamp of interactions,
                   assign random value if you're not going to use it later.
+
+    compact : bool, default ``False``
+        Whether to store interactions in compact layout to reduce memory usage:
+        ids as ``uint32``, weights as ``float32`` and datetimes as integer epoch seconds
+        (``int32`` if they fit into it, ``int64`` otherwise). Sub-second part of datetimes is dropped.
+        Integer datetimes are treated as epoch seconds in compact layout.
+        Use `convert_datetime` to compare datetime column with datetime values in any layout.
+
+    Interactions are supposed to be immutable: matrices built from `df` are cached, don't modify `df` in place.
     """
 
     df: pd.DataFrame = attr.ib()
+    compact: bool = attr.ib(default=False)
+    _cache: _InteractionsCache = attr.ib(init=False, factory=_InteractionsCache, repr=False, eq=False)
 
     @staticmethod
     def _check_columns_present(df: pd.DataFrame) -> None:
@@ -52,17 +112,39 @@ class Interactions:
             raise KeyError(f"Missed columns {required_columns - actual_columns}")
 
     @staticmethod
-    def _convert_weight_and_datetime_types(df: pd.DataFrame) -> None:
+    def _set_column_type(df: pd.DataFrame, col: str, dtype: tp.Any) -> None:
+        # Avoid copying columns that already have the right type
+        if df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+
+    @classmethod
+    def _convert_weight_and_datetime_types(cls, df: pd.DataFrame, compact: bool = False) -> None:
         try:
-            df[Columns.Weight] = df[Columns.Weight].astype(float)
+            cls._set_column_type(df, Columns.Weight, np.float32 if compact else float)
         except ValueError:
             raise TypeError(f"Column '{Columns.Weight}' must be numeric")
 
+        if compact and pd.api.types.is_integer_dtype(df[Columns.Datetime]):
+            cls._set_column_type(df, Columns.Datetime, _get_min_int_dtype(df[Columns.Datetime].values))
+            return
+
         try:
-            df[Columns.Datetime] = df[Columns.Datetime].astype("datetime64[ns]")
+            cls._set_column_type(df, Columns.Datetime, np.dtype("datetime64[ns]"))
         except ValueError:
             raise TypeError(f"Column '{Columns.Datetime}' must be convertible to 'datetime64' type")
 
+        if compact:
+            epoch_seconds = df[Columns.Datetime].values.astype("datetime64[s]").astype(np.int64)
+            df[Columns.Datetime] = epoch_seconds.astype(_get_min_int_dtype(epoch_seconds))
+
+    @classmethod
+    def _convert_ids_types(cls, df: pd.DataFrame) -> None:
+        max_id = np.iinfo(np.uint32).max
+        for col in (Columns.User, Columns.Item):
+            if len(df) > 0 and df[col].max() > max_id:
+                raise ValueError(f"Column '{col}' values must be <= {max_id} for compact interactions")
+            cls._set_column_type(df, col, np.uint32)
+
     @df.validator
     def _check_columns_present_validator(self, _: str, df: pd.DataFrame) -> None:
         self._check_columns_present(df)
@@ -76,8 +158,105 @@ class Interactions:
                 raise ValueError(f"Column '{col}' values must be >= 0")
 
     def __attrs_post_init__(self) -> None:
-        """Convert datetime and weight columns to the right data types."""
-        self._convert_weight_and_datetime_types(self.df)
+        """Convert columns to the right data types and precompute cheap statistics."""
+        if self.compact:
+            self._convert_ids_types(self.df)
+        self._convert_weight_and_datetime_types(self.df, self.compact)
+        for name in PRECOMPUTED_STATS:
+            getattr(self, name)
+
+    def _get_stat(self, name: str, func: tp.Callable[[], tp.Any]) -> tp.Any:
+        if name not in self._cache.stats:
+            self._cache.stats[name] = func()
+        return self._cache.stats[name]
+
+    @staticmethod
+    def _count_ids(df: pd.DataFrame, col: str) -> int:
+        return int(df[col].max()) + 1 if len(df) > 0 else 0
+
+    @property
+    def n_interactions(self) -> int:
+        """Return number of interactions."""
+        return len(self.df)
+
+    @property
+    def n_users(self) -> int:
+        """
+        Return number of users in interactions matrix, i.e. maximum internal user id plus one.
+        It's computed once when interactions are created.
+        """
+        return self._get_stat("n_users", lambda: self._count_ids(self.df, Columns.User))
+
+    @property
+    def n_items(self) -> int:
+        """
+        Return number of items in interactions matrix, i.e. maximum internal item id plus one.
+        It's computed once when interactions are created.
+        """
+        return self._get_stat("n_items", lambda: self._count_ids(self.df, Columns.Item))
+
+    @property
+    def time_range(self) -> tp.Tuple[pd.Timestamp, pd.Timestamp]:
+        """
+        Return minimum and maximum interaction datetime (``NaT`` for empty interactions).
+        It's computed once when interactions are created.
+        """
+        return self._get_stat("time_range", lambda: self._calc_time_range(self.df, self.compact))
+
+    @staticmethod
+    def _calc_time_range(df: pd.DataFrame, compact: bool) -> tp.Tuple[pd.Timestamp, pd.Timestamp]:
+        if not compact:
+            return df[Columns.Datetime].min(), df[Columns.Datetime].max()
+        if len(df) == 0:
+            return pd.NaT, pd.NaT
+        epoch_seconds = df[Columns.Datetime].values
+        return pd.Timestamp(epoch_seconds.min(), unit="s"), pd.Timestamp(epoch_seconds.max(), unit="s")
+
+    def convert_datetime(self, dt: tp.Union[pd.Timestamp, datetime]) -> tp.Union[pd.Timestamp, datetime, int]:
+        """
+        Convert datetime to the representation that is used in datetime column of `df`.
+
+        Use it to filter interactions by time regardless of `compact` flag,
+        e.g. ``interactions.df[Columns.Datetime] >= interactions.convert_datetime(begin_from)``.
+
+        Parameters
+        ----------
+        dt : datetime
+            Datetime value.
+
+        Returns
+        -------
+        datetime or int
+            The same value if interactions are not compact,
+            otherwise number of epoch seconds rounded up (so comparisons with stored whole seconds are exact).
+        """
+        if not self.compact:
+            return dt
+        return -(-pd.Timestamp(dt).value // 10**9)
+
+    def get_user_counts(self) -> np.ndarray:
+        """
+        Return number of interactions for every user.
+        Array is computed on the first call and cached, don't modify it in place.
+
+        Returns
+        -------
+        np.ndarray
+            Array of size `n_users` where i-th element is the number of interactions of user with internal id ``i``.
+        """
+        return self._get_stat("user_counts", lambda: np.bincount(self.df[Columns.User].values, minlength=self.n_users))
+
+    def get_item_counts(self) -> np.ndarray:
+        """
+        Return number of interactions for every item.
+        Array is computed on the first call and cached, don't modify it in place.
+
+        Returns
+        -------
+        np.ndarray
+            Array of size `n_items` where i-th element is the number of interactions with item with internal id ``i``.
+        """
+        return self._get_stat("item_counts", lambda: np.bincount(self.df[Columns.Item].values, minlength=self.n_items))
 
     @classmethod
     def from_raw(
@@ -85,6 +264,7 @@ class Interactions:
         interactions: pd.DataFrame,
         user_id_map: IdMap,
         item_id_map: IdMap,
+        compact: bool = False,
     ) -> "Interactions":
         """
         Create `Interactions` from dataset with external ids and id mappings.
@@ -102,6 +282,8 @@ class Interactions:
             User identifiers mapping.
         item_id_map : IdMap
             Item identifiers mapping.
+        compact : bool, default ``False``
+            Whether to store interactions in compact layout. See `Interactions` description for details.
 
         Returns
         -------
@@ -117,14 +299,42 @@ class Interactions:
         )
         df[Columns.Weight] = interactions[Columns.Weight].values
         df[Columns.Datetime] = interactions[Columns.Datetime].values
-        cls._convert_weight_and_datetime_types(df)
+        if compact:
+            cls._convert_ids_types(df)
+        cls._convert_weight_and_datetime_types(df, compact)
 
-        return cls(df)
+        return cls(df, compact)
 
     def get_user_item_matrix(self, include_weights: bool = True) -> sparse.csr_matrix:
         """
         Form a user-item CSR matrix based on interactions data.
 
+        Matrix is built on the first call and cached, next calls return the same object.
+        Don't modify it in place. Use `release_cached_matrices` to free memory.
+
+        Parameters
+        ----------
+        include_weights : bool, default ``True``
+             Whether include interaction weights in matrix or not.
+             If ``False``, all values in returned matrix will be equal to ``1``.
+
+        Returns
+        -------
+        csr_matrix
+        """
+        key = ("user_item", include_weights)
+        if key not in self._cache.matrices:
+            self._cache.matrices[key] = self._make_user_item_matrix(include_weights)
+        return self._cache.matrices[key]
+
+    def get_item_user_matrix(self, include_weights: bool = True) -> sparse.csr_matrix:
+        """
+        Form an item-user CSR matrix (transposed user-item matrix) based on interactions data.
+        It's useful for column-wise access to user-item matrix: its transposition is CSC user-item matrix.
+
+        Matrix is built on the first call and cached, next calls return the same object.
+        Don't modify it in place. Use `release_cached_matrices` to free memory.
+
         Parameters
         ----------
         include_weights : bool, default ``True``
@@ -135,6 +345,16 @@ class Interactions:
         -------
         csr_matrix
         """
+        key = ("item_user", include_weights)
+        if key not in self._cache.matrices:
+            self._cache.matrices[key] = self.get_user_item_matrix(include_weights).T.tocsr()
+        return self._cache.matrices[key]
+
+    def release_cached_matrices(self) -> None:
+        """Remove all cached matrices to free memory. They will be built again on demand."""
+        self._cache.matrices.clear()
+
+    def _make_user_item_matrix(self, include_weights: bool) -> sparse.csr_matrix:
         if include_weights:
             values = self.df[Columns.Weight].values
         else:
@@ -148,9 +368,111 @@ class Interactions:
                     self.df[Columns.Item].values,
                 ),
             ),
+            shape=(self.n_users, self.n_items),
         )
         return csr
 
+    def append(self, df: pd.DataFrame) -> "Interactions":
+        """
+        Return new interactions with given rows added to the end.
+
+        Cost is proportional to the number of new rows (amortized), current object is not changed:
+            - columns are kept in buffers with spare capacity that grow geometrically,
+              new interactions share buffers with the current ones;
+            - statistics and cached user-item matrices are updated with new rows instead of being computed again.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            New interactions with internal ids. Table has the same structure as `df` attribute.
+
+        Returns
+        -------
+        Interactions
+        """
+        self._check_columns_present(df)
+        new_df = pd.DataFrame({col: df[col].values for col in Columns.Interactions})
+        self._check_ids("df", new_df)
+        if self.compact:
+            self._convert_ids_types(new_df)
+        self._convert_weight_and_datetime_types(new_df, self.compact)
+
+        n_old = len(self.df)
+        n_total = n_old + len(new_df)
+        buffer = self._get_buffer(new_df)
+        for col in Columns.Interactions:
+            buffer.columns[col][n_old:n_total] = new_df[col].values
+        buffer.n_used = n_total
+
+        cache = _InteractionsCache()
+        cache.buffer = buffer
+        cache.stats = self._get_appended_stats(new_df)
+        n_users, n_items = cache.stats["n_users"], cache.stats["n_items"]
+        for (kind, include_weights), matrix in self._cache.matrices.items():
+            values = new_df[Columns.Weight].values if include_weights else np.ones(len(new_df))
+            rows, cols = new_df[Columns.User].values, new_df[Columns.Item].values
+            n_rows, n_cols = n_users, n_items
+            if kind == "item_user":
+                rows, cols, n_rows, n_cols = cols, rows, n_cols, n_rows
+            delta = sparse.csr_matrix((values.astype(np.float32), (rows, cols)), shape=(n_rows, n_cols))
+            cache.matrices[(kind, include_weights)] = _resize_csr(matrix, n_rows, n_cols) + delta
+
+        appended_df = pd.DataFrame({col: buffer.columns[col][:n_total] for col in Columns.Interactions}, copy=False)
+        # Validation and statistics are already done for new rows only
+        return self._from_validated(appended_df, self.compact, cache)
+
+    @classmethod
+    def _from_validated(cls, df: pd.DataFrame, compact: bool, cache: _InteractionsCache) -> "Interactions":
+        """Create object without `__init__` from validated columns and cache with precomputed statistics."""
+        interactions = object.__new__(cls)
+        object.__setattr__(interactions, "df", df)
+        object.__setattr__(interactions, "compact", compact)
+        object.__setattr__(interactions, "_cache", cache)
+        return interactions
+
+    @classmethod
+    def _from_saved(cls, df: pd.DataFrame, compact: bool, stats: tp.Dict[str, tp.Any]) -> "Interactions":
+        """Create object from saved columns and statistics without scanning columns again."""
+        cache = _InteractionsCache()
+        cache.stats = dict(stats)
+        return cls._from_validated(df, compact, cache)
+
+    def _get_buffer(self, new_df: pd.DataFrame) -> _InteractionsBuffer:
+        n_old = len(self.df)
+        n_total = n_old + len(new_df)
+        dtypes = {col: np.result_type(self.df[col].dtype, new_df[col].dtype) for col in Columns.Interactions}
+        buffer = self._cache.buffer
+        if (
+            buffer is not None
+            and buffer.n_used == n_old
+            and buffer.columns[Columns.User].size >= n_total
+            and all(buffer.columns[col].dtype == dtype for col, dtype in dtypes.items())
+        ):
+            return buffer
+
+        capacity = max(n_total, int(n_total * INTERACTIONS_BUFFER_GROWTH_FACTOR))
+        columns = {}
+        for col, dtype in dtypes.items():
+            columns[col] = np.empty(capacity, dtype=dtype)
+            columns[col][:n_old] = self.df[col].values
+        return _InteractionsBuffer(columns, n_old)
+
+    def _get_appended_stats(self, new_df: pd.DataFrame) -> tp.Dict[str, tp.Any]:
+        n_users = max(self.n_users, self._count_ids(new_df, Columns.User))
+        n_items = max(self.n_items, self._count_ids(new_df, Columns.Item))
+        new_time_range = self._calc_time_range(new_df, self.compact)
+        time_range = tuple(
+            func((dt for dt in (old_dt, new_dt) if not pd.isna(dt)), default=pd.NaT)
+            for func, old_dt, new_dt in zip((min, max), self.time_range, new_time_range)
+        )
+        stats = {"n_users": n_users, "n_items": n_items, "time_range": time_range}
+        for name, col, size in (("user_counts", Columns.User, n_users), ("item_counts", Columns.Item, n_items)):
+            if name in self._cache.stats:
+                counts = np.bincount(new_df[col].values, minlength=size)
+                counts[: self._cache.stats[name].size] += self._cache.stats[name]
+                stats[name] = counts
+        return stats
+
     def to_external(
         self,
         user_id_map: IdMap,
@@ -186,6 +508,11 @@ class Interactions:
         if include_weight:
             res[Columns.Weight] = self.df[Columns.Weight]
         if include_datetime:
-            res[Columns.Datetime] = self.df[Columns.Datetime]
+            if self.compact:
+                res[Columns.Datetime] = (
+                    self.df[Columns.Datetime].values.astype("datetime64[s]").astype("datetime64[ns]")
+                )
+            else:
+                res[Columns.Datetime] = self.df[Columns.Datetime]
 
         return res
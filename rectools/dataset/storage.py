@@ -0,0 +1,248 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+Saving of dataset structures to folders with raw `.npy` files and loading them back.
+
+All big arrays are stored as separate `.npy` files, so they can be memory-mapped on loading.
+Small metadata (flags, feature names, shapes) is pickled, so load only folders from trusted sources.
+"""
+
+import pickle
+import typing as tp
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import typing_extensions as tpe
+from scipy import sparse
+
+from rectools import Columns
+
+from .compact_identifiers import CompactStringIdMap, PathLike
+from .features import DenseFeatures, Features, SparseFeatures
+from .identifiers import IdMap
+from .interactions import PRECOMPUTED_STATS, Interactions
+
+AnyIdMap = tp.Union[IdMap, CompactStringIdMap]
+
+
+class StorageFiles:
+    """Fixed file names for saving and loading of dataset structures."""
+
+    Meta = "meta.pkl"
+    ExternalIds = "external_ids.npy"
+    FeatureValues = "values.npy"
+    Indptr = "indptr.npy"
+    Indices = "indices.npy"
+    Data = "data.npy"
+
+
+def _get_mode(overwrite: bool) -> str:
+    return "wb" if overwrite else "xb"
+
+
+def _save_array(folder: Path, file_name: str, values: np.ndarray, overwrite: bool) -> None:
+    allow_pickle = values.dtype.kind == "O"
+    with open(folder / file_name, _get_mode(overwrite)) as f:
+        np.save(f, values, allow_pickle=allow_pickle)
+
+
+def _load_array(folder: Path, file_name: str, mmap: bool) -> np.ndarray:
+    mmap_mode: tp.Optional[tpe.Literal["r"]] = "r" if mmap else None
+    try:
+        return np.load(folder / file_name, mmap_mode=mmap_mode, allow_pickle=False)
+    except ValueError:  # Object arrays can't be memory-mapped
+        return np.load(folder / file_name, allow_pickle=True)
+
+
+def save_meta(folder: Path, meta: tp.Dict[str, tp.Any], overwrite: bool) -> None:
+    """Pickle small metadata dict to folder."""
+    with open(folder / StorageFiles.Meta, _get_mode(overwrite)) as f:
+        pickle.dump(meta, f)
+
+
+def load_meta(folder: Path) -> tp.Dict[str, tp.Any]:
+    """Load metadata dict saved with `save_meta`."""
+    with open(folder / StorageFiles.Meta, "rb") as f:
+        return pickle.load(f)
+
+
+def _make_folder(folder_name: PathLike) -> Path:
+    folder = Path(folder_name)
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder
+
+
+def save_id_map(id_map: AnyIdMap, folder_name: PathLike, overwrite: bool = False) -> None:
+    """
+    Save id map to folder.
+
+    Numeric external ids are saved as is, string external ids are saved as fixed width unicode array,
+    `CompactStringIdMap` is saved with its own `save` method.
+
+    Parameters
+    ----------
+    id_map : IdMap | CompactStringIdMap
+        Id map to save.
+    folder_name : str | Path
+        Destination folder.
+    overwrite : bool, default ``False``
+        Allow to overwrite files in the folder if they already exist.
+    """
+    folder = _make_folder(folder_name)
+    if isinstance(id_map, CompactStringIdMap):
+        id_map.save(folder, overwrite)
+        save_meta(folder, {"kind": "compact_string"}, overwrite)
+        return
+
+    external_ids = id_map.external_ids
+    kind = "array"
+    if external_ids.dtype.kind == "O" and all(isinstance(value, str) for value in external_ids):
+        kind = "string"
+        external_ids = external_ids.astype(str)
+    _save_array(folder, StorageFiles.ExternalIds, external_ids, overwrite)
+    save_meta(folder, {"kind": kind}, overwrite)
+
+
+def load_id_map(folder_name: PathLike, mmap: bool = False) -> AnyIdMap:
+    """
+    Load id map saved with `save_id_map`.
+
+    Parameters
+    ----------
+    folder_name : str | Path
+        Folder where id map was saved.
+    mmap : bool, default ``False``
+        Whether to memory-map arrays (read-only) instead of reading them into memory.
+        String external ids of `IdMap` are always read into memory since they are stored as python objects.
+
+    Returns
+    -------
+    IdMap | CompactStringIdMap
+    """
+    folder = Path(folder_name)
+    kind = load_meta(folder)["kind"]
+    if kind == "compact_string":
+        return CompactStringIdMap.load(folder, mmap)
+    if kind == "string":
+        return IdMap(_load_array(folder, StorageFiles.ExternalIds, mmap=False).astype(object))
+    return IdMap(_load_array(folder, StorageFiles.ExternalIds, mmap))
+
+
+def save_interactions(interactions: Interactions, folder_name: PathLike, overwrite: bool = False) -> None:
+    """
+    Save interactions to folder, every column is saved to separate file.
+
+    Parameters
+    ----------
+    interactions : Interactions
+        Interactions to save.
+    folder_name : str | Path
+        Destination folder.
+    overwrite : bool, default ``False``
+        Allow to overwrite files in the folder if they already exist.
+    """
+    folder = _make_folder(folder_name)
+    for col in Columns.Interactions:
+        _save_array(folder, f"{col}.npy", interactions.df[col].values, overwrite)
+    stats = {name: getattr(interactions, name) for name in PRECOMPUTED_STATS}
+    save_meta(folder, {"compact": interactions.compact, "stats": stats}, overwrite)
+
+
+def load_interactions(folder_name: PathLike, mmap: bool = False) -> Interactions:
+    """
+    Load interactions saved with `save_interactions`.
+
+    Columns are not validated and scanned again, statistics (number of users, items and time range)
+    are taken from saved metadata. So memory-mapped columns are not read on loading.
+
+    Parameters
+    ----------
+    folder_name : str | Path
+        Folder where interactions were saved.
+    mmap : bool, default ``False``
+        Whether to memory-map columns (read-only) instead of reading them into memory.
+
+    Returns
+    -------
+    Interactions
+    """
+    folder = Path(folder_name)
+    meta = load_meta(folder)
+    df = pd.DataFrame({col: _load_array(folder, f"{col}.npy", mmap) for col in Columns.Interactions}, copy=False)
+    if "stats" not in meta:  # Saved before statistics were stored
+        return Interactions(df, meta["compact"])
+    return Interactions._from_saved(df, meta["compact"], meta["stats"])  # pylint: disable=protected-access
+
+
+def save_features(features: Features, folder_name: PathLike, overwrite: bool = False) -> None:
+    """
+    Save features to folder.
+
+    Values of `DenseFeatures` are saved as one array,
+    values of `SparseFeatures` are saved as `indptr`, `indices` and `data` arrays of CSR matrix.
+
+    Parameters
+    ----------
+    features : DenseFeatures | SparseFeatures
+        Features to save.
+    folder_name : str | Path
+        Destination folder.
+    overwrite : bool, default ``False``
+        Allow to overwrite files in the folder if they already exist.
+    """
+    folder = _make_folder(folder_name)
+    if isinstance(features, DenseFeatures):
+        _save_array(folder, StorageFiles.FeatureValues, features.values, overwrite)
+        save_meta(folder, {"kind": "dense", "names": features.names}, overwrite)
+        return
+
+    values = features.values
+    _save_array(folder, StorageFiles.Indptr, values.indptr, overwrite)
+    _save_array(folder, StorageFiles.Indices, values.indices, overwrite)
+    _save_array(folder, StorageFiles.Data, values.data, overwrite)
+    save_meta(folder, {"kind": "sparse", "names": features.names, "shape": values.shape}, overwrite)
+
+
+def load_features(folder_name: PathLike, mmap: bool = False) -> Features:
+    """
+    Load features saved with `save_features`.
+
+    Parameters
+    ----------
+    folder_name : str | Path
+        Folder where features were saved.
+    mmap : bool, default ``False``
+        Whether to memory-map arrays (read-only) instead of reading them into memory.
+
+    Returns
+    -------
+    DenseFeatures | SparseFeatures
+    """
+    folder = Path(folder_name)
+    meta = load_meta(folder)
+    if meta["kind"] == "dense":
+        return DenseFeatures(_load_array(folder, StorageFiles.FeatureValues, mmap), meta["names"])
+
+    values = sparse.csr_matrix(
+        (
+            _load_array(folder, StorageFiles.Data, mmap),
+            _load_array(folder, StorageFiles.Indices, mmap),
+            _load_array(folder, StorageFiles.Indptr, mmap),
+        ),
+        shape=meta["shape"],
+        copy=False,
+    )
+    return SparseFeatures(values, meta["names"])
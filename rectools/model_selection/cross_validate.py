@@ -18,6 +18,7 @@ def _gen_2x_internal_ids_dataset(
     user_features: tp.Optional[Features],
     item_features: tp.Optional[Features],
     prefer_warm_inference_over_cold: bool,
+    compact: bool = False,
 ) -> Dataset:
     """
     Make new dataset based on given interactions and features from base dataset.
@@ -26,7 +27,9 @@ def _gen_2x_internal_ids_dataset(
     """
     user_id_map = IdMap.from_values(interactions_internal_df[Columns.User].values)  # 1x internal -> 2x internal
     item_id_map = IdMap.from_values(interactions_internal_df[Columns.Item].values)  # 1x internal -> 2x internal
-    interactions_train = Interactions.from_raw(interactions_internal_df, user_id_map, item_id_map)  # 2x internal
+    interactions_train = Interactions.from_raw(
+        interactions_internal_df, user_id_map, item_id_map, compact
+    )  # 2x internal
 
     def _handle_features(features: tp.Optional[Features], id_map: IdMap) -> tp.Tuple[tp.Optional[Features], IdMap]:
         if features is None:
@@ -123,7 +126,11 @@ def cross_validate(  # pylint: disable=too-many-locals
         # We need to avoid fitting models on sparse matrices with all zero rows/columns =>
         # => we need to create a fold dataset which contains only hot users and items for current training
         fold_dataset = _gen_2x_internal_ids_dataset(
-            interactions_df_train, dataset.user_features, dataset.item_features, prefer_warm_inference_over_cold
+            interactions_df_train,
+            dataset.user_features,
+            dataset.item_features,
+            prefer_warm_inference_over_cold,
+            interactions.compact,
         )
 
         interactions_df_test = interactions.df.iloc[test_ids]  # 1x internal
@@ -113,7 +113,7 @@ class TimeRangeSplitter(Splitter):
 
     def get_test_fold_borders(self, interactions: Interactions) -> tp.List[tp.Tuple[pd.Timestamp, pd.Timestamp]]:
         """Return datetime borders of test folds based on given test fold sizes and last interaction."""
-        last_dt = interactions.df[Columns.Datetime].max()
+        last_dt = interactions.time_range[1]
         last_dt_ceiled = last_dt.ceil(self.test_size_unit)
 
         if last_dt_ceiled == last_dt:  # dt is exactly on units border, like `2021-09-06 00:00:00` with unit = "D"
@@ -136,8 +136,9 @@ class TimeRangeSplitter(Splitter):
         series_datetime = interactions.df[Columns.Datetime]
 
         for i_split, (start, end) in enumerate(test_fold_borders):
-            train_mask = series_datetime < start
-            test_mask = (series_datetime >= start) & (series_datetime < end)
+            start_value, end_value = interactions.convert_datetime(start), interactions.convert_datetime(end)
+            train_mask = series_datetime < start_value
+            test_mask = (series_datetime >= start_value) & (series_datetime < end_value)
 
             train_idx = idx[train_mask].values
             test_idx = idx[test_mask].values
@@ -34,13 +34,26 @@ Models
 `models.PopularInCategoryModel`
 `models.PureSVDModel`
 `models.RandomModel`
+`models.SlidingWindowPopularModel`
+
+Candidates
+----------
+`models.CandidatesMatrix`
+`models.GroupCandidates`
+
+Parallel recommendations
+------------------------
+`models.recommend_parallel`
 """
 
+from .candidates import CandidatesMatrix, GroupCandidates, UserCandidates
 from .ease import EASEModel
 from .implicit_als import ImplicitALSWrapperModel
 from .implicit_knn import ImplicitItemKNNWrapperModel
+from .parallel import recommend_parallel
 from .popular import PopularModel
 from .popular_in_category import PopularInCategoryModel
+from .popular_window import SlidingWindowPopularModel
 from .pure_svd import PureSVDModel
 from .random import RandomModel
 
@@ -64,5 +77,10 @@ __all__ = (
     "PopularInCategoryModel",
     "PureSVDModel",
     "RandomModel",
+    "SlidingWindowPopularModel",
     "DSSMModel",
+    "CandidatesMatrix",
+    "GroupCandidates",
+    "UserCandidates",
+    "recommend_parallel",
 )
@@ -16,6 +16,7 @@
 
 import typing as tp
 
+import attr
 import numpy as np
 import pandas as pd
 import typing_extensions as tpe
@@ -24,7 +25,9 @@ from rectools import AnyIds, Columns, InternalIds
 from rectools.dataset import Dataset
 from rectools.dataset.identifiers import IdMap
 from rectools.exceptions import NotFittedError
+from rectools.models.candidates import UserCandidates
 from rectools.types import AnyIdsArray, InternalIdsArray
+from rectools.utils import fast_isin_for_sorted_test_elements
 
 T = tp.TypeVar("T", bound="ModelBase")
 ScoresArray = np.ndarray
@@ -37,6 +40,17 @@ RecoTriplet = tp.Tuple[AnyIds, AnyIds, Scores]
 RecoTriplet_T = tp.TypeVar("RecoTriplet_T", InternalRecoTriplet, SemiInternalRecoTriplet, RecoTriplet)
 
 
+@attr.s(auto_attribs=True)
+class _ItemFilters:
+    """Internal ids of items filters prepared for recommendations."""
+
+    # Whitelist with excluded items removed, it's used for warm and cold targets
+    whitelist: tp.Optional[InternalIdsArray]
+    # Whitelist and keyword arguments (e.g. blacklist, candidates) for `_recommend_u2i` and `_recommend_i2i`
+    hot_whitelist: tp.Optional[InternalIdsArray]
+    hot_kwargs: tp.Dict[str, tp.Any]
+
+
 class ModelBase:
     """
     Base model class.
@@ -47,6 +61,11 @@ class ModelBase:
 
     recommends_for_warm: bool = False
     recommends_for_cold: bool = False
+    # Whether `_recommend_u2i` and `_recommend_i2i` accept `sorted_item_ids_to_exclude` argument.
+    # Otherwise excluded items are removed from the whitelist of items to recommend.
+    supports_items_to_exclude: bool = False
+    # Whether `_recommend_u2i` accepts `user_candidates` argument with per-user restrictions of items
+    supports_candidates: bool = False
 
     def __init__(self, *args: tp.Any, verbose: int = 0, **kwargs: tp.Any) -> None:
         self.is_fitted = False
@@ -81,6 +100,8 @@ class ModelBase:
         items_to_recommend: tp.Optional[AnyIds] = None,
         add_rank_col: bool = True,
         assume_external_ids: bool = True,
+        items_to_exclude: tp.Optional[AnyIds] = None,
+        candidates: tp.Optional[UserCandidates] = None,
     ) -> pd.DataFrame:
         r"""
         Recommend items for users.
@@ -118,6 +139,17 @@ class ModelBase:
             When ``True`` all input user and item ids are supposed to be external.
             Ids in returning recommendations table will be external as well.
             Internal otherwise. Works faster with ``False``.
+        items_to_exclude : array-like, optional, default None
+            Blacklist of item ids.
+            If given, these items will never be recommended (e.g. banned or out-of-stock items).
+            Can be combined with `items_to_recommend`.
+            Item ids are supposed to be external if `assume_external_ids` is `True`` (default).
+            Internal otherwise.
+        candidates : UserCandidates, optional, default None
+            Per-user restrictions of items that can be recommended,
+            e.g. `CandidatesMatrix` or `GroupCandidates` for regional catalogs.
+            Applied together with `items_to_recommend` and `items_to_exclude` in one pass.
+            Works only for hot users and for models that support it.
 
         Returns
         -------
@@ -137,34 +169,224 @@ class ModelBase:
             If arguments have inappropriate type or value
         ValueError
             If some of given users are warm/cold and model doesn't support such type of users.
+        ValueError
+            If `candidates` are given but model doesn't support them or some of given users are not hot.
         """
-        self._check_is_fitted()
-        self._check_k(k)
+        targets, filters = self._prepare_u2i_targets(
+            users, dataset, k, items_to_recommend, assume_external_ids, items_to_exclude, candidates
+        )
+        return self._recommend_u2i_targets(
+            targets, dataset, k, filter_viewed, filters, add_rank_col, assume_external_ids
+        )
 
-        sorted_item_ids_to_recommend = self._get_sorted_item_ids_to_recommend(
-            items_to_recommend, dataset, assume_external_ids
+    def recommend_chunks(
+        self,
+        users: AnyIds,
+        dataset: Dataset,
+        k: int,
+        filter_viewed: bool,
+        items_to_recommend: tp.Optional[AnyIds] = None,
+        add_rank_col: bool = True,
+        assume_external_ids: bool = True,
+        items_to_exclude: tp.Optional[AnyIds] = None,
+        candidates: tp.Optional[UserCandidates] = None,
+        chunk_size: int = 100_000,
+    ) -> tp.Iterator[pd.DataFrame]:
+        """
+        Recommend items for users chunk by chunk, see `recommend` for parameters description.
+
+        Users are processed by chunks of `chunk_size` users: recommendations, id conversion
+        and table creation are made for one chunk at a time, so memory is bounded by chunk size.
+        Chunks are returned in the same order as rows of `recommend` result:
+        hot users first, then warm, then cold. Every user is present only in one chunk.
+
+        Arguments are checked when this method is called, recommendations are made during iteration.
+
+        Parameters
+        ----------
+        users, dataset, k, filter_viewed, items_to_recommend, add_rank_col, assume_external_ids, \
+        items_to_exclude, candidates
+            The same as in `recommend`.
+        chunk_size : int, default 100_000
+            Maximum number of users in one chunk.
+
+        Returns
+        -------
+        iterator(pd.DataFrame)
+            Recommendations tables in the same format as `recommend` returns.
+            At least one (maybe empty) table is returned.
+
+        Raises
+        ------
+        NotFittedError
+            If called for not fitted model.
+        TypeError, ValueError
+            The same as in `recommend`.
+        ValueError
+            If `chunk_size` is not positive.
+        """
+        if chunk_size < 1:
+            raise ValueError("`chunk_size` must be positive")
+        targets, filters = self._prepare_u2i_targets(
+            users, dataset, k, items_to_recommend, assume_external_ids, items_to_exclude, candidates
+        )
+        return self._iter_u2i_reco_chunks(
+            targets, dataset, k, filter_viewed, filters, add_rank_col, assume_external_ids, chunk_size
+        )
+
+    def recommend_to_parquet(
+        self,
+        path: str,
+        users: AnyIds,
+        dataset: Dataset,
+        k: int,
+        filter_viewed: bool,
+        items_to_recommend: tp.Optional[AnyIds] = None,
+        add_rank_col: bool = True,
+        assume_external_ids: bool = True,
+        items_to_exclude: tp.Optional[AnyIds] = None,
+        candidates: tp.Optional[UserCandidates] = None,
+        chunk_size: int = 100_000,
+    ) -> int:
+        """
+        Recommend items for users and write recommendations to Parquet file chunk by chunk.
+
+        Every chunk of `recommend_chunks` is written as a separate row group with `pyarrow`
+        (it must be installed), so all recommendations are never kept in memory.
+
+        Parameters
+        ----------
+        path : str
+            Path to Parquet file, it's overwritten if exists.
+        users, dataset, k, filter_viewed, items_to_recommend, add_rank_col, assume_external_ids, \
+        items_to_exclude, candidates, chunk_size
+            The same as in `recommend_chunks`.
+
+        Returns
+        -------
+        int
+            Number of written rows.
+        """
+        from pyarrow import Table, parquet  # pylint: disable=import-outside-toplevel
+
+        chunks = self.recommend_chunks(
+            users,
+            dataset,
+            k,
+            filter_viewed,
+            items_to_recommend,
+            add_rank_col,
+            assume_external_ids,
+            items_to_exclude,
+            candidates,
+            chunk_size,
         )
+        n_rows = 0
+        writer = None
+        empty_chunk = None
+        try:
+            for chunk in chunks:
+                # Empty tables may have other column types, schema is taken from the first non-empty chunk
+                if chunk.empty:
+                    empty_chunk = chunk
+                    continue
+                table = Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = parquet.ParquetWriter(path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+                n_rows += len(chunk)
+            if writer is None:
+                parquet.write_table(Table.from_pandas(empty_chunk, preserve_index=False), path)
+        finally:
+            if writer is not None:
+                writer.close()
+        return n_rows
+
+    def _prepare_u2i_targets(
+        self,
+        users: AnyIds,
+        dataset: Dataset,
+        k: int,
+        items_to_recommend: tp.Optional[AnyIds],
+        assume_external_ids: bool,
+        items_to_exclude: tp.Optional[AnyIds],
+        candidates: tp.Optional[UserCandidates],
+    ) -> tp.Tuple[tp.Tuple[InternalIdsArray, InternalIdsArray, AnyIdsArray], "_ItemFilters"]:
+        """Check arguments, split users by hot, warm and cold and prepare items filters."""
+        self._check_is_fitted()
+        self._check_k(k)
+        filters = self._get_item_filters(items_to_recommend, items_to_exclude, dataset, assume_external_ids)
 
         # Here for hot and warm we get internal ids, for cold we keep given ids
         hot_user_ids, warm_user_ids, cold_user_ids = self._split_targets_by_hot_warm_cold(
             users, dataset.user_id_map, dataset.n_hot_users, assume_external_ids
         )
         self._check_targets_are_valid(hot_user_ids, warm_user_ids, cold_user_ids, "user")
+        if candidates is not None:
+            self._check_candidates_are_supported(warm_user_ids, cold_user_ids)
+            filters.hot_kwargs["user_candidates"] = candidates
+        return (hot_user_ids, warm_user_ids, cold_user_ids), filters
+
+    def _iter_u2i_reco_chunks(
+        self,
+        targets: tp.Tuple[InternalIdsArray, InternalIdsArray, AnyIdsArray],
+        dataset: Dataset,
+        k: int,
+        filter_viewed: bool,
+        filters: "_ItemFilters",
+        add_rank_col: bool,
+        assume_external_ids: bool,
+        chunk_size: int,
+    ) -> tp.Iterator[pd.DataFrame]:
+        hot_user_ids, warm_user_ids, cold_user_ids = targets
+        if hot_user_ids.size + warm_user_ids.size + cold_user_ids.size == 0:
+            yield self._recommend_u2i_targets(
+                targets, dataset, k, filter_viewed, filters, add_rank_col, assume_external_ids
+            )
+        # Every chunk contains users of one type only, so chunks order is the same as rows order of `recommend`
+        for start in range(0, hot_user_ids.size, chunk_size):
+            chunk_targets = (hot_user_ids[start : start + chunk_size], warm_user_ids[:0], cold_user_ids[:0])
+            yield self._recommend_u2i_targets(
+                chunk_targets, dataset, k, filter_viewed, filters, add_rank_col, assume_external_ids
+            )
+        for start in range(0, warm_user_ids.size, chunk_size):
+            chunk_targets = (hot_user_ids[:0], warm_user_ids[start : start + chunk_size], cold_user_ids[:0])
+            yield self._recommend_u2i_targets(
+                chunk_targets, dataset, k, filter_viewed, filters, add_rank_col, assume_external_ids
+            )
+        for start in range(0, cold_user_ids.size, chunk_size):
+            chunk_targets = (hot_user_ids[:0], warm_user_ids[:0], cold_user_ids[start : start + chunk_size])
+            yield self._recommend_u2i_targets(
+                chunk_targets, dataset, k, filter_viewed, filters, add_rank_col, assume_external_ids
+            )
 
+    def _recommend_u2i_targets(
+        self,
+        targets: tp.Tuple[InternalIdsArray, InternalIdsArray, AnyIdsArray],
+        dataset: Dataset,
+        k: int,
+        filter_viewed: bool,
+        filters: "_ItemFilters",
+        add_rank_col: bool,
+        assume_external_ids: bool,
+    ) -> pd.DataFrame:
+        hot_user_ids, warm_user_ids, cold_user_ids = targets
         reco_hot = self._init_internal_reco_triplet()
         reco_warm = self._init_internal_reco_triplet()
         reco_cold = self._init_semi_internal_reco_triplet()
 
         if hot_user_ids.size > 0:
-            reco_hot = self._recommend_u2i(hot_user_ids, dataset, k, filter_viewed, sorted_item_ids_to_recommend)
+            reco_hot = self._recommend_u2i(
+                hot_user_ids, dataset, k, filter_viewed, filters.hot_whitelist, **filters.hot_kwargs
+            )
         if warm_user_ids.size > 0:
             if self.recommends_for_warm:
-                reco_warm = self._recommend_u2i_warm(warm_user_ids, dataset, k, sorted_item_ids_to_recommend)
+                reco_warm = self._recommend_u2i_warm(warm_user_ids, dataset, k, filters.whitelist)
             else:
                 # TODO: use correct types for numpy arrays and stop ignoring
-                reco_warm = self._recommend_cold(warm_user_ids, k, sorted_item_ids_to_recommend)  # type: ignore
+                reco_warm = self._recommend_cold(warm_user_ids, k, filters.whitelist)  # type: ignore
         if cold_user_ids.size > 0:
-            reco_cold = self._recommend_cold(cold_user_ids, k, sorted_item_ids_to_recommend)
+            reco_cold = self._recommend_cold(cold_user_ids, k, filters.whitelist)
 
         reco_hot = self._adjust_reco_types(reco_hot)
         reco_warm = self._adjust_reco_types(reco_warm)
@@ -192,6 +414,7 @@ class ModelBase:
         items_to_recommend: tp.Optional[AnyIds] = None,
         add_rank_col: bool = True,
         assume_external_ids: bool = True,
+        items_to_exclude: tp.Optional[AnyIds] = None,
     ) -> pd.DataFrame:
         """
         Recommend items for target items.
@@ -228,6 +451,12 @@ class ModelBase:
             When ``True`` all input item ids are supposed to be external.
             Ids in returning recommendations table will be external as well.
             Internal otherwise. Works faster with ``False``.
+        items_to_exclude : array-like, optional, default None
+            Blacklist of item ids.
+            If given, these items will never be recommended (e.g. banned or out-of-stock items).
+            Can be combined with `items_to_recommend`.
+            Item ids are supposed to be external if `assume_external_ids` is `True`` (default).
+            Internal otherwise.
 
         Returns
         -------
@@ -251,9 +480,7 @@ class ModelBase:
         self._check_is_fitted()
         self._check_k(k)
 
-        sorted_item_ids_to_recommend = self._get_sorted_item_ids_to_recommend(
-            items_to_recommend, dataset, assume_external_ids
-        )
+        filters = self._get_item_filters(items_to_recommend, items_to_exclude, dataset, assume_external_ids)
 
         # Here for hot and warm we get internal ids, for cold we keep given ids
         hot_target_ids, warm_target_ids, cold_target_ids = self._split_targets_by_hot_warm_cold(
@@ -268,20 +495,18 @@ class ModelBase:
         reco_cold = self._init_semi_internal_reco_triplet()
 
         if hot_target_ids.size > 0:
-            reco_hot = self._recommend_i2i(hot_target_ids, dataset, requested_k, sorted_item_ids_to_recommend)
+            reco_hot = self._recommend_i2i(
+                hot_target_ids, dataset, requested_k, filters.hot_whitelist, **filters.hot_kwargs
+            )
         if warm_target_ids.size > 0:
             if self.recommends_for_warm:
-                reco_warm = self._recommend_i2i_warm(
-                    warm_target_ids, dataset, requested_k, sorted_item_ids_to_recommend
-                )
+                reco_warm = self._recommend_i2i_warm(warm_target_ids, dataset, requested_k, filters.whitelist)
             else:
                 # TODO: use correct types for numpy arrays and stop ignoring
-                reco_warm = self._recommend_cold(
-                    warm_target_ids, requested_k, sorted_item_ids_to_recommend
-                )  # type: ignore
+                reco_warm = self._recommend_cold(warm_target_ids, requested_k, filters.whitelist)  # type: ignore
         if cold_target_ids.size > 0:
             # We intentionally request `k` and not `requested_k` here since we're not going to filter cold reco later
-            reco_cold = self._recommend_cold(cold_target_ids, k, sorted_item_ids_to_recommend)
+            reco_cold = self._recommend_cold(cold_target_ids, k, filters.whitelist)
 
         reco_hot = self._adjust_reco_types(reco_hot)
         reco_warm = self._adjust_reco_types(reco_warm)
@@ -337,6 +562,69 @@ class ModelBase:
         sorted_item_ids_to_recommend = np.unique(item_ids_to_recommend)
         return sorted_item_ids_to_recommend
 
+    def _get_item_filters(
+        self,
+        items_to_recommend: tp.Optional[AnyIds],
+        items_to_exclude: tp.Optional[AnyIds],
+        dataset: Dataset,
+        assume_external_ids: bool,
+    ) -> _ItemFilters:
+        sorted_item_ids_to_recommend = self._get_sorted_item_ids_to_recommend(
+            items_to_recommend, dataset, assume_external_ids
+        )
+        sorted_item_ids_to_exclude = self._get_sorted_item_ids_to_recommend(
+            items_to_exclude, dataset, assume_external_ids
+        )
+        hot_item_ids_to_recommend, hot_kwargs = self._get_hot_item_filters(
+            sorted_item_ids_to_recommend, sorted_item_ids_to_exclude, dataset.item_id_map.size, dataset.n_hot_items
+        )
+        sorted_item_ids_to_recommend = self._exclude_from_item_ids_to_recommend(
+            sorted_item_ids_to_recommend, sorted_item_ids_to_exclude, dataset.item_id_map.size
+        )
+        return _ItemFilters(sorted_item_ids_to_recommend, hot_item_ids_to_recommend, hot_kwargs)
+
+    @classmethod
+    def _exclude_from_item_ids_to_recommend(
+        cls,
+        sorted_item_ids_to_recommend: tp.Optional[InternalIdsArray],
+        sorted_item_ids_to_exclude: tp.Optional[InternalIdsArray],
+        n_items: int,
+    ) -> tp.Optional[InternalIdsArray]:
+        if sorted_item_ids_to_exclude is None:
+            return sorted_item_ids_to_recommend
+        if sorted_item_ids_to_recommend is None:
+            sorted_item_ids_to_recommend = np.arange(n_items)
+        valid_mask = fast_isin_for_sorted_test_elements(
+            sorted_item_ids_to_recommend, sorted_item_ids_to_exclude, invert=True
+        )
+        return sorted_item_ids_to_recommend[valid_mask]
+
+    def _get_hot_item_filters(
+        self,
+        sorted_item_ids_to_recommend: tp.Optional[InternalIdsArray],
+        sorted_item_ids_to_exclude: tp.Optional[InternalIdsArray],
+        n_items: int,
+        n_hot_items: int,
+    ) -> tp.Tuple[tp.Optional[InternalIdsArray], tp.Dict[str, tp.Any]]:
+        # Blacklist is passed to model only if it's the only items filter, whitelist is restricted otherwise
+        if (
+            self.supports_items_to_exclude
+            and sorted_item_ids_to_recommend is None
+            and sorted_item_ids_to_exclude is not None
+        ):
+            return None, {"sorted_item_ids_to_exclude": self._get_hot_item_ids(sorted_item_ids_to_exclude, n_hot_items)}
+        whitelist = self._exclude_from_item_ids_to_recommend(
+            sorted_item_ids_to_recommend, sorted_item_ids_to_exclude, n_items
+        )
+        if whitelist is not None:
+            whitelist = self._get_hot_item_ids(whitelist, n_hot_items)
+        return whitelist, {}
+
+    @staticmethod
+    def _get_hot_item_ids(sorted_item_ids: InternalIdsArray, n_hot_items: int) -> InternalIdsArray:
+        # Models know only hot items (with interactions), warm items (e.g. out of stock ones) are dropped from filters
+        return sorted_item_ids[: np.searchsorted(sorted_item_ids, n_hot_items)]
+
     @classmethod
     def _split_targets_by_hot_warm_cold(
         cls,
@@ -378,6 +666,13 @@ class ModelBase:
                 f"but some of given {entity}s are cold: they are not in the `dataset.{entity}_id_map`"
             )
 
+    @classmethod
+    def _check_candidates_are_supported(cls, warm_user_ids: InternalIdsArray, cold_user_ids: AnyIdsArray) -> None:
+        if not cls.supports_candidates:
+            raise ValueError(f"Model `{cls}` doesn't support per-user candidates")
+        if warm_user_ids.size > 0 or cold_user_ids.size > 0:
+            raise ValueError("Per-user candidates are supported only for hot users")
+
     @classmethod
     def _ensure_internal_ids_valid(cls, internal_ids: AnyIds) -> InternalIdsArray:
         ids = np.asarray(internal_ids)
@@ -438,10 +733,24 @@ class ModelBase:
         )
 
         if add_rank_col:
-            df[Columns.Rank] = df.groupby(target_col, sort=False).cumcount() + 1
+            df[Columns.Rank] = cls._calc_ranks(df[target_col])
 
         return df
 
+    @classmethod
+    def _calc_ranks(cls, targets: pd.Series) -> np.ndarray:
+        """Return 1-based numbers of rows among rows of the same target."""
+        values = targets.values
+        n_rows = len(values)
+        is_group_start = np.ones(n_rows, dtype=bool)
+        is_group_start[1:] = values[1:] != values[:-1]
+        group_starts = np.flatnonzero(is_group_start)
+        # Rows of every target usually go together, then ranks are positions inside contiguous groups
+        if group_starts.size == len(pd.unique(values)):
+            group_sizes = np.diff(np.append(group_starts, n_rows))
+            return np.arange(n_rows) - np.repeat(group_starts, group_sizes) + 1
+        return targets.groupby(targets, sort=False).cumcount().values + 1
+
     def _recommend_cold(
         self, target_ids: AnyIdsArray, k: int, sorted_item_ids_to_recommend: tp.Optional[InternalIdsArray]
     ) -> SemiInternalRecoTriplet:
@@ -0,0 +1,240 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Per-user restrictions of items that can be recommended."""
+
+import typing as tp
+
+import attr
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from rectools import Columns
+from rectools.dataset import Dataset
+from rectools.types import InternalIdsArray
+
+GROUP_COL = "group"
+
+
+def _get_internal_ids(id_map: tp.Any, values: np.ndarray, assume_external_ids: bool) -> np.ndarray:
+    """Return internal ids for given ids, ``-1`` for ids that are not in id map."""
+    if assume_external_ids:
+        return id_map._get_indexer(values)[0]  # pylint: disable=protected-access
+    internal_ids = np.asarray(values)
+    if not np.issubdtype(internal_ids.dtype, np.integer):
+        raise TypeError("Internal ids are always integer")
+    return np.where((internal_ids >= 0) & (internal_ids < id_map.size), internal_ids, -1)
+
+
+def _take_rows(matrix: sparse.csr_matrix, rows: np.ndarray, n_cols: int) -> sparse.csr_matrix:
+    """Gather matrix rows without copying the whole matrix, rows with ``-1`` index are empty."""
+    if matrix.shape[1] > n_cols:
+        raise ValueError(f"Number of candidate items {matrix.shape[1]} is bigger than number of items {n_cols}")
+    valid_mask = rows >= 0
+    valid_rows = rows[valid_mask]
+    lengths = np.zeros(rows.size, dtype=np.int64)
+    lengths[valid_mask] = matrix.indptr[valid_rows + 1] - matrix.indptr[valid_rows]
+    indptr = np.zeros(rows.size + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    # Position in source matrix = position in result + shift of the row
+    shifts = matrix.indptr[valid_rows] - indptr[:-1][valid_mask]
+    positions = np.arange(indptr[-1]) + np.repeat(shifts, lengths[valid_mask])
+    return sparse.csr_matrix((matrix.data[positions], matrix.indices[positions], indptr), shape=(rows.size, n_cols))
+
+
+class UserCandidates:
+    """
+    Base class for per-user restrictions of items that can be recommended.
+
+    Warning: This class should not be used directly.
+    Use derived classes instead.
+    """
+
+    def get_user_items(self, user_ids: InternalIdsArray, n_items: int) -> sparse.csr_matrix:
+        """
+        Return matrix of items allowed for recommendations to given users.
+
+        Parameters
+        ----------
+        user_ids : np.ndarray
+            Internal user ids.
+        n_items : int
+            Number of items in dataset.
+
+        Returns
+        -------
+        csr_matrix
+            Matrix of shape ``(len(user_ids), n_items)``,
+            non-zero values mark items that can be recommended to corresponding users.
+        """
+        raise NotImplementedError()
+
+    def get_user_groups(self, user_ids: InternalIdsArray) -> tp.Optional[tp.Tuple[np.ndarray, sparse.csr_matrix]]:
+        """
+        Return groups of given users if users with the same group have the same allowed items.
+
+        It allows to rank all users of a group at once with a group whitelist of items.
+
+        Parameters
+        ----------
+        user_ids : np.ndarray
+            Internal user ids.
+
+        Returns
+        -------
+        (np.ndarray, csr_matrix), optional
+            Group index for every user (``-1`` for users that can't get any recommendations)
+            and matrix of allowed items with group indices as rows and internal item ids as columns.
+            ``None`` if candidates are not defined by groups.
+        """
+        return None
+
+
+@attr.s(frozen=True, slots=True, eq=False)
+class CandidatesMatrix(UserCandidates):
+    """
+    Per-user restrictions of items given explicitly for every user.
+
+    Parameters
+    ----------
+    matrix : csr_matrix
+        Matrix of allowed items with internal user ids as rows and internal item ids as columns.
+        Non-zero values mark items that can be recommended to user.
+        Users out of matrix rows can't get any recommendations.
+    """
+
+    matrix: sparse.csr_matrix = attr.ib()
+
+    @classmethod
+    def from_dataframe(
+        cls, candidates: pd.DataFrame, dataset: Dataset, assume_external_ids: bool = True
+    ) -> "CandidatesMatrix":
+        """
+        Create candidates from table of allowed user-item pairs.
+
+        Parameters
+        ----------
+        candidates : pd.DataFrame
+            Table with `Columns.User` and `Columns.Item` columns.
+            Pairs with users or items that are not in `dataset` are skipped.
+        dataset : Dataset
+            Dataset that will be used for recommendations.
+        assume_external_ids : bool, default ``True``
+            When ``True`` user and item ids are supposed to be external, internal otherwise.
+
+        Returns
+        -------
+        CandidatesMatrix
+        """
+        user_ids = _get_internal_ids(dataset.user_id_map, candidates[Columns.User].values, assume_external_ids)
+        item_ids = _get_internal_ids(dataset.item_id_map, candidates[Columns.Item].values, assume_external_ids)
+        known_mask = (user_ids >= 0) & (item_ids >= 0)
+        matrix = sparse.csr_matrix(
+            (np.ones(known_mask.sum(), dtype=np.float32), (user_ids[known_mask], item_ids[known_mask])),
+            shape=(dataset.user_id_map.size, dataset.item_id_map.size),
+        )
+        return cls(matrix)
+
+    def get_user_items(self, user_ids: InternalIdsArray, n_items: int) -> sparse.csr_matrix:
+        """Return matrix of items allowed for recommendations to given users."""
+        rows = np.where(user_ids < self.matrix.shape[0], user_ids, -1)
+        return _take_rows(self.matrix, rows, n_items)
+
+
+@attr.s(frozen=True, slots=True, eq=False)
+class GroupCandidates(UserCandidates):
+    """
+    Per-user restrictions of items given by user groups, e.g. regional catalogs.
+
+    Every user belongs to one group and can get recommendations only from items of this group.
+    Allowed items are stored once per group, not per user.
+
+    Parameters
+    ----------
+    user_groups : np.ndarray
+        Group index for every internal user id, ``-1`` for users without group.
+        Users without group and users out of array can't get any recommendations.
+    group_items : csr_matrix
+        Matrix of allowed items with group indices as rows and internal item ids as columns.
+    """
+
+    user_groups: np.ndarray = attr.ib()
+    group_items: sparse.csr_matrix = attr.ib()
+
+    @classmethod
+    def from_dataframes(
+        cls,
+        user_groups: pd.DataFrame,
+        group_items: pd.DataFrame,
+        dataset: Dataset,
+        assume_external_ids: bool = True,
+    ) -> "GroupCandidates":
+        """
+        Create candidates from tables of user groups and group items.
+
+        Parameters
+        ----------
+        user_groups : pd.DataFrame
+            Table with `Columns.User` and ``"group"`` columns, every user must be present only once.
+            Users that are not in `dataset` are skipped.
+        group_items : pd.DataFrame
+            Table with ``"group"`` and `Columns.Item` columns.
+            Items that are not in `dataset` are skipped.
+        dataset : Dataset
+            Dataset that will be used for recommendations.
+        assume_external_ids : bool, default ``True``
+            When ``True`` user and item ids are supposed to be external, internal otherwise.
+
+        Returns
+        -------
+        GroupCandidates
+
+        Raises
+        ------
+        ValueError
+            If some user is present in `user_groups` more than once.
+        """
+        if user_groups[Columns.User].duplicated().any():
+            raise ValueError("Every user must belong to only one group")
+
+        groups = pd.Index(pd.unique(group_items[GROUP_COL]))
+        item_ids = _get_internal_ids(dataset.item_id_map, group_items[Columns.Item].values, assume_external_ids)
+        item_group_ids = groups.get_indexer(group_items[GROUP_COL])
+        known_mask = item_ids >= 0
+        group_items_matrix = sparse.csr_matrix(
+            (np.ones(known_mask.sum(), dtype=np.float32), (item_group_ids[known_mask], item_ids[known_mask])),
+            shape=(len(groups), dataset.item_id_map.size),
+        )
+
+        user_ids = _get_internal_ids(dataset.user_id_map, user_groups[Columns.User].values, assume_external_ids)
+        known_mask = user_ids >= 0
+        user_groups_arr = np.full(dataset.user_id_map.size, -1, dtype=np.int64)
+        # Groups without items get -1 as well
+        user_groups_arr[user_ids[known_mask]] = groups.get_indexer(user_groups[GROUP_COL].values[known_mask])
+        return cls(user_groups_arr, group_items_matrix)
+
+    def get_user_items(self, user_ids: InternalIdsArray, n_items: int) -> sparse.csr_matrix:
+        """Return matrix of items allowed for recommendations to given users."""
+        return _take_rows(self.group_items, self._get_groups(user_ids), n_items)
+
+    def get_user_groups(self, user_ids: InternalIdsArray) -> tp.Optional[tp.Tuple[np.ndarray, sparse.csr_matrix]]:
+        """Return group index for every user and matrix of allowed items of groups."""
+        return self._get_groups(user_ids), self.group_items
+
+    def _get_groups(self, user_ids: InternalIdsArray) -> np.ndarray:
+        user_groups = np.full(user_ids.size, -1, dtype=np.int64)
+        known_mask = user_ids < self.user_groups.size
+        user_groups[known_mask] = self.user_groups[user_ids[known_mask]]
+        return user_groups
@@ -38,6 +38,7 @@ from torch.utils.data import Dataset as TorchDataset
 from ..dataset.dataset import Dataset
 from ..dataset.torch_datasets import ItemFeaturesDataset, UserFeaturesDataset
 from ..exceptions import NotFittedError
+from ..types import InternalIdsArray
 from .rank import Distance
 from .vector import Factors, VectorModel
 
@@ -243,6 +244,8 @@ class DSSMModel(VectorModel):
         Which loggers to use. For instance, `pytorch_lightning.loggers.TensorboardLogger`, etc.
     verbose : int, default 0
         Verbosity level (applies only to recommend loop).
+    **kwargs
+        Recommendation settings of `VectorModel`, e.g. `recommend_batch_size` or `recommend_backend`.
     """
 
     u2i_dist = Distance.EUCLIDEAN
@@ -261,8 +264,9 @@ class DSSMModel(VectorModel):
         callbacks: tp.Optional[tp.Union[tp.List[Callback], Callback]] = None,
         loggers: tp.Union[Logger, tp.Iterable[Logger], bool] = True,
         verbose: int = 0,
+        **kwargs: tp.Any,
     ) -> None:
-        super().__init__(verbose=verbose)
+        super().__init__(verbose=verbose, **kwargs)
         self.model: tp.Optional[DSSM]
         self._model = model
         self.max_epochs = max_epochs
@@ -331,6 +335,23 @@ class DSSMModel(VectorModel):
         vectors = self.model.inference_users(dataloader)  # type: ignore
         return Factors(vectors)
 
+    def _get_users_factors_by_ids(self, dataset: Dataset, user_ids: InternalIdsArray) -> Factors:
+        if dataset.user_features is None:
+            raise AttributeError("User features attribute of dataset could not be None")
+        # Only rows of requested users are passed to the user tower
+        users_dataset = UserFeaturesDataset(
+            dataset.user_features.take(user_ids).get_sparse(),
+            dataset.get_user_item_matrix()[user_ids],
+        )
+        dataloader = DataLoader(
+            users_dataset,
+            batch_size=self.batch_size,
+            num_workers=self.dataloader_num_workers,
+            shuffle=False,
+        )
+        vectors = self.model.inference_users(dataloader)  # type: ignore
+        return Factors(vectors)
+
     def _get_items_factors(self, dataset: Dataset) -> Factors:
         dataloader = DataLoader(
             ItemFeaturesDataset.from_dataset(dataset),
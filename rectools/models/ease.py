@@ -24,6 +24,7 @@ from rectools.dataset import Dataset
 from rectools.types import InternalIdsArray
 
 from .base import ModelBase, Scores
+from .candidates import UserCandidates
 from .rank import Distance, ImplicitRanker
 
 
@@ -46,8 +47,15 @@ class EASEModel(ModelBase):
         Degree of verbose output. If 0, no output will be provided.
     num_threads: int, default 1
         Number of threads used for `recommend` method.
+    recommend_batch_size : int, optional, default ``None``
+        Number of users ranked at once in `recommend` method.
+        Smaller values reduce peak memory usage for big batches of users.
+        If ``None``, all users are ranked at once.
     """
 
+    supports_items_to_exclude = True
+    supports_candidates = True
+
     u2i_dist = Distance.DOT
 
     def __init__(
@@ -55,11 +63,13 @@ class EASEModel(ModelBase):
         regularization: float = 500.0,
         num_threads: int = 1,
         verbose: int = 0,
+        recommend_batch_size: tp.Optional[int] = None,
     ):
         super().__init__(verbose=verbose)
         self.weight: np.ndarray
         self.regularization = regularization
         self.num_threads = num_threads
+        self.recommend_batch_size = recommend_batch_size
 
     def _fit(self, dataset: Dataset) -> None:  # type: ignore
         ui_csr = dataset.get_user_item_matrix(include_weights=True)
@@ -80,6 +90,8 @@ class EASEModel(ModelBase):
         k: int,
         filter_viewed: bool,
         sorted_item_ids_to_recommend: tp.Optional[InternalIdsArray],
+        sorted_item_ids_to_exclude: tp.Optional[InternalIdsArray] = None,
+        user_candidates: tp.Optional[UserCandidates] = None,
     ) -> tp.Tuple[InternalIds, InternalIds, Scores]:
         user_items = dataset.get_user_item_matrix(include_weights=True)
 
@@ -96,6 +108,9 @@ class EASEModel(ModelBase):
             filter_pairs_csr=ui_csr_for_filter,
             sorted_object_whitelist=sorted_item_ids_to_recommend,
             num_threads=self.num_threads,
+            batch_size=self.recommend_batch_size,
+            sorted_object_blacklist=sorted_item_ids_to_exclude,
+            subject_candidates=user_candidates,
         )
 
         return all_user_ids, all_reco_ids, all_scores
@@ -106,12 +121,20 @@ class EASEModel(ModelBase):
         dataset: Dataset,
         k: int,
         sorted_item_ids_to_recommend: tp.Optional[InternalIdsArray],
+        sorted_item_ids_to_exclude: tp.Optional[InternalIdsArray] = None,
     ) -> tp.Tuple[InternalIds, InternalIds, Scores]:
         similarity = self.weight[target_ids]
+        n_excluded = 0
         if sorted_item_ids_to_recommend is not None:
             similarity = similarity[:, sorted_item_ids_to_recommend]
-
-        n_reco = min(k, similarity.shape[1])
+        elif sorted_item_ids_to_exclude is not None:
+            # Excluded items get the lowest scores and are cut off by `n_reco`
+            similarity[:, sorted_item_ids_to_exclude] = -np.inf
+            n_excluded = sorted_item_ids_to_exclude.size
+
+        n_reco = min(k, similarity.shape[1] - n_excluded)
+        if n_reco == 0:
+            return np.array([], dtype=target_ids.dtype), np.array([], dtype=np.int64), np.array([], dtype=np.float32)
         unsorted_reco_positions = similarity.argpartition(-n_reco, axis=1)[:, -n_reco:]
         unsorted_reco_scores = np.take_along_axis(similarity, unsorted_reco_positions, axis=1)
 
@@ -50,13 +50,22 @@ class ImplicitALSWrapperModel(VectorModel):
         Whether fit explicit features together with latent features or not.
         Used only if explicit features are present in dataset.
         See documentations linked above for details.
+    **kwargs
+        Recommendation settings of `VectorModel`, e.g. `recommend_batch_size` or `recommend_backend`.
     """
 
     u2i_dist = Distance.DOT
     i2i_dist = Distance.COSINE
-
-    def __init__(self, model: AnyAlternatingLeastSquares, verbose: int = 0, fit_features_together: bool = False):
-        super().__init__(verbose=verbose)
+    factors_depend_on_dataset = False
+
+    def __init__(
+        self,
+        model: AnyAlternatingLeastSquares,
+        verbose: int = 0,
+        fit_features_together: bool = False,
+        **kwargs: tp.Any,
+    ):
+        super().__init__(verbose=verbose, **kwargs)
 
         self.model: AnyAlternatingLeastSquares
         self._model = model  # for refit; TODO: try to do it better
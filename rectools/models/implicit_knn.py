@@ -12,9 +12,12 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import os
 import typing as tp
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
+from functools import partial
 
 import numpy as np
 from implicit.nearest_neighbours import ItemItemRecommender
@@ -28,7 +31,12 @@ from rectools.types import InternalId, InternalIdsArray
 from rectools.utils import fast_isin_for_sorted_test_elements
 
 from .base import ModelBase, Scores
-from .utils import get_viewed_item_ids, recommend_from_scores
+from .utils import (
+    get_descending_scores_order_in_rows,
+    get_first_k_in_rows_mask,
+    get_stored_pairs_mask,
+    recommend_from_scores,
+)
 
 
 class ImplicitItemKNNWrapperModel(ModelBase):
@@ -45,6 +53,9 @@ class ImplicitItemKNNWrapperModel(ModelBase):
         Degree of verbose output. If 0, no output will be provided.
     """
 
+    supports_items_to_exclude = True
+    recommend_batch_size: tp.Optional[int] = 10_000  # Number of users scored at once, all at once if ``None``
+
     def __init__(self, model: ItemItemRecommender, verbose: int = 0):
         super().__init__(verbose=verbose)
         self.model: ItemItemRecommender
@@ -65,59 +76,75 @@ class ImplicitItemKNNWrapperModel(ModelBase):
         k: int,
         filter_viewed: bool,
         sorted_item_ids_to_recommend: tp.Optional[InternalIdsArray],
+        sorted_item_ids_to_exclude: tp.Optional[InternalIdsArray] = None,
     ) -> tp.Tuple[InternalIds, InternalIds, Scores]:
         user_items = dataset.get_user_item_matrix(include_weights=True)
-
-        all_user_ids = []
-        all_reco_ids: tp.List[int] = []
-        all_scores: tp.List[float] = []
-        for user_id in tqdm(user_ids, disable=self.verbose == 0):
-            reco_ids, reco_scores = self._recommend_for_user(
-                user_id,
-                user_items,
-                k,
-                filter_viewed,
-                sorted_item_ids_to_recommend,
+        is_item_allowed = self._get_allowed_items_mask(
+            user_items.shape[1], sorted_item_ids_to_recommend, sorted_item_ids_to_exclude
+        )
+
+        batch_size = self.recommend_batch_size or max(user_ids.size, 1)
+        batches = [user_ids[start : start + batch_size] for start in range(0, user_ids.size, batch_size)]
+        recommend_for_users = partial(
+            self._recommend_for_users,
+            user_items=user_items,
+            k=k,
+            filter_viewed=filter_viewed,
+            is_item_allowed=is_item_allowed,
+        )
+        # Sparse matrix products release GIL, so batches are scored in parallel threads
+        with ThreadPoolExecutor(max_workers=self.model.num_threads or os.cpu_count() or 1) as executor:
+            parts = list(
+                tqdm(executor.map(recommend_for_users, batches), total=len(batches), disable=self.verbose == 0)
             )
-            all_user_ids.extend([user_id] * len(reco_ids))
-            all_reco_ids.extend(reco_ids)
-            all_scores.extend(reco_scores)
-
+        if not parts:
+            return user_ids[:0], np.zeros(0, dtype=user_ids.dtype), np.zeros(0, dtype=self.model.similarity.dtype)
+        all_user_ids, all_reco_ids, all_scores = (np.concatenate(part) for part in zip(*parts))
         return all_user_ids, all_reco_ids, all_scores
 
-    def _recommend_for_user(
+    @staticmethod
+    def _get_allowed_items_mask(
+        n_items: int,
+        sorted_item_ids_to_recommend: tp.Optional[InternalIdsArray],
+        sorted_item_ids_to_exclude: tp.Optional[InternalIdsArray],
+    ) -> tp.Optional[np.ndarray]:
+        """Return mask of items that can be recommended or ``None`` if all items can be recommended."""
+        if sorted_item_ids_to_recommend is None and sorted_item_ids_to_exclude is None:
+            return None
+        if sorted_item_ids_to_recommend is not None:
+            is_item_allowed: np.ndarray = np.zeros(n_items, dtype=bool)
+            is_item_allowed[sorted_item_ids_to_recommend] = True
+        else:
+            is_item_allowed = np.ones(n_items, dtype=bool)
+        if sorted_item_ids_to_exclude is not None:
+            is_item_allowed[sorted_item_ids_to_exclude] = False
+        return is_item_allowed
+
+    def _recommend_for_users(
         self,
-        user_id: InternalId,
+        user_ids: InternalIdsArray,
         user_items: sparse.csr_matrix,
         k: int,
         filter_viewed: bool,
-        sorted_item_ids: tp.Optional[InternalIdsArray],
-    ) -> tp.Tuple[InternalIds, Scores]:
+        is_item_allowed: tp.Optional[np.ndarray],
+    ) -> tp.Tuple[InternalIdsArray, InternalIdsArray, np.ndarray]:
+        """Select top `k` items by scores of items similar to items of users, only scored items are recommended."""
+        viewed = user_items[user_ids]
+        scores = sparse.csr_matrix(viewed @ self.model.similarity)
+        # Items with equal scores are recommended in order of ids
+        scores.sort_indices()
+        rows = np.repeat(np.arange(user_ids.size), np.diff(scores.indptr))
+        reco_ids, reco_scores = scores.indices, scores.data
+
+        is_valid = is_item_allowed[reco_ids] if is_item_allowed is not None else np.ones(reco_ids.size, dtype=bool)
         if filter_viewed:
-            viewed_ids = get_viewed_item_ids(user_items, user_id)  # sorted
-        else:
-            viewed_ids = np.array([], dtype=int)
-
-        # Set filter_already_liked_items=False because if there are not enough reco it uses already liked
-        # even if filter_already_liked_items=True
-        if sorted_item_ids is not None:
-            sorted_filtered_item_ids = sorted_item_ids[~fast_isin_for_sorted_test_elements(sorted_item_ids, viewed_ids)]
-            n_items = user_items.shape[1]
-            reco, scores = self.model.recommend(
-                user_id, user_items[user_id], N=n_items, filter_already_liked_items=False
-            )
-            valid_items_mask = fast_isin_for_sorted_test_elements(reco, sorted_filtered_item_ids)
-
-        else:
-            n_items = k + viewed_ids.size
-            reco, scores = self.model.recommend(
-                user_id, user_items[user_id], N=n_items, filter_already_liked_items=False
-            )
-            valid_items_mask = fast_isin_for_sorted_test_elements(reco, viewed_ids, invert=True)
+            is_valid &= ~get_stored_pairs_mask(viewed, rows, reco_ids)
+        rows, reco_ids, reco_scores = rows[is_valid], reco_ids[is_valid], reco_scores[is_valid]
 
-        reco = reco[valid_items_mask][:k]
-        scores = scores[valid_items_mask][:k]
-        return reco, scores
+        order = get_descending_scores_order_in_rows(rows, reco_scores)
+        rows, reco_ids, reco_scores = rows[order], reco_ids[order], reco_scores[order]
+        is_top = get_first_k_in_rows_mask(rows, np.ones(rows.size, dtype=bool), k)
+        return user_ids[rows[is_top]], reco_ids[is_top], reco_scores[is_top]
 
     def _recommend_i2i(
         self,
@@ -125,6 +152,7 @@ class ImplicitItemKNNWrapperModel(ModelBase):
         dataset: Dataset,
         k: int,
         sorted_item_ids_to_recommend: tp.Optional[InternalIdsArray],
+        sorted_item_ids_to_exclude: tp.Optional[InternalIdsArray] = None,
     ) -> tp.Tuple[InternalIds, InternalIds, Scores]:
         similarity = self.model.similarity
         if sorted_item_ids_to_recommend is not None:
@@ -138,6 +166,7 @@ class ImplicitItemKNNWrapperModel(ModelBase):
                 similarity=similarity,
                 target_id=target_id,
                 k=k,
+                sorted_item_ids_to_exclude=sorted_item_ids_to_exclude,
             )
             all_target_ids.extend([target_id] * len(reco_ids))
             all_reco_ids.append(reco_ids)
@@ -155,10 +184,15 @@ class ImplicitItemKNNWrapperModel(ModelBase):
         similarity: sparse.csr_matrix,
         target_id: InternalId,
         k: int,
+        sorted_item_ids_to_exclude: tp.Optional[InternalIdsArray] = None,
     ) -> tp.Tuple[np.ndarray, np.ndarray]:
         slice_ = slice(similarity.indptr[target_id], similarity.indptr[target_id + 1])
         similar_item_ids = similarity.indices[slice_]
         similar_item_scores = similarity.data[slice_]
+        if sorted_item_ids_to_exclude is not None:
+            valid_mask = fast_isin_for_sorted_test_elements(similar_item_ids, sorted_item_ids_to_exclude, invert=True)
+            similar_item_ids = similar_item_ids[valid_mask]
+            similar_item_scores = similar_item_scores[valid_mask]
         reco_similar_ids, reco_scores = recommend_from_scores(similar_item_scores, k=k)
         reco_ids = similar_item_ids[reco_similar_ids]
         return reco_ids, reco_scores
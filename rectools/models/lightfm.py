@@ -21,6 +21,7 @@ from scipy import sparse
 
 from rectools.dataset import Dataset, Features
 from rectools.exceptions import NotFittedError
+from rectools.types import InternalIdsArray
 
 from .rank import Distance
 from .vector import Factors, VectorModel
@@ -46,6 +47,8 @@ class LightFMWrapperModel(VectorModel):
         Will be used as `num_threads` parameter for `LightFM.fit`.
     verbose : int, default 0
         Degree of verbose output. If 0, no output will be provided.
+    **kwargs
+        Recommendation settings of `VectorModel`, e.g. `recommend_batch_size` or `recommend_backend`.
     """
 
     u2i_dist = Distance.DOT
@@ -57,8 +60,9 @@ class LightFMWrapperModel(VectorModel):
         epochs: int = 1,
         num_threads: int = 1,
         verbose: int = 0,
+        **kwargs: tp.Any,
     ):
-        super().__init__(verbose=verbose)
+        super().__init__(verbose=verbose, **kwargs)
 
         self.model: LightFM
         self._model = model
@@ -83,18 +87,22 @@ class LightFMWrapperModel(VectorModel):
         )
 
     @staticmethod
-    def _prepare_features(features: tp.Optional[Features]) -> tp.Optional[sparse.csr_matrix]:
+    def _prepare_features(
+        features: tp.Optional[Features], ids: tp.Optional[InternalIdsArray] = None
+    ) -> tp.Optional[sparse.csr_matrix]:
         if features is None:
             return None
 
-        features_csr = features.get_sparse()
-        features_csr = sparse.hstack(
-            (
-                sparse.identity(features_csr.shape[0], dtype="float32", format="csr"),
-                features_csr,
-            ),
-            format="csr",
-        )
+        if ids is None:
+            features_csr = features.get_sparse()
+            identity = sparse.identity(features_csr.shape[0], dtype="float32", format="csr")
+        else:
+            # Rows of identity and features matrices only for given ids
+            features_csr = features.take(ids).get_sparse()
+            identity = sparse.csr_matrix(
+                (np.ones(ids.size, dtype="float32"), ids, np.arange(ids.size + 1)), shape=(ids.size, len(features))
+            )
+        features_csr = sparse.hstack((identity, features_csr), format="csr")
         return features_csr
 
     def _get_users_factors(self, dataset: Dataset) -> Factors:
@@ -102,6 +110,13 @@ class LightFMWrapperModel(VectorModel):
         user_biases, user_embeddings = self.model.get_user_representations(user_features)
         return Factors(user_embeddings, user_biases)
 
+    def _get_users_factors_by_ids(self, dataset: Dataset, user_ids: InternalIdsArray) -> Factors:
+        if dataset.user_features is None:
+            return Factors(self.model.user_embeddings[user_ids], self.model.user_biases[user_ids])
+        user_features = self._prepare_features(dataset.user_features, user_ids)
+        user_biases, user_embeddings = self.model.get_user_representations(user_features)
+        return Factors(user_embeddings, user_biases)
+
     def _get_items_factors(self, dataset: Dataset) -> Factors:
         item_features = self._prepare_features(dataset.item_features)
         item_biases, item_embeddings = self.model.get_item_representations(item_features)
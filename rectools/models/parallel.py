@@ -0,0 +1,214 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Recommendations in several processes with users split into shards."""
+
+import os
+import pickle
+import typing as tp
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.context import BaseContext
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pandas as pd
+
+from rectools import AnyIds
+from rectools.dataset import Dataset
+from rectools.dataset.compact_identifiers import PathLike
+
+from .base import ModelBase
+from .candidates import UserCandidates, _get_internal_ids
+
+MODEL_FILE = "model.pkl"
+BUFFER_FILE_TEMPLATE = "buffer_{}.bin"
+DATASET_FOLDER = "dataset"
+
+_worker_state: tp.Dict[str, tp.Any] = {}
+
+
+def save_model_for_mmap(model: ModelBase, folder_name: PathLike) -> None:
+    """
+    Pickle model to folder so that its arrays can be memory-mapped on loading with `load_model_with_mmap`.
+
+    Contiguous numpy arrays are written to separate raw files (out-of-band pickle buffers, protocol 5),
+    the rest of the model is pickled as usual.
+    Before python 3.8 the whole model is pickled to one file.
+
+    Parameters
+    ----------
+    model : ModelBase
+        Model to save.
+    folder_name : str | Path
+        Destination folder, it's created if it doesn't exist.
+    """
+    folder = Path(folder_name)
+    folder.mkdir(parents=True, exist_ok=True)
+    if pickle.HIGHEST_PROTOCOL < 5:  # pragma: no cover
+        with open(folder / MODEL_FILE, "wb") as f:
+            pickle.dump(model, f)
+        return
+
+    buffers: tp.List[tp.Any] = []
+    with open(folder / MODEL_FILE, "wb") as f:
+        pickle.dump(model, f, protocol=5, buffer_callback=buffers.append)
+    for i, buffer in enumerate(buffers):
+        with open(folder / BUFFER_FILE_TEMPLATE.format(i), "wb") as f:
+            f.write(buffer.raw())
+
+
+def load_model_with_mmap(folder_name: PathLike) -> ModelBase:
+    """
+    Load model saved with `save_model_for_mmap` memory-mapping its arrays.
+
+    Arrays are mapped in copy-on-write mode: they are shared between processes through the page cache
+    until some process modifies them. Load only models from trusted sources.
+
+    Parameters
+    ----------
+    folder_name : str | Path
+        Folder where model was saved.
+
+    Returns
+    -------
+    ModelBase
+    """
+    folder = Path(folder_name)
+    buffers: tp.List[tp.Any] = []
+    while (folder / BUFFER_FILE_TEMPLATE.format(len(buffers))).exists():
+        path = folder / BUFFER_FILE_TEMPLATE.format(len(buffers))
+        # Empty files can't be memory-mapped
+        buffers.append(np.memmap(path, mode="c") if path.stat().st_size > 0 else bytearray())
+    with open(folder / MODEL_FILE, "rb") as f:
+        if buffers:
+            return pickle.load(f, buffers=buffers)  # nosec
+        return pickle.load(f)  # nosec
+
+
+def _init_worker(folder: Path, recommend_kwargs: tp.Dict[str, tp.Any]) -> None:
+    _worker_state["model"] = load_model_with_mmap(folder)
+    _worker_state["dataset"] = Dataset.load(folder / DATASET_FOLDER, mmap=True)
+    _worker_state["recommend_kwargs"] = recommend_kwargs
+
+
+def _recommend_shard(users: np.ndarray) -> pd.DataFrame:
+    return _worker_state["model"].recommend(users, _worker_state["dataset"], **_worker_state["recommend_kwargs"])
+
+
+def _order_users_by_hot_warm_cold(users: AnyIds, dataset: Dataset, assume_external_ids: bool) -> np.ndarray:
+    """Reorder users like `ModelBase.recommend` returns them: hot first, then warm, then cold."""
+    users = np.asarray(users)
+    if not assume_external_ids:
+        users = ModelBase._ensure_internal_ids_valid(users)  # pylint: disable=protected-access
+    user_ids = _get_internal_ids(dataset.user_id_map, users, assume_external_ids)
+    groups = np.where(user_ids < 0, 2, (user_ids >= dataset.n_hot_users).astype(np.int64))
+    return users[np.argsort(groups, kind="stable")]
+
+
+def recommend_parallel(
+    model: ModelBase,
+    users: AnyIds,
+    dataset: Dataset,
+    k: int,
+    filter_viewed: bool,
+    items_to_recommend: tp.Optional[AnyIds] = None,
+    add_rank_col: bool = True,
+    assume_external_ids: bool = True,
+    items_to_exclude: tp.Optional[AnyIds] = None,
+    candidates: tp.Optional[UserCandidates] = None,
+    n_jobs: tp.Optional[int] = None,
+    shard_size: tp.Optional[int] = None,
+    mp_context: tp.Optional[BaseContext] = None,
+    tmp_dir: tp.Optional[PathLike] = None,
+) -> pd.DataFrame:
+    """
+    Recommend items for users in several processes, see `ModelBase.recommend` for parameters description.
+
+    Users are split into shards that are recommended in worker processes.
+    Model and dataset are saved once to a temporary folder and every worker memory-maps their arrays,
+    so they are not copied to every worker and every shard. Shard results are merged in order,
+    so the result is the same as `model.recommend` returns for models with per-user deterministic output.
+
+    Models rank users with their own threads (e.g. `n_threads` of vector models),
+    it's better to use one thread per process when many processes are used.
+
+    Parameters
+    ----------
+    model : ModelBase
+        Fitted model.
+    users, dataset, k, filter_viewed, items_to_recommend, add_rank_col, assume_external_ids,
+    items_to_exclude, candidates
+        The same as in `ModelBase.recommend`.
+    n_jobs : int, optional, default ``None``
+        Number of worker processes, number of CPUs if ``None``.
+    shard_size : int, optional, default ``None``
+        Number of users in one shard. If ``None`` users are split into ``4 * n_jobs`` shards.
+    mp_context : multiprocessing context, optional, default ``None``
+        Context used to start worker processes, default context of the platform if ``None``.
+    tmp_dir : str | Path, optional, default ``None``
+        Directory for temporary files of model and dataset, system default if ``None``.
+        It should be on a local (preferably in-memory) filesystem.
+
+    Returns
+    -------
+    pd.DataFrame
+        Recommendations table in the same format as `ModelBase.recommend` returns.
+
+    Raises
+    ------
+    NotFittedError
+        If called for not fitted model.
+    ValueError
+        If `n_jobs` or `shard_size` is not positive or some arguments are invalid for `ModelBase.recommend`.
+    """
+    model._check_is_fitted()  # pylint: disable=protected-access
+    model._check_k(k)  # pylint: disable=protected-access
+    n_jobs = n_jobs if n_jobs is not None else (os.cpu_count() or 1)
+    if n_jobs < 1:
+        raise ValueError("`n_jobs` must be positive")
+    if shard_size is not None and shard_size < 1:
+        raise ValueError("`shard_size` must be positive")
+
+    users = _order_users_by_hot_warm_cold(users, dataset, assume_external_ids)
+    if shard_size is None:
+        shard_size = max(-(-users.size // (4 * n_jobs)), 1)
+    shards = [users[start : start + shard_size] for start in range(0, users.size, shard_size)]
+    recommend_kwargs: tp.Dict[str, tp.Any] = {
+        "k": k,
+        "filter_viewed": filter_viewed,
+        "items_to_recommend": items_to_recommend,
+        "add_rank_col": add_rank_col,
+        "assume_external_ids": assume_external_ids,
+        "items_to_exclude": items_to_exclude,
+        "candidates": candidates,
+    }
+    if n_jobs == 1 or len(shards) <= 1:
+        return model.recommend(users, dataset, **recommend_kwargs)
+
+    with TemporaryDirectory(dir=tmp_dir) as folder_name:
+        folder = Path(folder_name)
+        save_model_for_mmap(model, folder)
+        dataset.save(folder / DATASET_FOLDER)
+        with ProcessPoolExecutor(
+            max_workers=min(n_jobs, len(shards)),
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(folder, recommend_kwargs),
+        ) as executor:
+            parts = list(executor.map(_recommend_shard, shards))
+
+    # Empty tables of shards without recommendations may have other dtypes
+    non_empty_parts = [part for part in parts if len(part) > 0]
+    return pd.concat(non_empty_parts or parts[:1], ignore_index=True)
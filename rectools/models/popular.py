@@ -20,15 +20,17 @@ from enum import Enum
 
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from tqdm.auto import tqdm
 
 from rectools import Columns, InternalIds
-from rectools.dataset import Dataset
+from rectools.dataset import Dataset, Interactions
 from rectools.types import InternalIdsArray
 from rectools.utils import fast_isin_for_sorted_test_elements
 
 from .base import ModelBase, Scores, ScoresArray
-from .utils import get_viewed_item_ids
+from .candidates import UserCandidates
+from .utils import get_first_k_in_rows_mask, get_stored_pairs_mask
 
 
 class Popularity(Enum):
@@ -73,6 +75,10 @@ class PopularModel(ModelBase):
         Degree of verbose output. If ``0``, no output will be provided.
     """
 
+    supports_items_to_exclude = True
+    supports_candidates = True
+    recommend_batch_size: tp.Optional[int] = 100_000  # Number of users processed at once, all at once if ``None``
+
     def __init__(
         self,
         popularity: str = "n_users",
@@ -100,22 +106,28 @@ class PopularModel(ModelBase):
 
         self.popularity_list: tp.Tuple[InternalIdsArray, ScoresArray]
 
-    def _filter_interactions(self, interactions: pd.DataFrame) -> pd.DataFrame:
+    def _filter_interactions(self, interactions: Interactions) -> pd.DataFrame:
+        df = interactions.df
         if self.begin_from is not None:
-            interactions = interactions.loc[interactions[Columns.Datetime] >= self.begin_from]
+            df = df.loc[df[Columns.Datetime] >= interactions.convert_datetime(self.begin_from)]
         elif self.period is not None:
-            begin_from = interactions[Columns.Datetime].max() - self.period
-            interactions = interactions.loc[interactions[Columns.Datetime] >= begin_from]
-        return interactions
+            begin_from = interactions.time_range[1] - self.period
+            df = df.loc[df[Columns.Datetime] >= interactions.convert_datetime(begin_from)]
+        return df
 
     def _fit(self, dataset: Dataset) -> None:  # type: ignore
-        interactions = self._filter_interactions(dataset.interactions.df)
+        interactions = self._filter_interactions(dataset.interactions)
 
         col, func = self._get_groupby_col_and_agg_func(self.popularity)
         items_scores = interactions.groupby(Columns.Item)[col].agg(func).sort_values(ascending=False)
-        items = items_scores.index.values
-        scores = items_scores.values.astype(float)
+        self.popularity_list = self._get_popularity_list(
+            items_scores.index.values, items_scores.values.astype(float), dataset
+        )
 
+    def _get_popularity_list(
+        self, items: InternalIdsArray, scores: ScoresArray, dataset: Dataset
+    ) -> tp.Tuple[InternalIdsArray, ScoresArray]:
+        """Make popularity list from items sorted by popularity, add cold items and reverse order if needed."""
         if self.add_cold:  # pragma: no cover  # TODO: remove when added support for warm and cold
             cold_items = np.setdiff1d(dataset.item_id_map.internal_ids, items)
             items = np.concatenate((items, cold_items))
@@ -125,7 +137,7 @@ class PopularModel(ModelBase):
             items = items[::-1]
             scores = scores[::-1]
 
-        self.popularity_list = (items, scores)
+        return items, scores
 
     @classmethod
     def _get_groupby_col_and_agg_func(cls, popularity: Popularity) -> tp.Tuple[str, str]:
@@ -146,52 +158,87 @@ class PopularModel(ModelBase):
         k: int,
         filter_viewed: bool,
         sorted_item_ids_to_recommend: tp.Optional[InternalIdsArray],
+        sorted_item_ids_to_exclude: tp.Optional[InternalIdsArray] = None,
+        user_candidates: tp.Optional[UserCandidates] = None,
     ) -> tp.Tuple[InternalIds, InternalIds, Scores]:
+        popularity_list = self._filter_popularity_list(
+            self.popularity_list, sorted_item_ids_to_recommend, sorted_item_ids_to_exclude
+        )
+        user_items = dataset.get_user_item_matrix(include_weights=False) if filter_viewed else None
+        # Position of every item in popularity list, -1 for items that are not in it
+        item_positions: np.ndarray = np.full(dataset.item_id_map.size, -1, dtype=np.int64)
+        item_positions[popularity_list[0]] = np.arange(popularity_list[0].size)
+
+        batch_size = self.recommend_batch_size or max(user_ids.size, 1)
+        parts = [
+            self._recommend_for_users(
+                user_ids[start : start + batch_size],
+                k,
+                popularity_list,
+                item_positions,
+                user_items,
+                user_candidates,
+            )
+            for start in tqdm(range(0, user_ids.size, batch_size), disable=self.verbose == 0)
+        ]
+        if not parts:
+            return user_ids[:0], popularity_list[0][:0], popularity_list[1][:0]
+        all_user_ids, all_reco_ids, all_scores = (np.concatenate(part) for part in zip(*parts))
+        return all_user_ids, all_reco_ids, all_scores
+
+    @staticmethod
+    def _filter_popularity_list(
+        popularity_list: tp.Tuple[InternalIdsArray, ScoresArray],
+        sorted_item_ids_to_recommend: tp.Optional[InternalIdsArray],
+        sorted_item_ids_to_exclude: tp.Optional[InternalIdsArray],
+    ) -> tp.Tuple[InternalIdsArray, ScoresArray]:
+        """Leave only whitelisted or not excluded items in popularity list."""
         if sorted_item_ids_to_recommend is not None:
-            valid_items_mask = fast_isin_for_sorted_test_elements(self.popularity_list[0], sorted_item_ids_to_recommend)
-            popularity_list = (self.popularity_list[0][valid_items_mask], self.popularity_list[1][valid_items_mask])
+            valid_items_mask = fast_isin_for_sorted_test_elements(popularity_list[0], sorted_item_ids_to_recommend)
+        elif sorted_item_ids_to_exclude is not None:
+            valid_items_mask = fast_isin_for_sorted_test_elements(
+                popularity_list[0], sorted_item_ids_to_exclude, invert=True
+            )
         else:
-            popularity_list = self.popularity_list
-
-        if filter_viewed:
-            user_items = dataset.get_user_item_matrix(include_weights=False)
-
-        all_user_ids = []
-        all_reco_ids: tp.List[int] = []
-        all_scores: tp.List[float] = []
-        for user_id in tqdm(user_ids, disable=self.verbose == 0):
-            if filter_viewed:
-                sorted_blacklist = get_viewed_item_ids(user_items, user_id)
-            else:
-                sorted_blacklist = None
-            reco_ids, reco_scores = self._recommend_for_user(k, popularity_list, sorted_blacklist)
-            all_user_ids.extend([user_id] * len(reco_ids))
-            all_reco_ids.extend(reco_ids)
-            all_scores.extend(reco_scores)
-
-        return all_user_ids, all_reco_ids, all_scores
+            return popularity_list
+        return popularity_list[0][valid_items_mask], popularity_list[1][valid_items_mask]
 
     @classmethod
-    def _recommend_for_user(
+    def _recommend_for_users(
         cls,
+        user_ids: InternalIdsArray,
         k: int,
         popularity_list: tp.Tuple[InternalIdsArray, ScoresArray],
-        sorted_blacklist: tp.Optional[InternalIdsArray],
-    ) -> tp.Tuple[InternalIds, Scores]:
-        if sorted_blacklist is not None:
-            n_items = k + sorted_blacklist.size
+        item_positions: np.ndarray,
+        user_items: tp.Optional[sparse.csr_matrix],
+        user_candidates: tp.Optional[UserCandidates],
+    ) -> tp.Tuple[InternalIdsArray, InternalIdsArray, ScoresArray]:
+        """Select first `k` items of popularity list that are allowed and not viewed for every user."""
+        viewed = user_items[user_ids] if user_items is not None else None
+        if user_candidates is not None:
+            # Allowed items of every user ordered by popularity
+            allowed = user_candidates.get_user_items(user_ids, item_positions.size)
+            rows = np.repeat(np.arange(user_ids.size), np.diff(allowed.indptr))
+            positions = item_positions[allowed.indices]
+            is_popular = positions >= 0
+            rows, positions = rows[is_popular], positions[is_popular]
+            order = np.lexsort((positions, rows))
+            rows, positions = rows[order], positions[order]
         else:
-            n_items = k
-
-        reco = popularity_list[0][:n_items]
-        scores = popularity_list[1][:n_items]
-
-        if sorted_blacklist is not None:
-            valid_mask = fast_isin_for_sorted_test_elements(reco, sorted_blacklist, invert=True)
-            reco = reco[valid_mask][:k]
-            scores = scores[valid_mask][:k]
-
-        return reco, scores
+            # Only first ``k + n_viewed`` items of popularity list can be recommended to user
+            n_viewed = np.diff(viewed.indptr) if viewed is not None else np.zeros(user_ids.size, dtype=np.int64)
+            n_candidates = np.minimum(k + n_viewed, popularity_list[0].size)
+            rows = np.repeat(np.arange(user_ids.size), n_candidates)
+            row_starts = np.cumsum(n_candidates) - n_candidates
+            positions = np.arange(rows.size) - np.repeat(row_starts, n_candidates)
+
+        reco_ids = popularity_list[0][positions]
+        if viewed is not None:
+            is_valid = ~get_stored_pairs_mask(viewed, rows, reco_ids)
+        else:
+            is_valid = np.ones(rows.size, dtype=bool)
+        is_valid = get_first_k_in_rows_mask(rows, is_valid, k)
+        return user_ids[rows[is_valid]], reco_ids[is_valid], popularity_list[1][positions[is_valid]]
 
     def _recommend_i2i(
         self,
@@ -199,6 +246,7 @@ class PopularModel(ModelBase):
         dataset: Dataset,
         k: int,
         sorted_item_ids_to_recommend: tp.Optional[InternalIdsArray],
+        sorted_item_ids_to_exclude: tp.Optional[InternalIdsArray] = None,
     ) -> tp.Tuple[InternalIds, InternalIds, Scores]:
         _, single_reco, single_scores = self._recommend_u2i(
             user_ids=dataset.user_id_map.internal_ids[:1],
@@ -206,6 +254,7 @@ class PopularModel(ModelBase):
             k=k,
             filter_viewed=False,
             sorted_item_ids_to_recommend=sorted_item_ids_to_recommend,
+            sorted_item_ids_to_exclude=sorted_item_ids_to_exclude,
         )
 
         n_targets = len(target_ids)
@@ -21,13 +21,17 @@ from enum import Enum
 
 import numpy as np
 import pandas as pd
+from scipy import sparse
+from tqdm.auto import tqdm
 
 from rectools import Columns, InternalIds
-from rectools.dataset import Dataset, Interactions, features
+from rectools.dataset import Dataset, features
 from rectools.types import InternalIdsArray
 
-from .base import Scores
+from .base import Scores, ScoresArray
+from .candidates import UserCandidates
 from .popular import PopularModel
+from .utils import get_first_k_in_rows_mask, get_positions_in_rows, get_stored_pairs_mask
 
 
 class MixingStrategy(Enum):
@@ -119,9 +123,9 @@ class PopularInCategoryModel(PopularModel):
 
         self.category_feature = category_feature
         self.category_columns: tp.List[int] = []
-        self.category_interactions: tp.Dict[int, pd.DataFrame] = {}
         self.category_scores: pd.Series
-        self.models: tp.Dict[int, PopularModel] = {}
+        # Popularity list of every category, keys are numbers of category columns in item features
+        self.category_popularity_lists: tp.Dict[int, tp.Tuple[InternalIdsArray, ScoresArray]] = {}
         self.n_effective_categories: int
 
         if n_categories is None or n_categories > 0:
@@ -149,24 +153,33 @@ class PopularInCategoryModel(PopularModel):
             )
         if not isinstance(dataset.item_features, features.SparseFeatures):
             raise TypeError("Only sparse features are supported for PopularInCategoryModel. ")
+        self.category_columns = []
         for num_col, (name, value) in enumerate(dataset.item_features.names):
             if name == self.category_feature and value != features.DIRECT_FEATURE_VALUE:
                 self.category_columns.append(num_col)
         if not self.category_columns:
             raise ValueError("`category_feature` must be present in `cat_item_features` when creating Dataset")
 
+    @staticmethod
+    def _get_category_items(dataset: Dataset, category_columns: tp.Sequence[int]) -> sparse.csr_matrix:
+        """Return matrix with nonzero values for items (rows) from given categories (columns)."""
+        category_items = sparse.csr_matrix(dataset.item_features.values[:, list(category_columns)])  # type: ignore
+        category_items.eliminate_zeros()
+        return category_items
+
     def _calc_category_scores(self, dataset: Dataset, interactions: pd.DataFrame) -> None:
-        scores_dict = {}
-        for column_num in self.category_columns:
-            item_idx = dataset.item_features.values.getcol(column_num).nonzero()[0]  # type: ignore
-            self.category_interactions[column_num] = interactions[interactions[Columns.Item].isin(item_idx)].copy()
-            # Category interactions might be empty
-            if self.category_interactions[column_num].shape[0] == 0:
-                self.category_columns.remove(column_num)
-            else:
-                col, func = self._get_groupby_col_and_agg_func(self.popularity)
-                scores_dict[column_num] = self.category_interactions[column_num][col].apply(func)
-        self.category_scores = pd.Series(scores_dict).sort_values(ascending=False)
+        # All categories are aggregated in one pass, interactions with items from several categories are repeated
+        interactions_categories = self._get_category_items(dataset, self.category_columns)[
+            interactions[Columns.Item].values
+        ]
+        rows = np.repeat(np.arange(len(interactions)), np.diff(interactions_categories.indptr))
+        col, func = self._get_groupby_col_and_agg_func(self.popularity)
+        scores = pd.Series(interactions[col].values[rows]).groupby(interactions_categories.indices).agg(func)
+
+        # Categories without interactions are dropped
+        category_columns = np.array(self.category_columns)[scores.index.values]
+        self.category_columns = category_columns.tolist()
+        self.category_scores = pd.Series(scores.values, index=category_columns).sort_values(ascending=False)
 
     def _define_categories_for_analysis(self) -> None:
         if self.n_categories:
@@ -184,22 +197,32 @@ class PopularInCategoryModel(PopularModel):
         else:
             self.n_effective_categories = len(self.category_columns)
 
+    def _calc_category_popularity_lists(self, dataset: Dataset, interactions: pd.DataFrame) -> None:
+        col, func = self._get_groupby_col_and_agg_func(self.popularity)
+        items_scores = interactions.groupby(Columns.Item)[col].agg(func).sort_values(ascending=False)
+        items, scores = items_scores.index.values, items_scores.values.astype(float)
+        item_positions: np.ndarray = np.full(dataset.item_id_map.size, -1, dtype=np.int64)
+        item_positions[items] = np.arange(items.size)
+
+        # Popularity list of category is the common popularity list with items of category only
+        category_columns = self.category_scores.index.tolist()
+        category_items = self._get_category_items(dataset, category_columns).tocsc()
+        self.category_popularity_lists = {}
+        for i, column_num in enumerate(category_columns):
+            positions = np.sort(
+                item_positions[category_items.indices[category_items.indptr[i] : category_items.indptr[i + 1]]]
+            )
+            positions = positions[positions >= 0]
+            self.category_popularity_lists[column_num] = self._get_popularity_list(
+                items[positions], scores[positions], dataset
+            )
+
     def _fit(self, dataset: Dataset) -> None:  # type: ignore
         self._check_category_feature(dataset)
-        interactions = self._filter_interactions(dataset.interactions.df)
+        interactions = self._filter_interactions(dataset.interactions)
         self._calc_category_scores(dataset, interactions)
         self._define_categories_for_analysis()
-
-        for column_num in self.category_columns:
-            category_model = PopularModel(
-                popularity=self.popularity.value, add_cold=self.add_cold, inverse=self.inverse
-            )
-            category_interactions = Interactions(self.category_interactions[column_num])
-            category_dataset = Dataset(
-                user_id_map=dataset.user_id_map, item_id_map=dataset.item_id_map, interactions=category_interactions
-            )
-            category_model.fit(category_dataset)
-            self.models[column_num] = category_model
+        self._calc_category_popularity_lists(dataset, interactions)
 
     def _get_num_recs_for_each_category(self, k: int) -> pd.Series:
         if self.ratio_strategy == RatioStrategy.PROPORTIONAL:
@@ -226,50 +249,6 @@ class PopularInCategoryModel(PopularModel):
             num_recs.iloc[:exceeding_recs] += 1
         return num_recs
 
-    def _get_full_recs_from_main_and_fallback(
-        self,
-        main_recs: tp.List[pd.DataFrame],
-        fallback_recs: tp.List[pd.DataFrame],
-        k: int,
-        user_ids: InternalIdsArray,
-    ) -> pd.DataFrame:
-        cat_recs = pd.concat(main_recs, sort=False)
-        cat_recs.drop_duplicates(subset=[Columns.User, Columns.Item], inplace=True)
-
-        num_recs_per_user = cat_recs[Columns.User].value_counts()
-        user_w_insufficient_recs = num_recs_per_user[num_recs_per_user < k].index
-
-        # Some users were not present in main_recs, but could be present in fallback_recs
-        # within cold categories (categories with num_recs = 0). They need to be added
-        # explicitly to receive recommendations
-        user_w_no_recs = np.setdiff1d(user_ids, num_recs_per_user.index)
-        user_w_insufficient_recs = np.union1d(user_w_insufficient_recs, user_w_no_recs)
-
-        sufficient_mask = ~cat_recs[Columns.User].isin(user_w_insufficient_recs)
-        sufficient_recs = cat_recs[sufficient_mask]
-        insufficient_recs = cat_recs[~sufficient_mask].copy()
-        insufficient_recs["is_main_rec"] = True
-
-        extra_recs = pd.concat(fallback_recs, sort=False)
-        extra_recs = extra_recs[extra_recs[Columns.User].isin(user_w_insufficient_recs)].copy()
-        extra_recs["is_main_rec"] = False
-
-        insufficient_recs = pd.concat([insufficient_recs, extra_recs], sort=False)
-        insufficient_recs.drop_duplicates(subset=[Columns.User, Columns.Item], inplace=True)
-
-        # Extra recommendations are given in a specific logic to guarantee that fallback recommendations
-        # never replace main recommendations in final result. And popular category doesn't dominate
-        # over other categories in fallback recs. Thus `rotate` mixing strategy is applied before getting
-        # k recs for each user.
-        insufficient_recs.sort_values(
-            by=[Columns.User, "is_main_rec", "category_rank", "category_priority"],
-            ascending=[True, False, True, True],
-            inplace=True,
-        )
-        insufficient_recs = insufficient_recs.groupby(Columns.User).head(k)
-        full_recs = pd.concat([sufficient_recs, insufficient_recs], sort=False)
-        return full_recs
-
     def _recommend_u2i(
         self,
         user_ids: InternalIdsArray,
@@ -277,40 +256,168 @@ class PopularInCategoryModel(PopularModel):
         k: int,
         filter_viewed: bool,
         sorted_item_ids_to_recommend: tp.Optional[InternalIdsArray],
+        sorted_item_ids_to_exclude: tp.Optional[InternalIdsArray] = None,
+        user_candidates: tp.Optional[UserCandidates] = None,
     ) -> tp.Tuple[InternalIds, InternalIds, Scores]:
         num_recs = self._get_num_recs_for_each_category(k)
-        main_recs = []
-        fallback_recs = []
-        for priority, num_col in enumerate(num_recs.index):
-            model = self.models[num_col]
-            all_user_ids, all_reco_ids, all_scores = model._recommend_u2i(  # pylint: disable=protected-access
-                user_ids=user_ids,
-                dataset=dataset,
-                k=k,
-                filter_viewed=filter_viewed,
-                sorted_item_ids_to_recommend=sorted_item_ids_to_recommend,
+        # Popularity lists of all categories are concatenated in order of categories priority
+        popularity_lists = [
+            self._filter_popularity_list(
+                self.category_popularity_lists[column_num], sorted_item_ids_to_recommend, sorted_item_ids_to_exclude
             )
-            reco_df = pd.DataFrame(
-                {
-                    Columns.User: all_user_ids,
-                    Columns.Item: all_reco_ids,
-                    Columns.Score: all_scores,
-                    "category_priority": priority,
-                }
+            for column_num in num_recs.index
+        ]
+        category_items = np.concatenate([items for items, _ in popularity_lists] + [np.zeros(0, dtype=np.int64)])
+        category_scores = np.concatenate([scores for _, scores in popularity_lists] + [np.zeros(0)])
+        category_sizes: np.ndarray = np.array([items.size for items, _ in popularity_lists], dtype=np.int64)
+
+        # Results are sorted by users
+        user_ids = np.unique(user_ids)
+        user_items = dataset.get_user_item_matrix(include_weights=False) if filter_viewed else None
+        batch_size = max(self.recommend_batch_size // max(num_recs.size, 1), 1) if self.recommend_batch_size else None
+        batch_size = batch_size or max(user_ids.size, 1)
+        parts = [
+            self._recommend_for_users_in_categories(
+                user_ids[start : start + batch_size],
+                k,
+                (category_items, category_scores, category_sizes),
+                num_recs.values.astype(np.int64),
+                user_items,
+                user_candidates,
+                dataset.item_id_map.size,
             )
-            reco_df["category_rank"] = reco_df.groupby([Columns.User], sort=False).cumcount()
-            main_mask = reco_df["category_rank"] < num_recs.loc[num_col]
-            main_recs.append(reco_df[main_mask])
-            fallback_recs.append(reco_df[~main_mask])
-
-        full_recs = self._get_full_recs_from_main_and_fallback(main_recs, fallback_recs, k, user_ids)
+            for start in tqdm(range(0, user_ids.size, batch_size), disable=self.verbose == 0)
+        ]
+        if not parts:
+            return user_ids[:0], category_items[:0], category_scores[:0]
+        all_user_ids, all_reco_ids, all_scores = (np.concatenate(part) for part in zip(*parts))
+        return all_user_ids, all_reco_ids, all_scores
+
+    @staticmethod
+    def _get_category_candidates(
+        user_ids: InternalIdsArray,
+        depths: np.ndarray,
+        category_items: InternalIdsArray,
+        category_sizes: np.ndarray,
+        user_items: tp.Optional[sparse.csr_matrix],
+        user_candidates: tp.Optional[UserCandidates],
+        n_items: int,
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (user, category) groups and positions in concatenated popularity lists of items
+        that can get into first `depths` items of categories for users, sorted by groups and positions.
+        """
+        n_categories = category_sizes.size
+        category_starts = np.cumsum(category_sizes) - category_sizes
+        if user_candidates is not None:
+            # All occurrences of allowed items of every user in popularity lists
+            allowed = user_candidates.get_user_items(user_ids, n_items)
+            items_order = np.argsort(category_items, kind="stable")
+            sorted_items = category_items[items_order]
+            lefts = np.searchsorted(sorted_items, allowed.indices, side="left")
+            n_occurrences = np.searchsorted(sorted_items, allowed.indices, side="right") - lefts
+            user_rows = np.repeat(np.repeat(np.arange(user_ids.size), np.diff(allowed.indptr)), n_occurrences)
+            occurrence_starts = np.cumsum(n_occurrences) - n_occurrences
+            positions = items_order[
+                np.repeat(lefts, n_occurrences)
+                + np.arange(user_rows.size)
+                - np.repeat(occurrence_starts, n_occurrences)
+            ]
+            categories = np.searchsorted(category_starts, positions, side="right") - 1
+            groups = user_rows * n_categories + categories
+            order = np.lexsort((positions, groups))
+            return groups[order], positions[order]
+
+        # Only first ``depth + n_viewed`` items of every popularity list can get into first `depth` items of user
+        n_viewed = (
+            np.diff(user_items[user_ids].indptr) if user_items is not None else np.zeros(user_ids.size, dtype=np.int64)
+        )
+        n_candidates = np.where(depths > 0, np.minimum(depths + n_viewed[:, np.newaxis], category_sizes), 0).ravel()
+        groups = np.repeat(np.arange(n_candidates.size), n_candidates)
+        positions = np.repeat(np.tile(category_starts, user_ids.size), n_candidates) + get_positions_in_rows(groups)
+        return groups, positions
 
-        if self.mixing_strategy == MixingStrategy.GROUP:
-            full_recs.sort_values(by=[Columns.User, "category_priority", "category_rank"], inplace=True)
-        elif self.mixing_strategy == MixingStrategy.ROTATE:
-            full_recs["category_rank"] = full_recs.groupby([Columns.User, "category_priority"], sort=False).cumcount()
-            full_recs.sort_values(by=[Columns.User, "category_rank", "category_priority"], inplace=True)
-        return full_recs[Columns.User].values, full_recs[Columns.Item].values, full_recs[Columns.Score].values
+    def _recommend_for_users_in_categories(
+        self,
+        user_ids: InternalIdsArray,
+        k: int,
+        category_lists: tp.Tuple[InternalIdsArray, ScoresArray, np.ndarray],
+        num_recs: np.ndarray,
+        user_items: tp.Optional[sparse.csr_matrix],
+        user_candidates: tp.Optional[UserCandidates],
+        n_items: int,
+    ) -> tp.Tuple[InternalIdsArray, InternalIdsArray, ScoresArray]:
+        """Select top items of every category for every user and mix them."""
+        category_items, category_scores, category_sizes = category_lists
+        args = (category_items, category_sizes, num_recs, user_items, user_candidates, n_items)
+        # Most users get `k` different items from first `num_recs` items of categories, they don't need fallback items
+        user_rows, positions = self._mix_category_items(user_ids, k, num_recs, *args)
+        n_recs = np.bincount(user_rows, minlength=user_ids.size)
+        incomplete_user_rows = np.flatnonzero(n_recs < k)
+        if incomplete_user_rows.size > 0:
+            depths = np.full(category_sizes.size, k)
+            fallback_user_rows, fallback_positions = self._mix_category_items(
+                user_ids[incomplete_user_rows], k, depths, *args
+            )
+            is_complete = n_recs[user_rows] == k
+            user_rows = np.concatenate((user_rows[is_complete], incomplete_user_rows[fallback_user_rows]))
+            positions = np.concatenate((positions[is_complete], fallback_positions))
+            order = np.argsort(user_rows, kind="stable")
+            user_rows, positions = user_rows[order], positions[order]
+        return user_ids[user_rows], category_items[positions], category_scores[positions]
+
+    def _mix_category_items(
+        self,
+        user_ids: InternalIdsArray,
+        k: int,
+        depths: np.ndarray,
+        category_items: InternalIdsArray,
+        category_sizes: np.ndarray,
+        num_recs: np.ndarray,
+        user_items: tp.Optional[sparse.csr_matrix],
+        user_candidates: tp.Optional[UserCandidates],
+        n_items: int,
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """
+        Mix first `depths` items of categories for every user, return user rows and positions of items
+        in concatenated popularity lists sorted by users and final order of items.
+
+        Every user gets first `num_recs` items of every category ("main" items),
+        places that are left are filled with other items of categories ("fallback" items)
+        with priority of lower ranks in categories.
+        """
+        n_categories = category_sizes.size
+        groups, positions = self._get_category_candidates(
+            user_ids, depths, category_items, category_sizes, user_items, user_candidates, n_items
+        )
+        user_rows = groups // n_categories
+        reco_ids = category_items[positions]
+        if user_items is not None:
+            is_valid = ~get_stored_pairs_mask(user_items[user_ids], user_rows, reco_ids)
+        else:
+            is_valid = np.ones(groups.size, dtype=bool)
+        is_valid = get_first_k_in_rows_mask(groups, is_valid, depths[groups % n_categories])
+        groups, user_rows, positions, reco_ids = (arr[is_valid] for arr in (groups, user_rows, positions, reco_ids))
+        categories = groups % n_categories
+        ranks = get_positions_in_rows(groups)
+        is_fallback = ranks >= num_recs[categories]
+
+        # Item recommended from several categories is kept once: main before fallback, then by category priority
+        order = np.lexsort((categories, is_fallback, reco_ids, user_rows))
+        is_first: np.ndarray = np.ones(order.size, dtype=bool)
+        is_first[1:] = (user_rows[order][1:] != user_rows[order][:-1]) | (reco_ids[order][1:] != reco_ids[order][:-1])
+        keep = order[is_first]
+
+        # Fallback items can only take places that are not taken by main items
+        keep = keep[np.lexsort((categories[keep], ranks[keep], is_fallback[keep], user_rows[keep]))]
+        keep = keep[get_first_k_in_rows_mask(user_rows[keep], np.ones(keep.size, dtype=bool), k)]
+
+        keep = keep[np.lexsort((ranks[keep], categories[keep], user_rows[keep]))]
+        if self.mixing_strategy == MixingStrategy.ROTATE:
+            # Categories take turns by ranks of items among selected items of category
+            selected_ranks = get_positions_in_rows(groups[keep])
+            keep = keep[np.lexsort((categories[keep], selected_ranks, user_rows[keep]))]
+        return user_rows[keep], positions[keep]
 
     def _recommend_i2i(
         self,
@@ -318,6 +425,7 @@ class PopularInCategoryModel(PopularModel):
         dataset: Dataset,
         k: int,
         sorted_item_ids_to_recommend: tp.Optional[InternalIdsArray],
+        sorted_item_ids_to_exclude: tp.Optional[InternalIdsArray] = None,
     ) -> tp.Tuple[InternalIds, InternalIds, Scores]:
         _, single_reco, single_scores = self._recommend_u2i(
             user_ids=dataset.user_id_map.internal_ids[:1],
@@ -325,6 +433,7 @@ class PopularInCategoryModel(PopularModel):
             k=k,
             filter_viewed=False,
             sorted_item_ids_to_recommend=sorted_item_ids_to_recommend,
+            sorted_item_ids_to_exclude=sorted_item_ids_to_exclude,
         )
 
         n_targets = len(target_ids)
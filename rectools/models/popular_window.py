@@ -0,0 +1,349 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Popular model over sliding time window with incremental updates."""
+
+import typing as tp
+from datetime import datetime, timedelta
+
+import attr
+import numpy as np
+import pandas as pd
+
+from rectools import Columns
+from rectools.dataset import Dataset, Interactions
+from rectools.types import InternalIdsArray
+
+from .base import ScoresArray
+from .popular import PopularModel, Popularity
+from .utils import splitmix64
+
+MIN_N_REGISTERS = 16
+MAX_N_REGISTERS = 2**16
+
+# Items of window sorted by descending score and by id for ties
+_WINDOW_LIST_DTYPE = np.dtype([("neg_score", np.float64), ("item_id", np.int64)])
+
+
+@attr.s(auto_attribs=True)
+class _WindowBucket:
+    """Aggregates of interactions of one time bucket for items that have interactions in it."""
+
+    item_ids: InternalIdsArray  # Sorted unique internal ids
+    n_interactions: np.ndarray
+    sum_weight: np.ndarray
+    # HyperLogLog registers of users, shape (n_items, n_registers), ``n_registers`` is 0 if users are not counted
+    registers: np.ndarray
+
+
+class SlidingWindowPopularModel(PopularModel):
+    """
+    Model generating recommendations based on popularity of items in sliding time window
+    that is updated incrementally with new interactions.
+
+    Window is split into `n_buckets` time buckets of ``period / n_buckets`` length (counted from epoch).
+    Model keeps per-item counters of every bucket and their sums over the whole window.
+    On `update` only new interactions are aggregated and buckets that left the window are subtracted,
+    so update cost is proportional to the number of new interactions and items in expired buckets
+    rather than to the number of interactions in window.
+
+    Window ends at the last interaction datetime and is expired by whole buckets:
+    it contains all interactions from `period` before its end and can contain interactions
+    that are at most one bucket older.
+
+    Number of users of every item is estimated with HyperLogLog sketches,
+    relative error of estimate is about ``1.04 / sqrt(n_registers)``. Other popularity types are exact.
+
+    Parameters
+    ----------
+    period : timedelta
+        Length of window.
+    popularity : {"n_users", "n_interactions", "mean_weight", "sum_weight"}, default `"n_users"`
+        Method of calculating item popularity, see `PopularModel`.
+    n_buckets : int, default 24
+        Number of time buckets in window.
+    n_registers : int, default 64
+        Number of HyperLogLog registers per item, power of 2 from 16 to 65536.
+        Registers take ``n_registers`` bytes per item in every bucket and in window sums.
+        Used only for `n_users` popularity.
+    add_cold : bool, default ``False``
+        If ``True`` cold items will be added to the end of popularity list and can be recommended.
+        Item is cold if it has no interactions in window. Cold items score will be equal to ``0``.
+    inverse : bool, default ``False``
+        If ``True`` least popular items will be selected.
+    verbose : int, default ``0``
+        Degree of verbose output. If ``0``, no output will be provided.
+    """
+
+    def __init__(
+        self,
+        period: timedelta,
+        popularity: str = "n_users",
+        n_buckets: int = 24,
+        n_registers: int = 64,
+        add_cold: bool = False,
+        inverse: bool = False,
+        verbose: int = 0,
+    ):
+        super().__init__(popularity=popularity, period=period, add_cold=add_cold, inverse=inverse, verbose=verbose)
+        if period <= timedelta(0):
+            raise ValueError("`period` must be positive")
+        if n_buckets < 1:
+            raise ValueError("`n_buckets` must be positive")
+        if not MIN_N_REGISTERS <= n_registers <= MAX_N_REGISTERS or n_registers & (n_registers - 1) != 0:
+            raise ValueError(f"`n_registers` must be a power of 2 from {MIN_N_REGISTERS} to {MAX_N_REGISTERS}")
+        self.n_buckets = n_buckets
+        self.n_registers = n_registers
+        self._reset()
+
+    def _reset(self) -> None:
+        n_registers = self.n_registers if self.popularity == Popularity.N_USERS else 0
+        self._buckets: tp.Dict[int, _WindowBucket] = {}
+        self._window_end: tp.Optional[int] = None  # Nanoseconds since epoch
+        self._n_seen_interactions = 0
+        # Sums over window buckets for all items (with spare capacity)
+        self._n_interactions: np.ndarray = np.zeros(0, dtype=np.int64)
+        self._sum_weight: np.ndarray = np.zeros(0, dtype=np.float64)
+        self._registers: np.ndarray = np.zeros((0, n_registers), dtype=np.uint8)
+        self._window_list: np.ndarray = np.zeros(0, dtype=_WINDOW_LIST_DTYPE)
+        # Items which sums were changed since popularity list was updated
+        self._changed_item_ids: tp.List[InternalIdsArray] = []
+
+    @property
+    def _bucket_size(self) -> int:
+        return pd.Timedelta(self.period).value // self.n_buckets
+
+    def _fit(self, dataset: Dataset) -> None:  # type: ignore
+        self._reset()
+        self._ingest(dataset, None)
+
+    def update(self, dataset: Dataset, current_time: tp.Optional[datetime] = None) -> "SlidingWindowPopularModel":
+        """
+        Add new interactions of dataset to window and expire old ones.
+
+        Model takes interactions of `dataset` that it hasn't seen yet, so `dataset` must be the one
+        model was fitted on (or updated with) with new interactions added to the end,
+        e.g. with `Dataset.append_interactions`. Internal ids of items must not change.
+        New interactions that are older than window are ignored.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Dataset with new interactions appended.
+        current_time : datetime, optional, default ``None``
+            Move window end to this time even if there are no new interactions (e.g. to expire old ones).
+            Window never moves back, so it's ignored if it's before the last interaction.
+
+        Returns
+        -------
+        self
+
+        Raises
+        ------
+        NotFittedError
+            If called for not fitted model.
+        ValueError
+            If dataset has less interactions than model has already seen.
+        """
+        self._check_is_fitted()
+        self._ingest(dataset, current_time)
+        return self
+
+    def _ingest(self, dataset: Dataset, current_time: tp.Optional[datetime]) -> None:
+        interactions = dataset.interactions
+        start = self._n_seen_interactions
+        if len(interactions.df) < start:
+            raise ValueError(
+                f"Dataset has {len(interactions.df)} interactions but model has already seen {start} of them"
+            )
+        item_ids = interactions.df[Columns.Item].values[start:]
+        user_ids = interactions.df[Columns.User].values[start:]
+        weights = interactions.df[Columns.Weight].values[start:]
+        timestamps = self._get_timestamps(interactions, start)
+        self._n_seen_interactions = len(interactions.df)
+
+        window_ends = [self._window_end] if self._window_end is not None else []
+        if timestamps.size > 0:
+            window_ends.append(int(timestamps.max()))
+        if current_time is not None:
+            window_ends.append(pd.Timestamp(current_time).value)
+        self._window_end = max(window_ends, default=None)
+        self._ensure_items_capacity(dataset.item_id_map.size)
+
+        if self._window_end is not None:
+            first_bucket = self._window_end // self._bucket_size - self.n_buckets
+            self._expire_buckets(first_bucket)
+
+            bucket_ids = timestamps // self._bucket_size
+            in_window = bucket_ids >= first_bucket
+            bucket_ids, item_ids, user_ids, weights = (
+                arr[in_window] for arr in (bucket_ids, item_ids, user_ids, weights)
+            )
+            order = np.argsort(bucket_ids, kind="stable")
+            unique_bucket_ids, bucket_starts = np.unique(bucket_ids[order], return_index=True)
+            bucket_ends = np.append(bucket_starts[1:], order.size)
+            for bucket_id, bucket_start, bucket_end in zip(unique_bucket_ids, bucket_starts, bucket_ends):
+                rows = order[bucket_start:bucket_end]
+                self._add_to_bucket(int(bucket_id), item_ids[rows], user_ids[rows], weights[rows])
+
+        self._update_popularity_list(dataset)
+
+    @staticmethod
+    def _get_timestamps(interactions: Interactions, start: int) -> np.ndarray:
+        """Return nanoseconds since epoch of interactions starting from `start` row."""
+        values = interactions.df[Columns.Datetime].values[start:]
+        if interactions.compact:
+            return values.astype(np.int64) * 10**9
+        return values.astype("datetime64[ns]").astype(np.int64)
+
+    def _ensure_items_capacity(self, n_items: int) -> None:
+        capacity = self._n_interactions.size
+        if n_items <= capacity:
+            return
+        # Capacity grows geometrically to make frequent appends of new items cheap
+        n_added = max(n_items, 2 * capacity) - capacity
+        self._n_interactions = np.concatenate((self._n_interactions, np.zeros(n_added, dtype=np.int64)))
+        self._sum_weight = np.concatenate((self._sum_weight, np.zeros(n_added)))
+        self._registers = np.concatenate(
+            (self._registers, np.zeros((n_added, self._registers.shape[1]), dtype=np.uint8))
+        )
+
+    def _add_to_bucket(
+        self, bucket_id: int, item_ids: InternalIdsArray, user_ids: InternalIdsArray, weights: np.ndarray
+    ) -> None:
+        unique_item_ids, item_positions = np.unique(item_ids, return_inverse=True)
+        registers: np.ndarray = np.zeros((unique_item_ids.size, self._registers.shape[1]), dtype=np.uint8)
+        if registers.shape[1] > 0:
+            register_ids, ranks = self._hash_users(user_ids, registers.shape[1])
+            np.maximum.at(registers, (item_positions, register_ids), ranks)
+        delta = _WindowBucket(
+            unique_item_ids,
+            np.bincount(item_positions, minlength=unique_item_ids.size),
+            np.bincount(item_positions, weights=weights.astype(np.float64), minlength=unique_item_ids.size),
+            registers,
+        )
+
+        self._n_interactions[delta.item_ids] += delta.n_interactions
+        self._sum_weight[delta.item_ids] += delta.sum_weight
+        self._registers[delta.item_ids] = np.maximum(self._registers[delta.item_ids], delta.registers)
+        self._changed_item_ids.append(delta.item_ids)
+
+        bucket = self._buckets.get(bucket_id)
+        self._buckets[bucket_id] = delta if bucket is None else self._merge_buckets(bucket, delta)
+
+    @staticmethod
+    def _merge_buckets(left: _WindowBucket, right: _WindowBucket) -> _WindowBucket:
+        item_ids = np.union1d(left.item_ids, right.item_ids)
+        merged = _WindowBucket(
+            item_ids,
+            np.zeros(item_ids.size, dtype=np.int64),
+            np.zeros(item_ids.size),
+            np.zeros((item_ids.size, left.registers.shape[1]), dtype=np.uint8),
+        )
+        for bucket in (left, right):
+            positions = np.searchsorted(item_ids, bucket.item_ids)
+            merged.n_interactions[positions] += bucket.n_interactions
+            merged.sum_weight[positions] += bucket.sum_weight
+            merged.registers[positions] = np.maximum(merged.registers[positions], bucket.registers)
+        return merged
+
+    def _expire_buckets(self, first_bucket: int) -> None:
+        """Remove buckets before `first_bucket` and subtract them from window sums."""
+        expired = [self._buckets.pop(bucket_id) for bucket_id in sorted(self._buckets) if bucket_id < first_bucket]
+        if not expired:
+            return
+        for bucket in expired:
+            self._n_interactions[bucket.item_ids] -= bucket.n_interactions
+            self._sum_weight[bucket.item_ids] -= bucket.sum_weight
+        affected_item_ids = np.unique(np.concatenate([bucket.item_ids for bucket in expired]))
+        self._changed_item_ids.append(affected_item_ids)
+        # Rounding errors of subtraction shouldn't stay for items without interactions
+        self._sum_weight[affected_item_ids[self._n_interactions[affected_item_ids] == 0]] = 0
+
+        if self._registers.shape[1] == 0:
+            return
+        # Registers can't be subtracted, so they are collected again from the rest of buckets for affected items
+        self._registers[affected_item_ids] = 0
+        for bucket in self._buckets.values():
+            positions = np.searchsorted(bucket.item_ids, affected_item_ids).clip(max=bucket.item_ids.size - 1)
+            is_found = bucket.item_ids[positions] == affected_item_ids
+            found_item_ids, positions = affected_item_ids[is_found], positions[is_found]
+            self._registers[found_item_ids] = np.maximum(self._registers[found_item_ids], bucket.registers[positions])
+
+    @staticmethod
+    def _hash_users(user_ids: InternalIdsArray, n_registers: int) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """Return HyperLogLog register index and rank (position of the first set bit) for every user."""
+        # Internal ids are sequential, so all their bits have to be mixed
+        hashes = splitmix64(user_ids)
+
+        n_index_bits = n_registers.bit_length() - 1
+        register_ids: np.ndarray = (hashes & np.uint64(n_registers - 1)).astype(np.int64)
+        rest = hashes >> np.uint64(n_index_bits)
+        # Bit length is taken from exponents of 32-bit halves that are represented in floats exactly
+        high_bit_length = np.frexp((rest >> np.uint64(32)).astype(np.float64))[1]
+        low_bit_length = np.frexp((rest & np.uint64(0xFFFFFFFF)).astype(np.float64))[1]
+        bit_length = np.where(high_bit_length > 0, high_bit_length + 32, low_bit_length)
+        ranks: np.ndarray = (64 - n_index_bits - bit_length + 1).astype(np.uint8)
+        return register_ids, ranks
+
+    @staticmethod
+    def _estimate_n_users(registers: np.ndarray) -> np.ndarray:
+        """Estimate number of distinct users from HyperLogLog registers (one row per item)."""
+        n_registers = registers.shape[1]
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(n_registers, 0.7213 / (1 + 1.079 / n_registers))
+        raw_estimate = alpha * n_registers**2 / np.exp2(-registers.astype(np.float64)).sum(axis=1)
+        # Linear counting is more precise for small numbers of users
+        n_zeros = (registers == 0).sum(axis=1)
+        linear_estimate = n_registers * np.log(n_registers / np.maximum(n_zeros, 1))
+        return np.where((raw_estimate <= 2.5 * n_registers) & (n_zeros > 0), linear_estimate, raw_estimate)
+
+    def _calc_items_scores(self, item_ids: InternalIdsArray) -> ScoresArray:
+        if self.popularity == Popularity.N_USERS:
+            return self._estimate_n_users(self._registers[item_ids])
+        if self.popularity == Popularity.N_INTERACTIONS:
+            return self._n_interactions[item_ids].astype(float)
+        if self.popularity == Popularity.MEAN_WEIGHT:
+            return self._sum_weight[item_ids] / self._n_interactions[item_ids]
+        if self.popularity == Popularity.SUM_WEIGHT:
+            return self._sum_weight[item_ids]
+        raise ValueError(f"Unexpected popularity {self.popularity}")
+
+    def _update_popularity_list(self, dataset: Dataset) -> None:
+        """Re-estimate scores of changed items only and move them to their new places in window list."""
+        if self._changed_item_ids:
+            changed_item_ids = np.unique(np.concatenate(self._changed_item_ids))
+            self._changed_item_ids = []
+            is_changed: np.ndarray = np.zeros(self._n_interactions.size, dtype=bool)
+            is_changed[changed_item_ids] = True
+            kept = self._window_list[~is_changed[self._window_list["item_id"]]]
+
+            item_ids = changed_item_ids[self._n_interactions[changed_item_ids] > 0]
+            added = np.empty(item_ids.size, dtype=_WINDOW_LIST_DTYPE)
+            added["neg_score"] = -self._calc_items_scores(item_ids)
+            added["item_id"] = item_ids
+            self._window_list = self._merge_window_lists(kept, added)
+
+        items = self._window_list["item_id"].copy()
+        scores = -self._window_list["neg_score"]
+        self.popularity_list = self._get_popularity_list(items, scores, dataset)
+
+    @staticmethod
+    def _merge_window_lists(kept: np.ndarray, added: np.ndarray) -> np.ndarray:
+        """Merge sorted window list with not sorted items."""
+        if added.size * 8 > kept.size:
+            # Sorting everything is cheaper for big number of added items
+            merged = np.concatenate((kept, added))
+            return merged[np.lexsort((merged["item_id"], merged["neg_score"]))]
+        added = added[np.lexsort((added["item_id"], added["neg_score"]))]
+        return np.insert(kept, np.searchsorted(kept, added), added)
@@ -37,13 +37,16 @@ class PureSVDModel(VectorModel):
         The number of latent factors to compute.
     verbose : int, default ``0``
         Degree of verbose output. If ``0``, no output will be provided.
+    **kwargs
+        Recommendation settings of `VectorModel`, e.g. `recommend_batch_size` or `recommend_backend`.
     """
 
     u2i_dist = Distance.DOT
     i2i_dist = Distance.COSINE
+    factors_depend_on_dataset = False
 
-    def __init__(self, factors: int = 10, verbose: int = 0):
-        super().__init__(verbose=verbose)
+    def __init__(self, factors: int = 10, verbose: int = 0, **kwargs: tp.Any):
+        super().__init__(verbose=verbose, **kwargs)
 
         self.factors = factors
         self.user_factors: np.ndarray
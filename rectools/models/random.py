@@ -14,7 +14,6 @@
 
 """Random Model."""
 
-import random
 import typing as tp
 
 import numpy as np
@@ -23,16 +22,18 @@ from tqdm.auto import tqdm
 from rectools import InternalIds
 from rectools.dataset import Dataset
 from rectools.types import InternalIdsArray
-from rectools.utils import fast_isin_for_sorted_test_elements
 
 from .base import ModelBase, Scores
-from .utils import get_viewed_item_ids
+from .utils import get_first_k_in_rows_mask, get_positions_in_rows, get_stored_pairs_mask, splitmix64
 
-# Experiments have shown that for random sampling without replacement if k / n > 0.025
+# Experiments have shown that for random sampling without replacement if k / n > 0.1
 # where n - size of population, k - required number of samples
-# it's faster to use `np.random.choice(population, k, replace=False)
-# otherwise it's better to use `random.sample(population, k)
-K_TO_N_MIN_NUMPY_RATIO = 0.025
+# it's faster to take k items with the least random keys among keys generated for all items,
+# otherwise it's better to draw items with replacement until there are k different ones
+K_TO_N_MIN_NUMPY_RATIO = 0.1
+
+# Maximum number of random keys generated at once for sampling by keys of all items
+MAX_KEYS_BLOCK_SIZE = 2**23
 
 
 class RandomModel(ModelBase):
@@ -44,14 +45,21 @@ class RandomModel(ModelBase):
 
     Numbers ranging from <n recommendations for user> to 1 will be used as a "score" in recommendations.
 
+    Random numbers for every user are generated from hashes of `random_state`, user internal id and counter,
+    so recommendations for user don't depend on other users in the same call
+    (e.g. they are the same for sharded and single-process runs). Global random state is not used.
+
     Parameters
     ----------
     random_state : int, optional, default ``None``
         Pseudorandom number generator state to control the sampling.
+        If ``None``, recommendations are different for every call.
     verbose : int, default ``0``
         Degree of verbose output. If ``0``, no output will be provided.
     """
 
+    recommend_batch_size: tp.Optional[int] = 100_000  # Number of users processed at once, all at once if ``None``
+
     def __init__(self, random_state: tp.Optional[int] = None, verbose: int = 0):
         super().__init__(verbose=verbose)
         self.random_state = random_state
@@ -68,48 +76,130 @@ class RandomModel(ModelBase):
         filter_viewed: bool,
         sorted_item_ids_to_recommend: tp.Optional[InternalIdsArray],
     ) -> tp.Tuple[InternalIds, InternalIds, Scores]:
-        if filter_viewed:
-            user_items = dataset.get_user_item_matrix(include_weights=False)
-
+        user_items = dataset.get_user_item_matrix(include_weights=False) if filter_viewed else None
         if sorted_item_ids_to_recommend is not None:
             item_ids = np.unique(sorted_item_ids_to_recommend)
         else:
             item_ids = self.all_item_ids
 
-        item_indices = list(range(item_ids.size))  # for random.sample
-
-        np.random.seed(self.random_state)
-        random.seed(self.random_state, version=2)
-
-        all_user_ids = []
-        all_reco_ids = []
-        all_scores: tp.List[float] = []
-        for user_id in tqdm(user_ids, disable=self.verbose == 0):
-            if filter_viewed:
-                viewed_ids = get_viewed_item_ids(user_items, user_id)  # sorted
-                n_reco = k + viewed_ids.size
-            else:
-                n_reco = k
-
-            n_reco = min(n_reco, item_ids.size)
-
-            if n_reco / item_ids.size < K_TO_N_MIN_NUMPY_RATIO:
-                reco_indices = random.sample(item_indices, n_reco)
-                reco_ids = item_ids[reco_indices]
-            else:
-                reco_ids = np.random.choice(item_ids, n_reco, replace=False)
-
-            if filter_viewed:
-                reco_ids = reco_ids[fast_isin_for_sorted_test_elements(reco_ids, viewed_ids, invert=True)][:k]
-
-            reco_scores = np.arange(reco_ids.size, 0, -1)
-
-            all_user_ids.extend([user_id] * len(reco_ids))
-            all_reco_ids.extend(reco_ids)
-            all_scores.extend(reco_scores)
-
+        if self.random_state is not None:
+            seed = np.uint64(self.random_state % 2**64)
+        else:
+            seed = np.uint64(np.random.default_rng().integers(2**64, dtype=np.uint64))
+
+        batch_size = self.recommend_batch_size or max(user_ids.size, 1)
+        parts = []
+        for start in tqdm(range(0, user_ids.size, batch_size), disable=self.verbose == 0):
+            batch_user_ids = user_ids[start : start + batch_size]
+            viewed = user_items[batch_user_ids] if user_items is not None else None
+            n_viewed = np.diff(viewed.indptr) if viewed is not None else np.zeros(batch_user_ids.size, dtype=np.int64)
+            rows, reco_indices = self._sample_items(
+                seed, batch_user_ids, np.minimum(k + n_viewed, item_ids.size), item_ids.size
+            )
+            reco_ids = item_ids[reco_indices]
+            is_valid = (
+                ~get_stored_pairs_mask(viewed, rows, reco_ids) if viewed is not None else np.ones(rows.size, dtype=bool)
+            )
+            is_valid = get_first_k_in_rows_mask(rows, is_valid, k)
+            rows, reco_ids = rows[is_valid], reco_ids[is_valid]
+            n_reco = np.bincount(rows, minlength=batch_user_ids.size)
+            scores = n_reco[rows] - get_positions_in_rows(rows)
+            parts.append((batch_user_ids[rows], reco_ids, scores))
+
+        if not parts:
+            return user_ids[:0], item_ids[:0], np.zeros(0, dtype=np.int64)
+        all_user_ids, all_reco_ids, all_scores = (np.concatenate(part) for part in zip(*parts))
         return all_user_ids, all_reco_ids, all_scores
 
+    @staticmethod
+    def _get_random_numbers(seed: np.uint64, user_ids: InternalIdsArray, counters: np.ndarray) -> np.ndarray:
+        """Return random ``uint64`` numbers depending on seed, user and counter only."""
+        # Seed and user are hashed separately, so that streams of different seeds aren't shifted copies of each other
+        user_hashes = splitmix64(splitmix64(np.array(seed)) ^ splitmix64(user_ids))
+        return splitmix64(user_hashes + counters.astype(np.uint64))
+
+    @classmethod
+    def _sample_items(
+        cls, seed: np.uint64, user_ids: InternalIdsArray, n_samples: np.ndarray, n_items: int
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """
+        Sample `n_samples` different items (out of `n_items`) for every user in random order.
+
+        Return user rows and item indices sorted by rows.
+        """
+        is_dense = n_samples >= K_TO_N_MIN_NUMPY_RATIO * n_items
+        parts = [
+            cls._sample_items_by_keys(seed, user_ids, n_samples, n_items, np.flatnonzero(is_dense)),
+            cls._sample_items_with_replacement(seed, user_ids, n_samples, n_items, np.flatnonzero(~is_dense)),
+        ]
+        rows, item_indices = (np.concatenate(part) for part in zip(*parts))
+        order = np.argsort(rows, kind="stable")
+        return rows[order], item_indices[order]
+
+    @classmethod
+    def _sample_items_by_keys(
+        cls, seed: np.uint64, user_ids: InternalIdsArray, n_samples: np.ndarray, n_items: int, rows: np.ndarray
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """Take items with the least random keys, keys are generated for all items."""
+        parts: tp.List[tp.Tuple[np.ndarray, np.ndarray]] = [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))]
+        block_size = max(MAX_KEYS_BLOCK_SIZE // max(n_items, 1), 1)
+        for start in range(0, rows.size, block_size):
+            block_rows = rows[start : start + block_size]
+            keys = cls._get_random_numbers(seed, user_ids[block_rows][:, np.newaxis], np.arange(n_items)[np.newaxis, :])
+            block_n_samples = n_samples[block_rows]
+            n_top = block_n_samples.max(initial=0)
+            if n_top == 0:
+                continue
+            top = (
+                np.argpartition(keys, n_top - 1, axis=1)[:, :n_top]
+                if n_top < n_items
+                else np.broadcast_to(np.arange(n_items), keys.shape)
+            )
+            top = np.take_along_axis(top, np.argsort(np.take_along_axis(keys, top, axis=1), axis=1), axis=1)
+            is_sampled = np.arange(n_top) < block_n_samples[:, np.newaxis]
+            parts.append((np.broadcast_to(block_rows[:, np.newaxis], top.shape)[is_sampled], top[is_sampled]))
+        return np.concatenate([part[0] for part in parts]), np.concatenate([part[1] for part in parts])
+
+    @classmethod
+    def _sample_items_with_replacement(
+        cls, seed: np.uint64, user_ids: InternalIdsArray, n_samples: np.ndarray, n_items: int, rows: np.ndarray
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """
+        Take first different items in the sequence of random items of user.
+
+        Few items repeat if number of samples is small compared to number of items,
+        so sequences are extended only for users that didn't get enough different items.
+        """
+        result_rows: tp.List[np.ndarray] = [np.zeros(0, dtype=np.int64)]
+        result_indices: tp.List[np.ndarray] = [np.zeros(0, dtype=np.int64)]
+        n_draws = n_samples[rows] + n_samples[rows] // 8 + 1
+        while rows.size > 0:
+            draw_rows = np.repeat(rows, n_draws)
+            counters = get_positions_in_rows(draw_rows)
+            numbers = cls._get_random_numbers(seed, user_ids[draw_rows], counters)
+            # Uniform float in [0, 1) from 53 high bits
+            item_indices: np.ndarray = ((numbers >> np.uint64(11)).astype(np.float64) * 2.0**-53 * n_items).astype(
+                np.int64
+            )
+
+            # Only first occurrence of item in user sequence is kept
+            # (stable sort keeps draws of the same pair in order of counters)
+            pairs = draw_rows * n_items + item_indices
+            order = np.argsort(pairs, kind="stable")
+            is_first: np.ndarray = np.ones(order.size, dtype=bool)
+            is_first[1:] = pairs[order][1:] != pairs[order][:-1]
+            is_kept: np.ndarray = np.zeros(order.size, dtype=bool)
+            is_kept[order[is_first]] = True
+            is_kept = get_first_k_in_rows_mask(draw_rows, is_kept, np.repeat(n_samples[rows], n_draws))
+
+            n_different = np.bincount(draw_rows[is_kept], minlength=user_ids.size)[rows]
+            is_complete = n_different == n_samples[rows]
+            is_complete_draw = np.repeat(is_complete, n_draws) & is_kept
+            result_rows.append(draw_rows[is_complete_draw])
+            result_indices.append(item_indices[is_complete_draw])
+            rows, n_draws = rows[~is_complete], n_draws[~is_complete] * 2
+        return np.concatenate(result_rows), np.concatenate(result_indices)
+
     def _recommend_i2i(
         self,
         target_ids: InternalIdsArray,
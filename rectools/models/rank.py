@@ -15,6 +15,7 @@
 """Implicit ranker model."""
 
 import typing as tp
+from copy import copy
 from enum import Enum
 
 import implicit.cpu
@@ -24,7 +25,12 @@ from scipy import sparse
 
 from rectools import InternalIds
 from rectools.models.base import Scores
+from rectools.models.candidates import UserCandidates
 from rectools.types import InternalIdsArray
+from rectools.utils import fast_isin_for_sorted_test_elements
+
+# Maximum number of elements in dense matrix of scores of one chunk of subjects ranked with candidates
+MAX_CANDIDATES_CHUNK_SCORES = 2**24
 
 
 class Distance(Enum):
@@ -58,20 +64,41 @@ class ImplicitRanker:
     def __init__(
         self, distance: Distance, subjects_factors: tp.Union[np.ndarray, sparse.csr_matrix], objects_factors: np.ndarray
     ) -> None:
-        if isinstance(subjects_factors, sparse.csr_matrix) and distance != Distance.DOT:
-            raise ValueError("To use `sparse.csr_matrix` distance must be `Distance.DOT`")
-
         self.distance = distance
-        self.subjects_factors = subjects_factors.astype(np.float32)
-        self.objects_factors = objects_factors.astype(np.float32)
+        self.subjects_factors = self._convert_subjects_factors(subjects_factors)
+        # Factors that are already float32 and contiguous are not copied
+        self.objects_factors: np.ndarray = np.ascontiguousarray(objects_factors, dtype=np.float32)
+
+        # Objects data prepared on first ranking (e.g. factors transformed for the distance and their norms).
+        # It's shared with rankers created by `with_subjects`.
+        self._objects_cache: tp.Dict[str, tp.Any] = {}
+
+    def _convert_subjects_factors(
+        self, subjects_factors: tp.Union[np.ndarray, sparse.csr_matrix]
+    ) -> tp.Union[np.ndarray, sparse.csr_matrix]:
+        if isinstance(subjects_factors, sparse.csr_matrix):
+            if self.distance != Distance.DOT:
+                raise ValueError("To use `sparse.csr_matrix` distance must be `Distance.DOT`")
+            return subjects_factors.astype(np.float32, copy=False)
+        return np.ascontiguousarray(subjects_factors, dtype=np.float32)
+
+    def with_subjects(self, subjects_factors: tp.Union[np.ndarray, sparse.csr_matrix]) -> "ImplicitRanker":
+        """
+        Return ranker with other subjects that shares prepared objects data with this ranker.
 
-        self.subjects_norms: np.ndarray
-        if distance == Distance.COSINE:
-            self.subjects_norms = self._calc_norms(self.subjects_factors, avoid_zeros=True)
+        Parameters
+        ----------
+        subjects_factors : np.ndarray | sparse.csr_matrix
+            Array of subjects embeddings, shape (n_subjects, n_factors).
 
-        self.subjects_dots: np.ndarray
-        if distance == Distance.EUCLIDEAN:
-            self.subjects_dots = self._calc_dots(self.subjects_factors)
+        Returns
+        -------
+        ImplicitRanker
+            Ranker of the same class with the same objects.
+        """
+        ranker = copy(self)
+        ranker.subjects_factors = self._convert_subjects_factors(subjects_factors)
+        return ranker
 
     def _get_neginf_score(self) -> float:
         # Adding 1 to avoid float calculation errors (we're comparing `scores <= neginf_score`)
@@ -90,47 +117,237 @@ class ImplicitRanker:
             norms[norms == 0] = 1e-10
         return norms
 
-    def _get_mask_for_correct_scores(self, scores: np.ndarray) -> tp.List[bool]:
+    def _get_mask_for_correct_scores(self, scores: np.ndarray) -> np.ndarray:
         """Filter scores from implicit library that are not relevant. Implicit library assigns `neginf` score
-        to items that are meant to be filtered (e.g. blacklist items or already seen items)
+        to items that are meant to be filtered (e.g. blacklist items or already seen items).
+        Scores in rows are sorted descending, so only trailing `neginf` scores of every row are masked.
         """
-        num_masked = 0
-        min_score = self._get_neginf_score()
-        for el in np.flip(scores):
-            if el <= min_score:
-                num_masked += 1
-            else:
-                break
-        return [True] * (len(scores) - num_masked) + [False] * num_masked
+        is_correct = scores > self._get_neginf_score()
+        # Number of scores in every row before trailing `neginf` ones
+        n_correct = scores.shape[1] - np.argmax(is_correct[:, ::-1], axis=1)
+        n_correct[~is_correct.any(axis=1)] = 0
+        return np.arange(scores.shape[1]) < n_correct[:, np.newaxis]
 
     def _process_implicit_scores(
         self, subject_ids: InternalIds, ids: np.ndarray, scores: np.ndarray
-    ) -> tp.Tuple[InternalIds, InternalIds, Scores]:
+    ) -> tp.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        subject_ids = np.asarray(subject_ids)
+        correct_mask = self._get_mask_for_correct_scores(scores)
+        all_target_ids = np.repeat(subject_ids, correct_mask.sum(axis=1))
+        # Transformations are applied only to correct scores to avoid overflow on `neginf` ones
+        all_scores = scores[correct_mask]
+
+        # Subjects norms and dots are calculated only for requested subjects
+        n_correct = correct_mask.sum(axis=1)
+        if self.distance == Distance.COSINE:
+            subjects_norms = self._calc_norms(self.subjects_factors[subject_ids], avoid_zeros=True)
+            all_scores = all_scores / np.repeat(subjects_norms, n_correct)
+
+        if self.distance == Distance.EUCLIDEAN:
+            # Restore Euclidean distances from scores
+            subjects_dots = self._calc_dots(self.subjects_factors[subject_ids])
+            d2 = np.repeat(subjects_dots, n_correct) - all_scores
+            # Theoretically d2 >= 0, but can be <0 because of rounding errors
+            all_scores = np.sqrt(np.maximum(d2, 0))
+
+        return all_target_ids, ids[correct_mask], all_scores
+
+    def _transform_objects(self, object_factors: np.ndarray) -> tp.Tuple[np.ndarray, tp.Optional[np.ndarray]]:
+        object_norms = None  # for DOT and EUCLIDEAN distance
+        if self.distance == Distance.COSINE:
+            object_norms = self._calc_norms(object_factors, avoid_zeros=True)
 
-        all_target_ids = []
-        all_reco_ids: tp.List[np.ndarray] = []
-        all_scores: tp.List[np.ndarray] = []
+        if self.distance == Distance.EUCLIDEAN:
+            # Transform factors to get top-k by Euclidean distance using Dot metric
+            # https://www.microsoft.com/en-us/research/wp-content/uploads/2016/02/XboxInnerProduct.pdf
+            object_factors = np.hstack((self._calc_dots(object_factors).reshape(-1, 1), object_factors))
 
-        for subject_id, object_ids, object_scores in zip(subject_ids, ids, scores):
-            correct_mask = self._get_mask_for_correct_scores(object_scores)
-            relevant_scores = object_scores[correct_mask]
-            relevant_ids = object_ids[correct_mask]
+        return object_factors, object_norms
 
-            if self.distance == Distance.COSINE:
-                subject_norm = self.subjects_norms[subject_id]
-                relevant_scores /= subject_norm
+    def _get_prepared_objects(self) -> tp.Tuple[np.ndarray, tp.Optional[np.ndarray]]:
+        if "prepared_objects" not in self._objects_cache:
+            self._objects_cache["prepared_objects"] = self._transform_objects(self.objects_factors)
+        return self._objects_cache["prepared_objects"]
 
-            if self.distance == Distance.EUCLIDEAN:
-                # Restore Euclidean distances from scores
-                d2 = self.subjects_dots[subject_id] - relevant_scores
-                # Theoretically d2 >= 0, but can be <0 because of rounding errors
-                relevant_scores = np.sqrt(np.maximum(d2, 0))
+    def _prepare_objects(
+        self, sorted_object_whitelist: tp.Optional[InternalIdsArray]
+    ) -> tp.Tuple[np.ndarray, tp.Optional[np.ndarray]]:
+        object_factors, object_norms = self._get_prepared_objects()
+        if sorted_object_whitelist is not None:
+            object_factors = object_factors[sorted_object_whitelist]
+            object_norms = object_norms[sorted_object_whitelist] if object_norms is not None else None
+        return object_factors, object_norms
+
+    def _get_subject_factors(self, subject_ids: np.ndarray) -> tp.Union[np.ndarray, sparse.csr_matrix]:
+        subject_factors = self.subjects_factors[subject_ids]
+        if self.distance == Distance.EUCLIDEAN:
+            subject_factors = np.hstack((-np.ones((subject_factors.shape[0], 1)), 2 * subject_factors))
+        return subject_factors
+
+    @staticmethod
+    def _merge_object_filters(
+        sorted_object_whitelist: tp.Optional[InternalIdsArray],
+        sorted_object_blacklist: tp.Optional[InternalIdsArray],
+    ) -> tp.Tuple[tp.Optional[InternalIdsArray], tp.Optional[InternalIdsArray]]:
+        """Return whitelist without blacklisted objects and blacklist that is needed only without whitelist."""
+        if sorted_object_blacklist is None:
+            return sorted_object_whitelist, None
+        if sorted_object_whitelist is None:
+            return None, sorted_object_blacklist
+        valid_mask = fast_isin_for_sorted_test_elements(sorted_object_whitelist, sorted_object_blacklist, invert=True)
+        return sorted_object_whitelist[valid_mask], None
+
+    def _calc_scores(
+        self, subject_ids: InternalIdsArray, object_factors: np.ndarray, object_norms: tp.Optional[np.ndarray]
+    ) -> np.ndarray:
+        """Calculate dense matrix of scores of given subjects for prepared objects."""
+        scores = np.asarray(self._get_subject_factors(subject_ids) @ object_factors.T)
+        if object_norms is not None:
+            scores /= object_norms
+        return scores
+
+    def _calc_objects_scores(self, subject_ids: InternalIdsArray, object_ids: np.ndarray) -> np.ndarray:
+        """Calculate scores of given objects (row of objects for every subject) like `_calc_scores` does."""
+        subject_factors = self.subjects_factors[subject_ids]
+        if isinstance(subject_factors, sparse.csr_matrix):
+            subject_factors = subject_factors.toarray()
+        object_factors = self.objects_factors[object_ids.ravel()].reshape(*object_ids.shape, -1)
+        scores = np.einsum("sf,sof->so", subject_factors, object_factors)
+        if self.distance == Distance.COSINE:
+            scores /= self._calc_norms(object_factors.reshape(object_ids.size, -1), avoid_zeros=True).reshape(
+                object_ids.shape
+            )
+        elif self.distance == Distance.EUCLIDEAN:
+            scores = 2 * scores - (object_factors**2).sum(axis=2)
+        return scores.astype(np.float32)
+
+    def _topk(
+        self,
+        subject_ids: InternalIdsArray,
+        object_factors: np.ndarray,
+        k: int,
+        object_norms: tp.Optional[np.ndarray],
+        sorted_object_whitelist: tp.Optional[InternalIdsArray],
+        filter_query_items: tp.Optional[sparse.csr_matrix],
+        filter_objects: tp.Optional[InternalIdsArray],
+        num_threads: int,
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """Select top-k prepared objects for given subjects, filtered objects get `neginf` scores."""
+        return implicit.cpu.topk.topk(  # pylint: disable=c-extension-no-member
+            items=object_factors,
+            query=self._get_subject_factors(subject_ids),
+            k=k,
+            item_norms=object_norms,  # query norms for COSINE distance are applied afterwards
+            filter_query_items=filter_query_items,
+            filter_items=filter_objects,  # objects that get neginf scores for all subjects
+            num_threads=num_threads,
+        )
 
-            all_target_ids.extend([subject_id for _ in range(len(relevant_ids))])
-            all_reco_ids.append(relevant_ids)
-            all_scores.append(relevant_scores)
+    def _topk_with_candidates(
+        self,
+        subject_ids: InternalIdsArray,
+        subject_candidates: UserCandidates,
+        object_factors: np.ndarray,
+        k: int,
+        object_norms: tp.Optional[np.ndarray],
+        sorted_object_whitelist: tp.Optional[InternalIdsArray],
+        filter_query_items: tp.Optional[sparse.csr_matrix],
+        filter_objects: tp.Optional[InternalIdsArray],
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """Select top-k objects like `implicit.cpu.topk.topk` does, but only for allowed subject-object pairs."""
+        allowed_query_items = subject_candidates.get_user_items(subject_ids, self.objects_factors.shape[0])
+        if sorted_object_whitelist is not None:
+            allowed_query_items = filter_items_from_sparse_matrix(sorted_object_whitelist, allowed_query_items)
+            # Columns are remapped to whitelist positions, but matrix shape is kept
+            allowed_query_items = allowed_query_items[:, : sorted_object_whitelist.size]
+
+        scores = self._calc_scores(subject_ids, object_factors, object_norms)
+        neginf = -np.finfo(np.float32).max  # the same value as implicit library uses
+        is_forbidden: np.ndarray = np.ones(scores.shape, dtype=bool)
+        allowed_rows = np.repeat(np.arange(scores.shape[0]), np.diff(allowed_query_items.indptr))
+        is_forbidden[allowed_rows, allowed_query_items.indices] = allowed_query_items.data == 0
+        scores[is_forbidden] = neginf
+        if filter_query_items is not None:
+            filter_rows = np.repeat(np.arange(scores.shape[0]), np.diff(filter_query_items.indptr))
+            scores[filter_rows, filter_query_items.indices] = neginf
+        if filter_objects is not None:
+            scores[:, filter_objects] = neginf
+
+        n_subjects, n_objects = scores.shape
+        if k < n_objects:
+            top_ids = np.argpartition(scores, n_objects - k, axis=1)[:, n_objects - k :]
+        else:
+            top_ids = np.broadcast_to(np.arange(n_objects), (n_subjects, n_objects))
+        top_scores = np.take_along_axis(scores, top_ids, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        return np.take_along_axis(top_ids, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
 
-        return all_target_ids, np.concatenate(all_reco_ids), np.concatenate(all_scores)
+    @staticmethod
+    def _get_chunk_size(
+        n_subjects: int, n_objects: int, batch_size: tp.Optional[int], subject_candidates: tp.Optional[UserCandidates]
+    ) -> int:
+        """Return number of subjects ranked at once, dense scores of chunks with candidates are limited in size."""
+        chunk_size = batch_size if batch_size is not None else max(n_subjects, 1)
+        if subject_candidates is not None:
+            chunk_size = min(chunk_size, max(MAX_CANDIDATES_CHUNK_SCORES // max(n_objects, 1), 1))
+        return chunk_size
+
+    def _rank_by_groups(
+        self,
+        subject_ids: InternalIdsArray,
+        k: int,
+        filter_pairs_csr: tp.Optional[sparse.csr_matrix],
+        sorted_object_whitelist: tp.Optional[InternalIdsArray],
+        sorted_object_blacklist: tp.Optional[InternalIdsArray],
+        num_threads: int,
+        batch_size: tp.Optional[int],
+        subject_groups: np.ndarray,
+        group_objects: sparse.csr_matrix,
+    ) -> tp.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Rank subjects of every group at once with group objects as whitelist and restore subjects order."""
+        order = np.argsort(subject_groups, kind="stable")
+        groups, group_starts = np.unique(subject_groups[order], return_index=True)
+        group_ends = np.append(group_starts[1:], order.size)
+
+        positions_parts, reco_parts = [], []
+        for group, start, end in zip(groups, group_starts, group_ends):
+            if group < 0:
+                continue
+            group_whitelist = np.unique(
+                group_objects.indices[group_objects.indptr[group] : group_objects.indptr[group + 1]]
+            )
+            if sorted_object_whitelist is not None:
+                group_whitelist = group_whitelist[
+                    fast_isin_for_sorted_test_elements(group_whitelist, sorted_object_whitelist)
+                ]
+            if sorted_object_blacklist is not None:
+                group_whitelist = group_whitelist[
+                    fast_isin_for_sorted_test_elements(group_whitelist, sorted_object_blacklist, invert=True)
+                ]
+            if group_whitelist.size == 0:
+                continue
+
+            positions = np.sort(order[start:end])
+            group_subject_ids = subject_ids[positions]
+            reco = self.rank(
+                group_subject_ids,
+                k,
+                filter_pairs_csr=filter_pairs_csr[positions] if filter_pairs_csr is not None else None,
+                sorted_object_whitelist=group_whitelist,
+                num_threads=num_threads,
+                batch_size=batch_size,
+            )
+            # Subjects are expected to be unique, so every reco row can be matched with subject position
+            subjects_order = np.argsort(group_subject_ids, kind="stable")
+            subject_pos = np.searchsorted(group_subject_ids[subjects_order], reco[0])
+            positions_parts.append(positions[subjects_order[subject_pos]])
+            reco_parts.append(reco)
+
+        if not reco_parts:
+            return np.array([], dtype=subject_ids.dtype), np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        reco_order = np.argsort(np.concatenate(positions_parts), kind="stable")
+        target_ids, reco_ids, scores = (np.concatenate(part)[reco_order] for part in zip(*reco_parts))
+        return target_ids, reco_ids, scores
 
     def rank(
         self,
@@ -139,6 +356,9 @@ class ImplicitRanker:
         filter_pairs_csr: tp.Optional[sparse.csr_matrix] = None,
         sorted_object_whitelist: tp.Optional[InternalIdsArray] = None,
         num_threads: int = 0,
+        batch_size: tp.Optional[int] = None,
+        sorted_object_blacklist: tp.Optional[InternalIdsArray] = None,
+        subject_candidates: tp.Optional[UserCandidates] = None,
     ) -> tp.Tuple[InternalIds, InternalIds, Scores]:
         """Rank objects to proceed inference using implicit library topk cpu method.
 
@@ -157,54 +377,114 @@ class ImplicitRanker:
             Otherwise all items from dataset will be used.
         num_threads : int, default 0
             Will be used as `num_threads` parameter for `implicit.cpu.topk.topk`.
+        batch_size : int, optional, default ``None``
+            Number of subjects ranked at once.
+            If given, subjects are processed in chunks of this size and results are written to preallocated arrays,
+            so peak memory of intermediate structures doesn't depend on the number of subjects.
+            Otherwise all subjects are ranked in one chunk.
+        sorted_object_blacklist : np.ndarray, optional, default ``None``
+            Sorted array of object ids that should never be recommended.
+            Passed to `implicit.cpu.topk.topk` as `filter_items` if whitelist is not given,
+            removed from the whitelist otherwise.
+        subject_candidates : UserCandidates, optional, default ``None``
+            Per-subject restrictions of objects that can be recommended.
+            If given, allowed objects are taken for every chunk of subjects and scores of all other objects are
+            masked before top-k selection. Dense matrix of scores is created for every chunk in this case,
+            so chunks are limited to ``MAX_CANDIDATES_CHUNK_SCORES // n_objects`` subjects
+            even if `batch_size` is bigger or not given.
+            If candidates are defined by groups of subjects (e.g. `GroupCandidates`), subjects of every group
+            are ranked at once with group objects as whitelist instead.
 
         Returns
         -------
         (InternalIds, InternalIds, Scores)
             Array of subject ids, array of recommended items, sorted by score descending and array of scores.
         """
-        if sorted_object_whitelist is not None:
-            object_factors = self.objects_factors[sorted_object_whitelist]
-
-            if filter_pairs_csr is not None:
-                #  filter ui_csr_for_filter matrix to contain only whitelist objects
-                filter_query_items = filter_items_from_sparse_matrix(sorted_object_whitelist, filter_pairs_csr)
-            else:
-                filter_query_items = None
-
-        else:
-            # keep all objects and full ui_csr_for_filter
-            object_factors = self.objects_factors
-            filter_query_items = filter_pairs_csr
-
-        subject_factors = self.subjects_factors[subject_ids]
-
-        object_norms = None  # for DOT and EUCLIDEAN distance
-        if self.distance == Distance.COSINE:
-            object_norms = self._calc_norms(object_factors, avoid_zeros=True)
+        if batch_size is not None and batch_size < 1:
+            raise ValueError("`batch_size` must be positive")
 
-        if self.distance == Distance.EUCLIDEAN:
-            # Transform factors to get top-k by Euclidean distance using Dot metric
-            # https://www.microsoft.com/en-us/research/wp-content/uploads/2016/02/XboxInnerProduct.pdf
-            subject_factors = np.hstack((-np.ones((subject_factors.shape[0], 1)), 2 * subject_factors))
-            object_factors = np.hstack(((object_factors**2).sum(axis=1).reshape(-1, 1), object_factors))
-
-        real_k = min(k, object_factors.shape[0])
+        subject_ids = np.asarray(subject_ids)
+        n_subjects = subject_ids.size
 
-        ids, scores = implicit.cpu.topk.topk(  # pylint: disable=c-extension-no-member
-            items=object_factors,
-            query=subject_factors,
-            k=real_k,
-            item_norms=object_norms,  # query norms for COSINE distance are applied afterwards
-            filter_query_items=filter_query_items,  # queries x objects csr matrix for getting neginf scores
-            filter_items=None,  # rectools doesn't support blacklist for now
-            num_threads=num_threads,
+        sorted_object_whitelist, filter_objects = self._merge_object_filters(
+            sorted_object_whitelist, sorted_object_blacklist
         )
+        subject_groups = subject_candidates.get_user_groups(subject_ids) if subject_candidates is not None else None
+        if subject_groups is not None:
+            return self._rank_by_groups(
+                subject_ids,
+                k,
+                filter_pairs_csr,
+                sorted_object_whitelist,
+                filter_objects,
+                num_threads,
+                batch_size,
+                *subject_groups,
+            )
+        object_factors, object_norms = self._prepare_objects(sorted_object_whitelist)
+        batch_size = self._get_chunk_size(n_subjects, object_factors.shape[0], batch_size, subject_candidates)
+
+        filter_query_items = filter_pairs_csr
+        if sorted_object_whitelist is not None and filter_pairs_csr is not None:
+            #  filter ui_csr_for_filter matrix to contain only whitelist objects
+            # Matrix is copied since implicit function zeroes values of given matrix in place
+            filter_query_items = filter_items_from_sparse_matrix(sorted_object_whitelist, filter_pairs_csr.copy())
 
-        if sorted_object_whitelist is not None:
-            ids = sorted_object_whitelist[ids]
-
-        # filter neginf from implicit scores and apply transformations to scores (for COSINE and EUCLIDEAN distances)
-        all_target_ids, all_reco_ids, all_scores = self._process_implicit_scores(subject_ids, ids, scores)
-
-        return all_target_ids, all_reco_ids, all_scores
+        real_k = min(k, object_factors.shape[0])
+        n_max_reco = n_subjects * real_k
+        all_target_ids = np.empty(n_max_reco, dtype=subject_ids.dtype)
+        # Dtypes of ids and scores are known only after the first chunk is ranked
+        all_reco_ids: tp.Optional[np.ndarray] = None
+        all_scores: tp.Optional[np.ndarray] = None
+        n_filled = 0
+
+        for start in range(0, n_subjects, batch_size):
+            chunk_subject_ids = subject_ids[start : start + batch_size]
+            # queries x objects csr matrix for getting neginf scores
+            chunk_filter_query_items = (
+                filter_query_items[start : start + batch_size] if filter_query_items is not None else None
+            )
+            if subject_candidates is None:
+                ids, scores = self._topk(
+                    chunk_subject_ids,
+                    object_factors,
+                    real_k,
+                    object_norms,
+                    sorted_object_whitelist,
+                    chunk_filter_query_items,
+                    filter_objects,
+                    num_threads,
+                )
+            else:
+                ids, scores = self._topk_with_candidates(
+                    chunk_subject_ids,
+                    subject_candidates,
+                    object_factors,
+                    real_k,
+                    object_norms,
+                    sorted_object_whitelist,
+                    chunk_filter_query_items,
+                    filter_objects,
+                )
+
+            if sorted_object_whitelist is not None:
+                ids = sorted_object_whitelist[ids]
+
+            # filter neginf from implicit scores and apply transformations to scores (for COSINE and EUCLIDEAN)
+            chunk_target_ids, chunk_reco_ids, chunk_scores = self._process_implicit_scores(
+                chunk_subject_ids, ids, scores
+            )
+
+            if all_reco_ids is None or all_scores is None:
+                all_reco_ids = np.empty(n_max_reco, dtype=chunk_reco_ids.dtype)
+                all_scores = np.empty(n_max_reco, dtype=chunk_scores.dtype)
+            n_chunk = chunk_target_ids.size
+            all_target_ids[n_filled : n_filled + n_chunk] = chunk_target_ids
+            all_reco_ids[n_filled : n_filled + n_chunk] = chunk_reco_ids
+            all_scores[n_filled : n_filled + n_chunk] = chunk_scores
+            n_filled += n_chunk
+
+        if all_reco_ids is None or all_scores is None:  # no subjects
+            all_reco_ids = np.array([], dtype=np.int64)
+            all_scores = np.array([], dtype=np.float32)
+        return all_target_ids[:n_filled], all_reco_ids[:n_filled], all_scores[:n_filled]
@@ -0,0 +1,231 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# pylint: disable=c-extension-no-member
+"""Ranker with approximate nearest neighbours search in HNSW index."""
+
+import typing as tp
+
+import nmslib
+import numpy as np
+from scipy import sparse
+
+from rectools import InternalIds
+from rectools.models.base import Scores
+from rectools.types import InternalIdsArray
+
+from .candidates import UserCandidates
+from .rank import Distance, ImplicitRanker
+
+
+class HnswRanker(ImplicitRanker):
+    """
+    Ranker that searches objects in HNSW index of `nmslib` library.
+
+    Index is built once on the first ranking and reused after.
+    For DOT distance objects vectors are transformed so that nearest neighbours by Euclidean distance
+    are objects with the biggest dot products (https://arxiv.org/abs/1405.5869).
+    Index returns more objects than needed to account for filtered ones (viewed and blacklisted objects),
+    scores of returned objects are calculated exactly. Subjects with the same number of returned objects
+    (rounded up to power of 2) query index together, subjects with too many filtered objects are ranked exactly.
+
+    Whitelists and per-subject candidates can't restrict search in index,
+    so exact ranking of `ImplicitRanker` is used when they are given.
+
+    Parameters
+    ----------
+    distance : Distance
+        Distance metric.
+    subjects_factors : np.ndarray
+        Array of subjects embeddings, shape (n_subjects, n_factors).
+    objects_factors : np.ndarray
+        Array with embeddings of all objects, shape (n_objects, n_factors).
+    create_index_params : dict(str, int), optional, default ``None``
+        `nmslib` HNSW index creation parameters. ``{"M": 16, "efConstruction": 100, "post": 0}`` if ``None``.
+    index_query_time_params : dict(str, int), optional, default ``None``
+        `nmslib` HNSW query time parameters. ``{"efSearch": 100}`` if ``None``.
+    max_overfetch_ratio : float, default 0.02
+        Maximum share of all objects that can be requested from index for subject.
+        Subjects that need more objects to account for filtered ones are ranked exactly,
+        since search and scoring of so many objects is slower than exact ranking.
+    """
+
+    def __init__(
+        self,
+        distance: Distance,
+        subjects_factors: np.ndarray,
+        objects_factors: np.ndarray,
+        create_index_params: tp.Optional[tp.Dict[str, int]] = None,
+        index_query_time_params: tp.Optional[tp.Dict[str, int]] = None,
+        max_overfetch_ratio: float = 0.02,
+    ) -> None:
+        if isinstance(subjects_factors, sparse.csr_matrix):
+            raise ValueError("HNSW ranking is not supported for `sparse.csr_matrix` subjects factors")
+        super().__init__(distance, subjects_factors, objects_factors)
+        self.create_index_params = (
+            create_index_params if create_index_params is not None else {"M": 16, "efConstruction": 100, "post": 0}
+        )
+        self.index_query_time_params = (
+            index_query_time_params if index_query_time_params is not None else {"efSearch": 100}
+        )
+        self.max_overfetch_ratio = max_overfetch_ratio
+
+    def _get_index(self) -> "nmslib.FloatIndex":
+        if "index" not in self._objects_cache:
+            object_vectors = self.objects_factors
+            if self.distance == Distance.DOT:
+                # Maximum inner product search is reduced to nearest neighbours search by Euclidean distance
+                dots = self._calc_dots(object_vectors)
+                extra = np.sqrt(np.maximum(dots.max(initial=0) - dots, 0))
+                object_vectors = np.hstack((object_vectors, extra[:, np.newaxis]))
+            space = "cosinesimil" if self.distance == Distance.COSINE else "l2"
+            index = nmslib.init(method="hnsw", space=space, data_type=nmslib.DataType.DENSE_VECTOR)
+            index.addDataPointBatch(object_vectors)
+            index.createIndex(self.create_index_params, print_progress=False)
+            index.setQueryTimeParams(self.index_query_time_params)
+            self._objects_cache["index"] = index
+        return self._objects_cache["index"]
+
+    def _get_query_vectors(self, subject_ids: InternalIdsArray) -> np.ndarray:
+        query_vectors = self.subjects_factors[subject_ids]
+        if self.distance == Distance.DOT:
+            query_vectors = np.hstack((query_vectors, np.zeros((query_vectors.shape[0], 1), dtype=np.float32)))
+        return query_vectors
+
+    def _query_index(self, subject_ids: InternalIdsArray, n_neighbours: int, num_threads: int) -> np.ndarray:
+        """Return ids of nearest objects for every subject, rows are padded with ``-1``."""
+        neighbours = self._get_index().knnQueryBatch(
+            self._get_query_vectors(subject_ids), k=n_neighbours, num_threads=num_threads
+        )
+        lengths: np.ndarray = np.array([len(ids) for ids, _ in neighbours], dtype=np.int64)
+        ids: np.ndarray = np.full((subject_ids.size, n_neighbours), -1, dtype=np.int64)
+        if lengths.sum() > 0:
+            ids[np.arange(n_neighbours) < lengths[:, np.newaxis]] = np.concatenate([ids for ids, _ in neighbours])
+        return ids
+
+    @staticmethod
+    def _get_filtered_mask(
+        ids: np.ndarray,
+        filter_pairs_csr: tp.Optional[sparse.csr_matrix],
+        sorted_object_blacklist: tp.Optional[InternalIdsArray],
+    ) -> np.ndarray:
+        """Return mask of objects that must not be recommended to corresponding subjects."""
+        is_filtered = ids < 0
+        if sorted_object_blacklist is not None and sorted_object_blacklist.size > 0:
+            is_filtered |= np.isin(ids, sorted_object_blacklist)
+        if filter_pairs_csr is not None and filter_pairs_csr.nnz > 0:
+            # Pairs are encoded as ``row * n_cols + col`` to check all of them at once
+            n_cols = max(filter_pairs_csr.shape[1], ids.max(initial=0) + 1)
+            filter_rows = np.repeat(np.arange(filter_pairs_csr.shape[0]), np.diff(filter_pairs_csr.indptr))
+            filter_keys = np.sort(filter_rows * n_cols + filter_pairs_csr.indices)
+            keys = np.arange(ids.shape[0])[:, np.newaxis] * n_cols + ids
+            positions = np.minimum(np.searchsorted(filter_keys, keys), filter_keys.size - 1)
+            is_filtered |= filter_keys[positions] == keys
+        return is_filtered
+
+    def _rank_chunk(
+        self,
+        subject_ids: InternalIdsArray,
+        k: int,
+        filter_pairs_csr: tp.Optional[sparse.csr_matrix],
+        sorted_object_blacklist: tp.Optional[InternalIdsArray],
+        num_threads: int,
+    ) -> tp.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        n_objects = self.objects_factors.shape[0]
+        real_k = min(k, n_objects)
+        # Every subject over-fetches neighbours to account for its own filtered objects
+        n_filtered: np.ndarray = np.full(
+            subject_ids.size, sorted_object_blacklist.size if sorted_object_blacklist is not None else 0, dtype=np.int64
+        )
+        if filter_pairs_csr is not None:
+            n_filtered += np.diff(filter_pairs_csr.indptr)
+        # Subjects with the same over-fetch rounded up to power of 2 query index together,
+        # subjects with too big over-fetch (``0`` neighbours) are ranked exactly
+        n_neighbours = np.minimum(2 ** np.ceil(np.log2(k + n_filtered)).astype(np.int64), n_objects)
+        n_neighbours[k + n_filtered > self.max_overfetch_ratio * n_objects] = 0
+
+        neginf = float(-np.finfo(np.float32).max)  # the same value as implicit library uses
+        ids: np.ndarray = np.full((subject_ids.size, real_k), -1, dtype=np.int64)
+        scores: np.ndarray = np.full((subject_ids.size, real_k), neginf, dtype=np.float32)
+        for group_n_neighbours in np.unique(n_neighbours):
+            rows = np.flatnonzero(n_neighbours == group_n_neighbours)
+            group_filter_pairs_csr = filter_pairs_csr[rows] if filter_pairs_csr is not None else None
+            if group_n_neighbours == 0:
+                object_factors, object_norms = self._prepare_objects(None)
+                ids[rows], scores[rows] = self._topk(
+                    subject_ids[rows],
+                    object_factors,
+                    real_k,
+                    object_norms,
+                    None,
+                    group_filter_pairs_csr,
+                    sorted_object_blacklist,
+                    num_threads,
+                )
+                continue
+            group_ids = self._query_index(subject_ids[rows], group_n_neighbours, num_threads)
+            group_scores = self._calc_objects_scores(subject_ids[rows], np.maximum(group_ids, 0))
+            group_scores[self._get_filtered_mask(group_ids, group_filter_pairs_csr, sorted_object_blacklist)] = neginf
+            order = np.argsort(-group_scores, axis=1, kind="stable")[:, :real_k]
+            ids[rows] = np.take_along_axis(group_ids, order, axis=1)
+            scores[rows] = np.take_along_axis(group_scores, order, axis=1)
+        return self._process_implicit_scores(subject_ids, ids, scores)
+
+    def rank(
+        self,
+        subject_ids: InternalIds,
+        k: int,
+        filter_pairs_csr: tp.Optional[sparse.csr_matrix] = None,
+        sorted_object_whitelist: tp.Optional[InternalIdsArray] = None,
+        num_threads: int = 0,
+        batch_size: tp.Optional[int] = None,
+        sorted_object_blacklist: tp.Optional[InternalIdsArray] = None,
+        subject_candidates: tp.Optional[UserCandidates] = None,
+    ) -> tp.Tuple[InternalIds, InternalIds, Scores]:
+        """Rank objects using HNSW index, see `ImplicitRanker.rank` for parameters description.
+
+        `num_threads` is passed to `knnQueryBatch` method of index.
+        If `sorted_object_whitelist` or `subject_candidates` are given, objects are ranked exactly.
+        """
+        subject_ids = np.asarray(subject_ids)
+        if sorted_object_whitelist is not None or subject_candidates is not None or self.objects_factors.size == 0:
+            return super().rank(
+                subject_ids,
+                k,
+                filter_pairs_csr=filter_pairs_csr,
+                sorted_object_whitelist=sorted_object_whitelist,
+                num_threads=num_threads,
+                batch_size=batch_size,
+                sorted_object_blacklist=sorted_object_blacklist,
+                subject_candidates=subject_candidates,
+            )
+        if batch_size is not None and batch_size < 1:
+            raise ValueError("`batch_size` must be positive")
+        if batch_size is None:
+            batch_size = max(subject_ids.size, 1)
+
+        parts = [
+            self._rank_chunk(
+                subject_ids[start : start + batch_size],
+                k,
+                filter_pairs_csr[start : start + batch_size] if filter_pairs_csr is not None else None,
+                sorted_object_blacklist,
+                num_threads,
+            )
+            for start in range(0, subject_ids.size, batch_size)
+        ]
+        if not parts:
+            return subject_ids, np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        target_ids, reco_ids, scores = (np.concatenate(part) for part in zip(*parts))
+        return target_ids, reco_ids, scores
@@ -0,0 +1,223 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Ranker with reduced precision storage of objects factors."""
+
+import typing as tp
+
+import numpy as np
+from scipy import sparse
+
+from rectools.types import InternalIdsArray
+
+from .rank import Distance, ImplicitRanker
+
+QUANTIZATION_DTYPES = ("float16", "int8")
+
+
+class QuantizedRanker(ImplicitRanker):
+    """
+    Ranker that stores objects factors with reduced precision to save memory.
+
+    Objects factors are stored as ``float16`` or as ``int8`` with per-object ``float32`` scales.
+    Scores are calculated for blocks of objects with ``float32`` accumulation,
+    so full precision copy of all objects factors is never created.
+    Optionally top objects by approximate scores are re-ranked with full precision factors.
+
+    Parameters
+    ----------
+    distance : Distance
+        Distance metric.
+    subjects_factors : np.ndarray
+        Array of subjects embeddings, shape (n_subjects, n_factors).
+    objects_factors : np.ndarray
+        Array with embeddings of all objects, shape (n_objects, n_factors).
+        It's used for re-ranking only, so it can be a memory mapped array.
+    dtype : {"float16", "int8"}, default "int8"
+        Storage type of objects factors.
+        For ``"int8"`` every object vector is scaled to ``[-127, 127]`` range and the scale is stored separately.
+    block_size : int, default 16384
+        Number of objects scored at once.
+    rerank_factor : int, optional, default ``None``
+        If given, ``k * rerank_factor`` top objects by approximate scores are re-ranked
+        with full precision factors taken from `objects_factors`. Otherwise approximate scores are returned.
+    """
+
+    def __init__(
+        self,
+        distance: Distance,
+        subjects_factors: np.ndarray,
+        objects_factors: np.ndarray,
+        dtype: str = "int8",
+        block_size: int = 16384,
+        rerank_factor: tp.Optional[int] = None,
+    ) -> None:
+        if isinstance(subjects_factors, sparse.csr_matrix):
+            raise ValueError("Quantized ranking is not supported for `sparse.csr_matrix` subjects factors")
+        if dtype not in QUANTIZATION_DTYPES:
+            raise ValueError(f"Unexpected dtype `{dtype}`, expected one of {QUANTIZATION_DTYPES}")
+        if block_size < 1:
+            raise ValueError("`block_size` must be positive")
+        if rerank_factor is not None and rerank_factor < 1:
+            raise ValueError("`rerank_factor` must be positive")
+
+        super().__init__(distance, subjects_factors, objects_factors)
+        self.dtype = dtype
+        self.block_size = block_size
+        self.rerank_factor = rerank_factor
+
+    def _quantize(self, object_factors: np.ndarray) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """Return quantized factors and per-object multipliers and offsets of scores."""
+        object_factors = np.asarray(object_factors, dtype=np.float32)
+        n_objects = object_factors.shape[0]
+        if self.dtype == "int8":
+            scales = np.abs(object_factors).max(axis=1, initial=0) / 127
+            scales[scales == 0] = 1
+            values = np.rint(object_factors / scales[:, np.newaxis]).astype(np.int8)
+        else:
+            scales = np.ones(n_objects, dtype=np.float32)
+            values = object_factors.astype(np.float16)
+
+        # score = multiplier * <subject, quantized object> + offset
+        multipliers = scales.astype(np.float32)
+        offsets = np.zeros(n_objects, dtype=np.float32)
+        if self.distance == Distance.COSINE:
+            multipliers /= self._calc_norms(object_factors, avoid_zeros=True)
+        elif self.distance == Distance.EUCLIDEAN:
+            # The same scores as for Dot metric with augmented vectors in `ImplicitRanker`,
+            # but squared norms are kept in full precision
+            multipliers *= 2
+            offsets = -self._calc_dots(object_factors)
+        return values, np.column_stack((multipliers, offsets))
+
+    def _get_prepared_objects(self) -> tp.Tuple[np.ndarray, tp.Optional[np.ndarray]]:
+        if "prepared_objects" not in self._objects_cache:
+            # Objects are quantized in blocks to avoid full precision copies of transformed factors
+            parts = [
+                self._quantize(self.objects_factors[start : start + self.block_size])
+                for start in range(0, self.objects_factors.shape[0], self.block_size)
+            ]
+            if parts:
+                values = np.concatenate([part[0] for part in parts])
+                coefs = np.concatenate([part[1] for part in parts])
+            else:
+                values, coefs = self._quantize(self.objects_factors)
+            self._objects_cache["prepared_objects"] = values, coefs
+        return self._objects_cache["prepared_objects"]
+
+    @property
+    def objects_nbytes(self) -> int:
+        """Return number of bytes used by prepared objects factors and their scales."""
+        values, coefs = self._get_prepared_objects()
+        return values.nbytes + (coefs.nbytes if coefs is not None else 0)
+
+    def _calc_scores(
+        self, subject_ids: InternalIdsArray, object_factors: np.ndarray, object_norms: tp.Optional[np.ndarray]
+    ) -> np.ndarray:
+        """Calculate approximate scores block by block, `object_norms` are multipliers and offsets of scores."""
+        subject_factors = self.subjects_factors[subject_ids]
+        n_objects = object_factors.shape[0]
+        scores = np.empty((subject_factors.shape[0], n_objects), dtype=np.float32)
+        for start in range(0, n_objects, self.block_size):
+            end = min(start + self.block_size, n_objects)
+            block_scores = scores[:, start:end]
+            np.matmul(subject_factors, object_factors[start:end].astype(np.float32).T, out=block_scores)
+            if object_norms is not None:
+                block_scores *= object_norms[start:end, 0]
+                block_scores += object_norms[start:end, 1]
+        return scores
+
+    @staticmethod
+    def _select_top(ids: np.ndarray, scores: np.ndarray, k: int) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """Select `k` ids with top scores in every row, sorted by score descending."""
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            ids = np.take_along_axis(ids, top, axis=1)
+            scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-scores, axis=1, kind="stable")
+        return np.take_along_axis(ids, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+    @staticmethod
+    def _get_block_top(
+        scores: np.ndarray, start: int, n_top: int, threshold: tp.Optional[np.ndarray]
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """Return objects of block that can get into current top, `threshold` is the worst score of full top."""
+        n_subjects, n_block = scores.shape
+        if threshold is not None:
+            # Only scores better than the worst score of current top are taken, usually there are few of them
+            rows, cols = np.nonzero(scores > threshold[:, np.newaxis])
+            counts = np.bincount(rows, minlength=n_subjects)
+            positions = np.arange(rows.size) - np.repeat(np.cumsum(counts) - counts, counts)
+            block_ids = np.zeros((n_subjects, counts.max(initial=0)), dtype=np.int64)
+            block_scores = np.full(block_ids.shape, -np.inf, dtype=np.float32)  # never gets into full top
+            block_ids[rows, positions] = cols + start
+            block_scores[rows, positions] = scores[rows, cols]
+            return block_ids, block_scores
+        if n_top < n_block:
+            top = np.argpartition(scores, n_block - n_top, axis=1)[:, n_block - n_top :]
+            return top + start, np.take_along_axis(scores, top, axis=1)
+        return np.broadcast_to(np.arange(start, start + n_block), scores.shape), scores
+
+    def _topk(
+        self,
+        subject_ids: InternalIdsArray,
+        object_factors: np.ndarray,
+        k: int,
+        object_norms: tp.Optional[np.ndarray],
+        sorted_object_whitelist: tp.Optional[InternalIdsArray],
+        filter_query_items: tp.Optional[sparse.csr_matrix],
+        filter_objects: tp.Optional[InternalIdsArray],
+        num_threads: int,
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """Select top-k objects by approximate scores merging top objects of every block of objects."""
+        n_subjects, n_objects = subject_ids.size, object_factors.shape[0]
+        n_top = min(k * self.rerank_factor, n_objects) if self.rerank_factor is not None else k
+        neginf = -np.finfo(np.float32).max  # the same value as implicit library uses
+
+        objects_mask = np.zeros(n_objects, dtype=bool)
+        if filter_objects is not None:
+            objects_mask[filter_objects] = True
+        if filter_query_items is not None:
+            # All stored pairs are filtered like in implicit library, even explicit zeros
+            filter_rows = np.repeat(np.arange(n_subjects), np.diff(filter_query_items.indptr))
+            filter_cols = filter_query_items.indices
+            cols_order = np.argsort(filter_cols, kind="stable")
+            filter_rows, filter_cols = filter_rows[cols_order], filter_cols[cols_order]
+
+        top_ids = np.empty((n_subjects, 0), dtype=np.int64)
+        top_scores = np.empty((n_subjects, 0), dtype=np.float32)
+        for start in range(0, n_objects, self.block_size):
+            end = min(start + self.block_size, n_objects)
+            scores = self._calc_scores(
+                subject_ids, object_factors[start:end], object_norms[start:end] if object_norms is not None else None
+            )
+            scores[:, objects_mask[start:end]] = neginf
+            if filter_query_items is not None:
+                left, right = np.searchsorted(filter_cols, [start, end])
+                scores[filter_rows[left:right], filter_cols[left:right] - start] = neginf
+            threshold = top_scores[:, -1] if top_scores.shape[1] == n_top else None
+            block_ids, block_scores = self._get_block_top(scores, start, n_top, threshold)
+            top_ids, top_scores = self._select_top(
+                np.hstack((top_ids, block_ids)),
+                np.hstack((top_scores, block_scores)),
+                min(n_top, top_ids.shape[1] + block_ids.shape[1]),
+            )
+
+        if self.rerank_factor is not None and top_ids.size > 0:
+            object_ids = sorted_object_whitelist[top_ids] if sorted_object_whitelist is not None else top_ids
+            exact_scores = self._calc_objects_scores(subject_ids, object_ids)
+            # Filtered objects keep `neginf` scores
+            top_scores = np.where(top_scores > neginf, exact_scores, neginf)
+            top_ids, top_scores = self._select_top(top_ids, top_scores, min(k, top_ids.shape[1]))
+        return top_ids, top_scores
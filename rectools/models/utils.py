@@ -43,6 +43,67 @@ def get_viewed_item_ids(user_items: sparse.csr_matrix, user_id: InternalId) -> I
     return user_items.indices[user_items.indptr[user_id] : user_items.indptr[user_id + 1]]
 
 
+def get_stored_pairs_mask(matrix: sparse.csr_matrix, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    """
+    Return mask of (row, column) pairs that are stored in sparse matrix.
+
+    All stored elements are taken into account, even explicit zeros (like in `get_viewed_item_ids`).
+
+    Parameters
+    ----------
+    matrix : csr_matrix
+        Sparse matrix, e.g. interactions of some users.
+    rows : np.ndarray
+        Row indices of pairs.
+    cols : np.ndarray
+        Column indices of pairs, the same size as `rows`.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask of the same size as `rows`.
+    """
+    if matrix.nnz == 0 or rows.size == 0:
+        return np.zeros(rows.size, dtype=bool)
+    if not matrix.has_sorted_indices:
+        matrix = matrix.sorted_indices()
+    # Pairs are encoded as ``row * n_cols + col``, stored keys are sorted since indices are sorted in rows
+    n_cols = np.int64(max(matrix.shape[1], cols.max() + 1))
+    stored_rows: np.ndarray = np.repeat(np.arange(matrix.shape[0], dtype=np.int64), np.diff(matrix.indptr))
+    stored_keys = stored_rows * n_cols + matrix.indices
+    keys = rows.astype(np.int64) * n_cols + cols
+    positions = np.minimum(np.searchsorted(stored_keys, keys), stored_keys.size - 1)
+    return stored_keys[positions] == keys
+
+
+def get_first_k_in_rows_mask(rows: np.ndarray, mask: np.ndarray, k: tp.Union[int, np.ndarray]) -> np.ndarray:
+    """
+    Return mask with only first `k` selected elements of every row left.
+
+    Parameters
+    ----------
+    rows : np.ndarray
+        Non-decreasing row indices of elements.
+    mask : np.ndarray
+        Boolean mask of selected elements, the same size as `rows`.
+    k : int | np.ndarray
+        Maximum number of selected elements in every row,
+        or array of the same size as `rows` with maximum for row of every element.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask of the same size as `rows`.
+    """
+    if rows.size == 0:
+        return mask.copy()
+    n_selected = np.cumsum(mask)
+    row_starts = np.flatnonzero(np.concatenate(([True], rows[1:] != rows[:-1])))
+    row_sizes = np.diff(np.append(row_starts, rows.size))
+    n_selected_before_row = np.repeat(n_selected[row_starts] - mask[row_starts], row_sizes)
+    return mask & (n_selected - n_selected_before_row <= k)
+
+
 def recommend_from_scores(
     scores: ScoresArray,
     k: int,
@@ -114,3 +175,74 @@ def recommend_from_scores(
         reco_scores = -reco_scores
 
     return reco_ids, reco_scores
+
+
+def get_positions_in_rows(rows: np.ndarray) -> np.ndarray:
+    """
+    Return position of every element in its row.
+
+    Parameters
+    ----------
+    rows : np.ndarray
+        Non-decreasing row indices of elements.
+
+    Returns
+    -------
+    np.ndarray
+        Positions starting from 0 in every row, the same size as `rows`.
+    """
+    if rows.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    row_starts = np.flatnonzero(np.concatenate(([True], rows[1:] != rows[:-1])))
+    row_sizes = np.diff(np.append(row_starts, rows.size))
+    return np.arange(rows.size) - np.repeat(row_starts, row_sizes)
+
+
+def get_descending_scores_order_in_rows(rows: np.ndarray, scores: ScoresArray) -> np.ndarray:
+    """
+    Return order of elements sorted by rows and by descending scores inside rows.
+
+    Scores are compared as ``float32``, elements with equal scores keep their relative order.
+
+    Parameters
+    ----------
+    rows : np.ndarray
+        Non-negative row indices of elements, less than ``2 ** 32``.
+    scores : np.ndarray
+        Scores of elements, the same size as `rows`.
+
+    Returns
+    -------
+    np.ndarray
+        Indices that sort elements.
+    """
+    # Both rows and scores are packed into one ``uint64`` key which is much faster to sort than several keys.
+    # Bits of ``float32`` scores are mapped to ``uint32`` in reversed order of scores:
+    # bits of non-negative scores are inverted except sign bit, bits of negative scores are kept as is
+    bits: np.ndarray = scores.astype(np.float32).view(np.uint32)
+    reversed_bits = np.where(bits >> np.uint32(31) == 0, bits ^ np.uint32(0x7FFFFFFF), bits)
+    keys = (rows.astype(np.uint64) << np.uint64(32)) | reversed_bits.astype(np.uint64)
+    return np.argsort(keys, kind="stable")
+
+
+def splitmix64(values: np.ndarray) -> np.ndarray:
+    """
+    Return SplitMix64 hashes of values.
+
+    All bits of hashes depend on all bits of values, so hashes of sequential numbers (e.g. internal ids or counters)
+    can be used as independent uniformly distributed random numbers.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Integer values, they are converted to ``uint64``.
+
+    Returns
+    -------
+    np.ndarray
+        ``uint64`` hashes of the same shape as `values`.
+    """
+    hashes = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    hashes = (hashes ^ (hashes >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    hashes = (hashes ^ (hashes >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return hashes ^ (hashes >> np.uint64(31))
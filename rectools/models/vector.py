@@ -18,13 +18,18 @@ import typing as tp
 
 import attr
 import numpy as np
+from scipy import sparse
 
 from rectools import InternalIds
 from rectools.dataset import Dataset
 from rectools.models.base import ModelBase, Scores
 from rectools.types import InternalIdsArray
 
+from .candidates import UserCandidates
 from .rank import Distance, ImplicitRanker
+from .rank_quantized import QUANTIZATION_DTYPES, QuantizedRanker
+
+VectorModelT = tp.TypeVar("VectorModelT", bound="VectorModel")
 
 
 @attr.s(auto_attribs=True)
@@ -35,12 +40,168 @@ class Factors:
     biases: tp.Optional[np.ndarray] = None
 
 
+class _SubsetCandidates(UserCandidates):
+    """Candidates for subset of users that are addressed by positions in `user_ids`."""
+
+    def __init__(self, candidates: UserCandidates, user_ids: InternalIdsArray) -> None:
+        self.candidates = candidates
+        self.user_ids = user_ids
+
+    def get_user_items(self, user_ids: InternalIdsArray, n_items: int) -> sparse.csr_matrix:
+        return self.candidates.get_user_items(self.user_ids[user_ids], n_items)
+
+    def get_user_groups(self, user_ids: InternalIdsArray) -> tp.Optional[tp.Tuple[np.ndarray, sparse.csr_matrix]]:
+        return self.candidates.get_user_groups(self.user_ids[user_ids])
+
+
 class VectorModel(ModelBase):
-    """Base class for models that represents users and items as vectors"""
+    """
+    Base class for models that represents users and items as vectors.
+
+    Parameters
+    ----------
+    verbose : int, default 0
+        Degree of verbose output. If 0, no output will be provided.
+    recommend_batch_size : int, optional, default ``None``
+        Number of targets (users or items) ranked at once in `recommend` and `recommend_to_items` methods.
+        Smaller values reduce peak memory usage for big batches of targets.
+        If ``None``, all targets are ranked at once.
+    recommend_quantization : {"float16", "int8"}, optional, default ``None``
+        Storage type of items factors used for ranking (see `QuantizedRanker`).
+        Reduces memory usage of ranking at the cost of approximate scores.
+        If ``None``, float32 factors are used.
+    recommend_rerank_factor : int, optional, default ``None``
+        Used only with `recommend_quantization`: top ``k * recommend_rerank_factor`` items by approximate scores
+        are re-ranked with full precision factors. If ``None``, items are not re-ranked.
+    recommend_backend : {"exact", "hnsw"}, default ``"exact"``
+        Ranking engine. ``"hnsw"`` means approximate search in HNSW index (see `HnswRanker`),
+        requires `nmslib` to be installed. Quantization can't be used with ``"hnsw"`` backend.
+    recommend_backend_params : dict, optional, default ``None``
+        Keyword arguments of `HnswRanker`, e.g. ``{"index_query_time_params": {"efSearch": 200}}``.
+    """
+
+    supports_items_to_exclude = True
+    supports_candidates = True
 
     u2i_dist: Distance = NotImplemented
     i2i_dist: Distance = NotImplemented
     n_threads: int = 0  # TODO: decide how to pass it correctly for all models
+    # Whether factors are calculated from dataset passed to `recommend` (e.g. from features).
+    # If so, users factors are calculated only for requested users and items factors are cached
+    # for the last seen item features. Otherwise factors are fixed after fit and prepared rankers are cached.
+    factors_depend_on_dataset: bool = True
+
+    def __init__(
+        self,
+        *args: tp.Any,
+        verbose: int = 0,
+        recommend_batch_size: tp.Optional[int] = None,
+        recommend_quantization: tp.Optional[str] = None,
+        recommend_rerank_factor: tp.Optional[int] = None,
+        recommend_backend: str = "exact",
+        recommend_backend_params: tp.Optional[tp.Dict[str, tp.Any]] = None,
+        **kwargs: tp.Any,
+    ) -> None:
+        super().__init__(*args, verbose=verbose, **kwargs)
+        self.recommend_batch_size = recommend_batch_size
+        self.recommend_quantization = recommend_quantization
+        self.recommend_rerank_factor = recommend_rerank_factor
+        self.recommend_backend = recommend_backend
+        self.recommend_backend_params = recommend_backend_params
+        self._check_recommend_settings()
+        # Rankers with items factors they were created for (``None`` if factors are fixed after fit)
+        self._rankers: tp.Dict[tp.Tuple[tp.Any, ...], tp.Tuple[tp.Optional[Factors], ImplicitRanker]] = {}
+        self._items_factors_cache: tp.Optional[tp.Tuple[tp.Any, int, Factors]] = None
+
+    def __getstate__(self) -> tp.Dict[str, tp.Any]:
+        # Prepared rankers and cached factors duplicate fitted ones, so they are not serialized and rebuilt on demand
+        state = self.__dict__.copy()
+        state["_rankers"] = {}
+        state["_items_factors_cache"] = None
+        return state
+
+    def fit(self: VectorModelT, dataset: Dataset, *args: tp.Any, **kwargs: tp.Any) -> VectorModelT:
+        """
+        Fit model.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Dataset with input data.
+
+        Returns
+        -------
+        self
+        """
+        self._rankers.clear()
+        self._items_factors_cache = None
+        return super().fit(dataset, *args, **kwargs)
+
+    def _get_ranker(
+        self, kind: str, dataset: Dataset, user_ids: tp.Optional[InternalIdsArray] = None
+    ) -> ImplicitRanker:
+        """
+        Return ranker for ``"u2i"`` or ``"i2i"`` recommendations reusing prepared objects data when possible.
+
+        If factors are fixed after fit, the whole ranker is reused.
+        Otherwise prepared items data (e.g. index) is reused while items factors are the same
+        and subjects are taken for given `user_ids` only.
+        """
+        key = (
+            kind,
+            self.recommend_backend,
+            repr(self.recommend_backend_params),
+            self.recommend_quantization,
+            self.recommend_rerank_factor,
+        )
+        items_factors = self._get_cached_items_factors(dataset) if self.factors_depend_on_dataset else None
+        cached = self._rankers.get(key)
+        is_cached = cached is not None and cached[0] is items_factors
+        if cached is not None and is_cached and not self.factors_depend_on_dataset:
+            return cached[1]
+
+        if kind == "u2i":
+            distance = self.u2i_dist
+            subject_vectors, object_vectors = self._get_u2i_vectors(dataset, user_ids)
+        else:
+            distance = self.i2i_dist
+            subject_vectors, object_vectors = self._get_i2i_vectors(dataset)
+        if cached is not None and is_cached:
+            return cached[1].with_subjects(subject_vectors)
+        ranker = self._make_ranker(distance, subject_vectors, object_vectors)
+        self._rankers[key] = (items_factors, ranker)
+        return ranker
+
+    def _check_recommend_settings(self) -> None:
+        if self.recommend_backend not in ("exact", "hnsw"):
+            raise ValueError(f"Unexpected recommend backend `{self.recommend_backend}`, expected `exact` or `hnsw`")
+        if self.recommend_quantization is not None and self.recommend_quantization not in QUANTIZATION_DTYPES:
+            raise ValueError(
+                f"Unexpected recommend quantization `{self.recommend_quantization}`, "
+                f"expected one of {QUANTIZATION_DTYPES}"
+            )
+        is_quantized = self.recommend_quantization is not None or self.recommend_rerank_factor is not None
+        if self.recommend_backend == "hnsw" and is_quantized:
+            raise ValueError("Quantization and re-ranking are not supported with `hnsw` recommend backend")
+
+    def _make_ranker(
+        self, distance: Distance, subject_vectors: np.ndarray, object_vectors: np.ndarray
+    ) -> ImplicitRanker:
+        # Settings may be changed after model creation
+        self._check_recommend_settings()
+        if self.recommend_backend == "hnsw":
+            from .rank_hnsw import HnswRanker  # pylint: disable=import-outside-toplevel
+
+            return HnswRanker(distance, subject_vectors, object_vectors, **(self.recommend_backend_params or {}))
+        if self.recommend_quantization is None:
+            return ImplicitRanker(distance, subject_vectors, object_vectors)
+        return QuantizedRanker(
+            distance,
+            subject_vectors,
+            object_vectors,
+            dtype=self.recommend_quantization,
+            rerank_factor=self.recommend_rerank_factor,
+        )
 
     def _recommend_u2i(
         self,
@@ -49,23 +210,39 @@ class VectorModel(ModelBase):
         k: int,
         filter_viewed: bool,
         sorted_item_ids_to_recommend: tp.Optional[InternalIdsArray],
+        sorted_item_ids_to_exclude: tp.Optional[InternalIdsArray] = None,
+        user_candidates: tp.Optional[UserCandidates] = None,
     ) -> tp.Tuple[InternalIds, InternalIds, Scores]:
         if filter_viewed:
             user_items = dataset.get_user_item_matrix(include_weights=False)
         else:
             user_items = None
 
-        user_vectors, item_vectors = self._get_u2i_vectors(dataset)
-
-        ranker = ImplicitRanker(self.u2i_dist, user_vectors, item_vectors)
         ui_csr_for_filter = user_items[user_ids] if filter_viewed else None
-        return ranker.rank(
-            subject_ids=user_ids,
+
+        if self.factors_depend_on_dataset:
+            # Factors are calculated only for requested users, so users are ranked by their positions
+            ranker = self._get_ranker("u2i", dataset, user_ids)
+            subject_ids = np.arange(user_ids.size)
+            if user_candidates is not None:
+                user_candidates = _SubsetCandidates(user_candidates, user_ids)
+        else:
+            ranker = self._get_ranker("u2i", dataset)
+            subject_ids = user_ids
+
+        target_ids, reco_ids, scores = ranker.rank(
+            subject_ids=subject_ids,
             k=k,
             filter_pairs_csr=ui_csr_for_filter,
             sorted_object_whitelist=sorted_item_ids_to_recommend,
             num_threads=self.n_threads,
+            batch_size=self.recommend_batch_size,
+            sorted_object_blacklist=sorted_item_ids_to_exclude,
+            subject_candidates=user_candidates,
         )
+        if self.factors_depend_on_dataset:
+            target_ids = user_ids[target_ids]
+        return target_ids, reco_ids, scores
 
     def _recommend_i2i(
         self,
@@ -73,17 +250,17 @@ class VectorModel(ModelBase):
         dataset: Dataset,
         k: int,
         sorted_item_ids_to_recommend: tp.Optional[InternalIdsArray],
+        sorted_item_ids_to_exclude: tp.Optional[InternalIdsArray] = None,
     ) -> tp.Tuple[InternalIds, InternalIds, Scores]:
-        item_vectors_1, item_vectors_2 = self._get_i2i_vectors(dataset)
-
-        ranker = ImplicitRanker(self.i2i_dist, item_vectors_1, item_vectors_2)
-
+        ranker = self._get_ranker("i2i", dataset)
         return ranker.rank(
             subject_ids=target_ids,
             k=k,
             filter_pairs_csr=None,
             sorted_object_whitelist=sorted_item_ids_to_recommend,
             num_threads=self.n_threads,
+            batch_size=self.recommend_batch_size,
+            sorted_object_blacklist=sorted_item_ids_to_exclude,
         )
 
     def _process_biases_to_vectors(
@@ -109,9 +286,14 @@ class VectorModel(ModelBase):
             raise ValueError(f"Unexpected distance `{distance}`")
         return subject_vectors, object_vectors
 
-    def _get_u2i_vectors(self, dataset: Dataset) -> tp.Tuple[np.ndarray, np.ndarray]:
-        user_factors = self._get_users_factors(dataset)
-        item_factors = self._get_items_factors(dataset)
+    def _get_u2i_vectors(
+        self, dataset: Dataset, user_ids: tp.Optional[InternalIdsArray] = None
+    ) -> tp.Tuple[np.ndarray, np.ndarray]:
+        if user_ids is None:
+            user_factors = self._get_users_factors(dataset)
+        else:
+            user_factors = self._get_users_factors_by_ids(dataset, user_ids)
+        item_factors = self._get_cached_items_factors(dataset)
 
         user_vectors = user_factors.embeddings
         item_vectors = item_factors.embeddings
@@ -126,7 +308,7 @@ class VectorModel(ModelBase):
         return user_vectors, item_vectors
 
     def _get_i2i_vectors(self, dataset: Dataset) -> tp.Tuple[np.ndarray, np.ndarray]:
-        item_factors = self._get_items_factors(dataset)
+        item_factors = self._get_cached_items_factors(dataset)
         item_vectors = item_factors.embeddings
         item_biases = item_factors.biases
         item_vectors_1 = item_vectors_2 = item_vectors
@@ -138,8 +320,26 @@ class VectorModel(ModelBase):
 
         return item_vectors_1, item_vectors_2
 
+    def _get_cached_items_factors(self, dataset: Dataset) -> Factors:
+        """Return items factors, reuse ones calculated for the same item features if factors depend on dataset."""
+        if not self.factors_depend_on_dataset:
+            return self._get_items_factors(dataset)
+        # Features objects are immutable, so the same object means the same factors
+        cache = self._items_factors_cache
+        n_items = dataset.item_id_map.size
+        if cache is None or cache[0] is not dataset.item_features or cache[1] != n_items:
+            cache = dataset.item_features, n_items, self._get_items_factors(dataset)
+            self._items_factors_cache = cache
+        return cache[2]
+
     def _get_users_factors(self, dataset: Dataset) -> Factors:
         raise NotImplementedError()
 
+    def _get_users_factors_by_ids(self, dataset: Dataset, user_ids: InternalIdsArray) -> Factors:
+        """Return factors of given users only, override it if they can be calculated without all users factors."""
+        factors = self._get_users_factors(dataset)
+        biases = factors.biases[user_ids] if factors.biases is not None else None
+        return Factors(factors.embeddings[user_ids], biases)
+
     def _get_items_factors(self, dataset: Dataset) -> Factors:
         raise NotImplementedError()
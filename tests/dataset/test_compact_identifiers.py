@@ -0,0 +1,108 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# pylint: disable=attribute-defined-outside-init
+
+import typing as tp
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from rectools.dataset import CompactStringIdMap, IdMap
+from tests.testing_utils import assert_id_map_equal
+
+
+class TestCompactStringIdMap:
+    def setup(self) -> None:
+        self.external_ids = np.array(["b", "cc", "", "a", "юникод"], dtype="O")
+        self.id_map = CompactStringIdMap.from_values(["b", "cc", "b", "", "a", "юникод", "a"])
+
+    def test_creation(self) -> None:
+        np.testing.assert_equal(self.id_map.external_ids, self.external_ids)
+        assert self.id_map.size == 5
+        assert self.id_map.external_dtype == np.dtype("O")
+        np.testing.assert_equal(self.id_map.sorted_ids, np.array([2, 3, 0, 1, 4]))
+
+    def test_from_values_with_not_strings(self) -> None:
+        with pytest.raises(TypeError):
+            CompactStringIdMap.from_values(["a", 1])
+
+    def test_from_id_map_and_to_id_map(self) -> None:
+        id_map = IdMap(self.external_ids)
+        compact_id_map = CompactStringIdMap.from_id_map(id_map)
+        np.testing.assert_equal(compact_id_map.external_ids, self.external_ids)
+        assert_id_map_equal(compact_id_map.to_id_map(), id_map)
+
+    @pytest.mark.parametrize("as_array", (True, False))
+    def test_convert_to_internal(self, as_array: bool) -> None:
+        external: tp.Sequence[str] = ["юникод", "a", "", "b", "a", "cc"]
+        actual = self.id_map.convert_to_internal(np.array(external) if as_array else external)
+        np.testing.assert_equal(actual, np.array([4, 3, 2, 0, 3, 1]))
+
+    def test_convert_to_internal_with_missing(self) -> None:
+        external = ["a", "c", 1, "ccc", "b", None, "0"]
+        with pytest.raises(KeyError):
+            self.id_map.convert_to_internal(external)
+
+        values, missing = self.id_map.convert_to_internal(external, strict=False, return_missing=True)
+        np.testing.assert_equal(values, np.array([3, 0]))
+        np.testing.assert_equal(missing, np.array(["c", 1, "ccc", None, "0"], dtype="O"))
+
+        with pytest.raises(ValueError):
+            self.id_map.convert_to_internal(external, strict=True, return_missing=True)
+
+    def test_convert_to_external(self) -> None:
+        actual = self.id_map.convert_to_external([4, 2, 0])
+        np.testing.assert_equal(actual, np.array(["юникод", "", "b"], dtype="O"))
+
+        with pytest.raises(KeyError):
+            self.id_map.convert_to_external([0, 5])
+
+        values, missing = self.id_map.convert_to_external([0, 5, -1, 1], strict=False, return_missing=True)
+        np.testing.assert_equal(values, np.array(["b", "cc"], dtype="O"))
+        np.testing.assert_equal(missing, np.array([5, -1]))
+
+    def test_add_ids(self) -> None:
+        new_id_map = self.id_map.add_ids(["d", "cc", "aa", "d", "ca"])
+        expected_external_ids = np.array(["b", "cc", "", "a", "юникод", "d", "aa", "ca"], dtype="O")
+        np.testing.assert_equal(new_id_map.external_ids, expected_external_ids)
+        np.testing.assert_equal(new_id_map.sorted_ids, np.argsort(expected_external_ids, kind="stable"))
+        np.testing.assert_equal(new_id_map.convert_to_internal(["ca", "aa", "a", "d"]), np.array([7, 6, 3, 5]))
+
+    def test_add_ids_with_raising_on_repeating_ids(self) -> None:
+        with pytest.raises(ValueError):
+            self.id_map.add_ids(["d", "cc"], raise_if_already_present=True)
+
+    def test_empty(self) -> None:
+        id_map = CompactStringIdMap.from_values([])
+        assert id_map.size == 0
+        values, missing = id_map.convert_to_internal(["a"], strict=False, return_missing=True)
+        np.testing.assert_equal(values, np.array([], dtype=np.int64))
+        np.testing.assert_equal(missing, np.array(["a"]))
+        np.testing.assert_equal(id_map.add_ids(["b", "a"]).external_ids, np.array(["b", "a"], dtype="O"))
+
+    @pytest.mark.parametrize("mmap", (True, False))
+    def test_save_load(self, tmp_path: Path, mmap: bool) -> None:
+        self.id_map.save(tmp_path)
+        loaded = CompactStringIdMap.load(tmp_path, mmap=mmap)
+        assert isinstance(loaded.data, np.memmap) == mmap
+        np.testing.assert_equal(loaded.external_ids, self.external_ids)
+        np.testing.assert_equal(loaded.convert_to_internal(["cc", "a"]), np.array([1, 3]))
+
+    def test_save_without_overwrite(self, tmp_path: Path) -> None:
+        self.id_map.save(tmp_path)
+        with pytest.raises(FileExistsError):
+            self.id_map.save(tmp_path)
+        self.id_map.save(tmp_path, overwrite=True)
@@ -14,9 +14,12 @@
 
 # pylint: disable=attribute-defined-outside-init
 
+import pickle
 import typing as tp
 from datetime import datetime
+from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pytest
 from scipy import sparse
@@ -124,6 +127,127 @@ class TestDataset:
         assert_feature_set_equal(dataset.get_hot_user_features(), expected_user_features)
         assert_feature_set_equal(dataset.get_hot_item_features(), expected_item_features)
 
+    @pytest.mark.parametrize("with_n_interactions", (True, False))
+    @pytest.mark.parametrize("chunk_size", (1, 2, 4, 6))
+    def test_construct_from_chunks(self, with_n_interactions: bool, chunk_size: int) -> None:
+        chunks = [
+            self.interactions_df.iloc[i : i + chunk_size] for i in range(0, len(self.interactions_df), chunk_size)
+        ]
+        n_interactions = len(self.interactions_df) if with_n_interactions else None
+        dataset = Dataset.construct_from_chunks(iter(chunks), n_interactions)
+        self.assert_dataset_equal_to_expected(dataset, None, None)
+        assert type(dataset.user_id_map) is IdMap  # pylint: disable=unidiomatic-typecheck
+
+    def test_construct_from_chunks_with_features_and_compact_interactions(self) -> None:
+        user_features_df = pd.DataFrame([["u1", 77], ["u2", 33], ["u3", 22], ["u4", 11]], columns=["id", "f1"])
+        chunks = [
+            pd.DataFrame(columns=Columns.Interactions),
+            self.interactions_df.iloc[:4],
+            self.interactions_df.iloc[4:],
+        ]
+        kwargs: tp.Dict[str, tp.Any] = {
+            "user_features_df": user_features_df,
+            "make_dense_user_features": True,
+            "compact_interactions": True,
+        }
+        dataset = Dataset.construct_from_chunks(chunks, len(self.interactions_df), **kwargs)
+        expected = Dataset.construct(self.interactions_df, **kwargs)
+        assert_id_map_equal(dataset.user_id_map, expected.user_id_map)
+        assert_id_map_equal(dataset.item_id_map, expected.item_id_map)
+        pd.testing.assert_frame_equal(dataset.interactions.df, expected.interactions.df)
+        assert_feature_set_equal(dataset.user_features, expected.user_features)
+
+    @pytest.mark.parametrize(
+        "n_interactions,error_match",
+        ((5, "greater than `n_interactions`"), (7, "less than `n_interactions`")),
+    )
+    def test_construct_from_chunks_raises_when_n_interactions_is_incorrect(
+        self, n_interactions: int, error_match: str
+    ) -> None:
+        chunks = [self.interactions_df.iloc[:3], self.interactions_df.iloc[3:]]
+        with pytest.raises(ValueError, match=error_match):
+            Dataset.construct_from_chunks(chunks, n_interactions)
+
+    def test_construct_from_chunks_raises_when_no_interactions(self) -> None:
+        with pytest.raises(ValueError, match="no interactions"):
+            Dataset.construct_from_chunks([self.interactions_df.iloc[:0]])
+
+    @pytest.mark.parametrize("column", Columns.Interactions)
+    def test_raises_when_no_columns_in_construct_from_chunks(self, column: str) -> None:
+        with pytest.raises(KeyError, match=column):
+            Dataset.construct_from_chunks([self.interactions_df.drop(columns=column)])
+
+    def test_construct_from_parquet(self, tmp_path: Path) -> None:
+        pytest.importorskip("pyarrow")
+        path = tmp_path / "interactions.parquet"
+        self.interactions_df.assign(extra=1).to_parquet(path)
+        dataset = Dataset.construct_from_parquet(str(path), batch_size=4)
+        self.assert_dataset_equal_to_expected(dataset, None, None)
+
+    def test_append_interactions(self) -> None:
+        dataset = Dataset.construct(self.interactions_df.iloc[:4])
+        dataset.get_user_item_matrix()
+        actual = dataset.append_interactions(self.interactions_df.iloc[4:])
+        self.assert_dataset_equal_to_expected(actual, None, None)
+        assert actual.n_hot_users == 3
+        assert actual.n_hot_items == 3
+        assert_sparse_matrix_equal(actual.get_user_item_matrix(), self.expected_interactions.get_user_item_matrix())
+
+        assert dataset.n_hot_users == 2
+        assert dataset.user_id_map.size == 2
+
+    def test_append_interactions_with_features(self) -> None:
+        user_features_df = pd.DataFrame([["u1", 77], ["u2", 33], ["u3", 22]], columns=["id", "f1"])
+        dataset = Dataset.construct(
+            self.interactions_df.iloc[:4], user_features_df=user_features_df, make_dense_user_features=True
+        )
+        actual = dataset.append_interactions(self.interactions_df.iloc[4:5])
+        assert actual.user_features is dataset.user_features
+        assert actual.interactions.n_interactions == 5
+
+        with pytest.raises(ValueError, match="New ids can't be added"):
+            dataset.append_interactions(self.interactions_df.iloc[4:5].assign(**{Columns.User: "u100"}))
+
+    @pytest.mark.parametrize("mmap", (True, False))
+    @pytest.mark.parametrize("with_features", (True, False))
+    def test_save_load(self, tmp_path: Path, mmap: bool, with_features: bool) -> None:
+        if with_features:
+            user_features_df = pd.DataFrame([["u1", 77], ["u2", 33], ["u3", 22], ["u4", 11]], columns=["id", "f1"])
+            item_features_df = pd.DataFrame([["i2", "f1", 3], ["i5", "f2", 20]], columns=["id", "feature", "value"])
+            dataset = Dataset.construct(
+                self.interactions_df,
+                user_features_df=user_features_df,
+                make_dense_user_features=True,
+                item_features_df=item_features_df,
+                cat_item_features=["f2"],
+            )
+        else:
+            dataset = Dataset.construct(self.interactions_df)
+
+        dataset.save(tmp_path / "dataset")
+        loaded = Dataset.load(tmp_path / "dataset", mmap=mmap)
+
+        assert_id_map_equal(loaded.user_id_map, dataset.user_id_map)
+        assert_id_map_equal(loaded.item_id_map, dataset.item_id_map)
+        pd.testing.assert_frame_equal(loaded.interactions.df, dataset.interactions.df)
+        assert_feature_set_equal(loaded.user_features, dataset.user_features)
+        assert_feature_set_equal(loaded.item_features, dataset.item_features)
+        assert_sparse_matrix_equal(loaded.get_user_item_matrix(), dataset.get_user_item_matrix())
+
+    def test_save_raises_when_files_exist(self, tmp_path: Path) -> None:
+        dataset = Dataset.construct(self.interactions_df)
+        dataset.save(tmp_path)
+        with pytest.raises(FileExistsError):
+            dataset.save(tmp_path)
+        dataset.save(tmp_path, overwrite=True)
+
+    def test_load_raises_when_format_version_is_unknown(self, tmp_path: Path) -> None:
+        Dataset.construct(self.interactions_df).save(tmp_path)
+        with open(tmp_path / "meta.pkl", "wb") as f:
+            pickle.dump({"format_version": 100500}, f)
+        with pytest.raises(ValueError, match="format version"):
+            Dataset.load(tmp_path)
+
     @pytest.mark.parametrize("user_id_col", ("id", Columns.User))
     @pytest.mark.parametrize("item_id_col", ("id", Columns.Item))
     def test_construct_with_features_with_warm_ids(self, user_id_col: str, item_id_col: str) -> None:
@@ -200,6 +324,30 @@ class TestDataset:
         expected_user_item_matrix = sparse.csr_matrix(expected)
         assert_sparse_matrix_equal(user_item_matrix, expected_user_item_matrix)
 
+    def test_get_user_item_matrix_with_warm_users_and_items(self) -> None:
+        user_id_map = IdMap.from_values(["u1", "u2", "u3", "u4"])
+        item_id_map = IdMap.from_values(["i1", "i2", "i5"])
+        interactions_df = pd.DataFrame(
+            [
+                ["u1", "i2", 1, "2021-09-09"],
+                ["u2", "i1", 5, "2021-09-05"],
+            ],
+            columns=[Columns.User, Columns.Item, Columns.Weight, Columns.Datetime],
+        )
+        interactions = Interactions.from_raw(interactions_df, user_id_map, item_id_map)
+        dataset = Dataset(user_id_map, item_id_map, interactions)
+        hot_matrix = dataset.get_user_item_matrix()
+        assert dataset.get_user_item_matrix() is hot_matrix
+
+        user_item_matrix = dataset.get_user_item_matrix(include_warm=True)
+        expected = sparse.csr_matrix([[0, 1, 0], [5, 0, 0], [0, 0, 0], [0, 0, 0]])
+        assert_sparse_matrix_equal(user_item_matrix, expected)
+        assert np.shares_memory(user_item_matrix.data, hot_matrix.data)
+        assert hot_matrix.shape == (2, 2)
+
+        dataset.release_cached_matrices()
+        assert dataset.get_user_item_matrix() is not hot_matrix
+
     @pytest.mark.parametrize("column", Columns.Interactions)
     def test_raises_when_no_columns_in_construct(self, column: str) -> None:
         with pytest.raises(KeyError) as e:
@@ -14,13 +14,14 @@
 
 # pylint: disable=attribute-defined-outside-init
 
+import pickle
 import typing as tp
 
 import numpy as np
 import pandas as pd
 import pytest
 
-from rectools.dataset import IdMap
+from rectools.dataset import AppendableIdMap, IdMap
 
 
 class TestIdMap:
@@ -120,3 +121,117 @@ class TestIdMap:
     def test_add_ids_with_raising_on_repeating_ids(self) -> None:
         with pytest.raises(ValueError):
             self.id_map.add_ids(["d", "e", "c", "d"], raise_if_already_present=True)
+
+    def test_lookup_index_is_reused(self) -> None:
+        self.id_map.convert_to_internal(["a"])
+        index = self.id_map.to_internal.index
+        self.id_map.convert_to_internal(["b", "c"])
+        assert self.id_map.to_internal.index is index
+
+    def test_lookup_is_not_compared(self) -> None:
+        self.id_map.convert_to_internal(["a"])
+        assert self.id_map == IdMap(self.external_ids)
+
+    def test_pickling(self) -> None:
+        self.id_map.convert_to_internal(["a"])
+        unpickled = pickle.loads(pickle.dumps(self.id_map))
+        np.testing.assert_equal(unpickled.external_ids, self.external_ids)
+        np.testing.assert_equal(unpickled.convert_to_internal(["a", "b"]), np.array([2, 0]))
+
+    @pytest.mark.parametrize("internal", (np.array([0, 2]), np.array([0.0, 2.0])))
+    def test_convert_to_external_accepts_any_numeric_ids(self, internal: np.ndarray) -> None:
+        actual = self.id_map.convert_to_external(internal)
+        np.testing.assert_equal(actual, np.array(["b", "a"]))
+
+
+class TestIdMapWithIntegerIds:
+    @pytest.mark.parametrize(
+        "external_ids",
+        (
+            np.array([10, 12, 11, 15]),  # dense range
+            np.array([10, 10**12, -(10**9), 15]),  # sparse range
+            np.array([10, 12, 11, 15], dtype=np.uint64),
+            np.array([-100, 100, 0, 15], dtype=np.int8),
+        ),
+    )
+    @pytest.mark.parametrize("as_list", (True, False))
+    def test_convert_to_internal(self, external_ids: np.ndarray, as_list: bool) -> None:
+        id_map = IdMap(external_ids)
+        external = external_ids[[3, 0, 3, 1]]
+        actual = id_map.convert_to_internal(external.tolist() if as_list else external)
+        np.testing.assert_equal(actual, np.array([3, 0, 3, 1]))
+        assert actual.dtype == np.int64
+
+    @pytest.mark.parametrize("external_ids", (np.array([10, 12, 11, 15]), np.array([10, 10**12, -(10**9), 15])))
+    def test_convert_to_internal_with_missing(self, external_ids: np.ndarray) -> None:
+        id_map = IdMap(external_ids)
+        with pytest.raises(KeyError):
+            id_map.convert_to_internal([15, 13])
+
+        actual, missing = id_map.convert_to_internal([15, 13, 9, 10, 10**13], strict=False, return_missing=True)
+        np.testing.assert_equal(actual, np.array([3, 0]))
+        np.testing.assert_equal(missing, np.array([13, 9, 10**13]))
+
+    @pytest.mark.parametrize("external", ([10.0, 15.0], np.array([10, 15], dtype=np.uint64), ["10", 15]))
+    def test_convert_to_internal_with_other_types(self, external: tp.Sequence[tp.Any]) -> None:
+        id_map = IdMap(np.array([10, 12, 11, 15]))
+        expected = id_map.to_internal.reindex(external).dropna().values
+        actual = id_map.convert_to_internal(external, strict=False)
+        np.testing.assert_equal(actual, expected)
+
+    def test_empty(self) -> None:
+        id_map = IdMap(np.array([], dtype=np.int64))
+        actual, missing = id_map.convert_to_internal([1], strict=False, return_missing=True)
+        np.testing.assert_equal(actual, np.array([], dtype=np.int64))
+        np.testing.assert_equal(missing, np.array([1]))
+
+
+class TestAppendableIdMap:
+    def setup(self) -> None:
+        self.id_map = AppendableIdMap.from_values(["b", "c", "c", "a"])
+
+    def test_add_ids(self) -> None:
+        new_id_map = self.id_map.add_ids(["d", "e", "c", "d"])
+        assert isinstance(new_id_map, AppendableIdMap)
+        np.testing.assert_equal(new_id_map.external_ids, np.array(["b", "c", "a", "d", "e"]))
+        np.testing.assert_equal(new_id_map.convert_to_internal(["e", "a", "d"]), np.array([4, 2, 3]))
+        np.testing.assert_equal(self.id_map.external_ids, np.array(["b", "c", "a"]))
+
+    def test_add_ids_with_raising_on_repeating_ids(self) -> None:
+        with pytest.raises(ValueError):
+            self.id_map.add_ids(["d", "e", "c", "d"], raise_if_already_present=True)
+
+    def test_many_additions(self) -> None:
+        id_map = AppendableIdMap.from_values(np.arange(100))
+        for start in range(100, 1000, 30):
+            id_map = id_map.add_ids(np.arange(start - 10, start + 30))
+        np.testing.assert_equal(id_map.external_ids, np.arange(1000))
+        assert len(id_map._state.segments) < 10  # pylint: disable=protected-access
+
+        values, missing = id_map.convert_to_internal([999, -1, 500, 3, 2000], strict=False, return_missing=True)
+        np.testing.assert_equal(values, np.array([999, 500, 3]))
+        np.testing.assert_equal(missing, np.array([-1, 2000]))
+
+    def test_buffer_is_shared_and_old_maps_are_not_changed(self) -> None:
+        id_map_1 = self.id_map.add_ids(["d"])
+        id_map_2 = id_map_1.add_ids(["e"])
+        assert np.shares_memory(id_map_1.external_ids, id_map_2.external_ids)
+
+        id_map_3 = id_map_1.add_ids(["f"])
+        assert not np.shares_memory(id_map_2.external_ids, id_map_3.external_ids)
+        np.testing.assert_equal(id_map_2.external_ids, np.array(["b", "c", "a", "d", "e"]))
+        np.testing.assert_equal(id_map_3.external_ids, np.array(["b", "c", "a", "d", "f"]))
+        np.testing.assert_equal(id_map_3.convert_to_internal(["f", "d"]), np.array([4, 3]))
+        with pytest.raises(KeyError):
+            id_map_3.convert_to_internal(["e"])
+
+    def test_add_ids_of_other_type(self) -> None:
+        id_map = AppendableIdMap.from_values([10, 20]).add_ids(["a", 10])
+        np.testing.assert_equal(id_map.external_ids, np.array([10, 20, "a"], dtype="O"))
+        np.testing.assert_equal(id_map.convert_to_internal(["a", 20]), np.array([2, 1]))
+
+    def test_pickling(self) -> None:
+        id_map = self.id_map.add_ids(["d"])
+        unpickled = pickle.loads(pickle.dumps(id_map))
+        np.testing.assert_equal(unpickled.external_ids, np.array(["b", "c", "a", "d"]))
+        np.testing.assert_equal(unpickled.add_ids(["e"]).convert_to_internal(["e", "d"]), np.array([4, 3]))
@@ -14,6 +14,7 @@
 
 # pylint: disable=attribute-defined-outside-init
 
+import pickle
 import typing as tp
 from datetime import datetime
 
@@ -87,6 +88,162 @@ class TestInteractions:
         expected = sparse.csr_matrix((expected_data, (self.df[Columns.User].values, self.df[Columns.Item].values)))
         assert_sparse_matrix_equal(matrix, expected)
 
+    @pytest.mark.parametrize("with_weights", (True, False))
+    def test_user_item_matrix_is_cached(self, with_weights: bool) -> None:
+        interactions = Interactions(self.df)
+        matrix = interactions.get_user_item_matrix(with_weights)
+        assert interactions.get_user_item_matrix(with_weights) is matrix
+        assert interactions.get_user_item_matrix(not with_weights) is not matrix
+
+        interactions.release_cached_matrices()
+        new_matrix = interactions.get_user_item_matrix(with_weights)
+        assert new_matrix is not matrix
+        assert_sparse_matrix_equal(new_matrix, matrix)
+
+    @pytest.mark.parametrize("with_weights", (True, False))
+    def test_getting_item_user_matrix(self, with_weights: bool) -> None:
+        interactions = Interactions(self.df)
+        matrix = interactions.get_item_user_matrix(with_weights)
+        assert_sparse_matrix_equal(matrix, interactions.get_user_item_matrix(with_weights).T.tocsr())
+        assert interactions.get_item_user_matrix(with_weights) is matrix
+
+    def test_cached_matrices_are_not_pickled(self) -> None:
+        interactions = Interactions(self.df)
+        interactions.get_user_item_matrix()
+        unpickled = pickle.loads(pickle.dumps(interactions))
+        assert not unpickled._cache.matrices  # pylint: disable=protected-access
+        assert_sparse_matrix_equal(unpickled.get_user_item_matrix(), interactions.get_user_item_matrix())
+
+    def test_statistics(self) -> None:
+        df = self.df.copy()
+        df.loc[3, Columns.Datetime] = datetime(2021, 9, 10)
+        interactions = Interactions(df)
+        assert interactions.n_interactions == 4
+        assert interactions.n_users == 3
+        assert interactions.n_items == 2
+        assert interactions.time_range == (pd.Timestamp(2021, 9, 8), pd.Timestamp(2021, 9, 10))
+        np.testing.assert_equal(interactions.get_user_counts(), [0, 3, 1])
+        np.testing.assert_equal(interactions.get_item_counts(), [2, 2])
+        assert interactions.get_user_counts() is interactions.get_user_counts()
+
+    def test_statistics_for_empty_interactions(self) -> None:
+        interactions = Interactions(self.df.iloc[:0])
+        assert interactions.n_interactions == 0
+        assert interactions.n_users == 0
+        assert interactions.n_items == 0
+        assert pd.isna(interactions.time_range[0]) and pd.isna(interactions.time_range[1])
+        assert interactions.get_user_counts().size == 0
+        assert interactions.get_user_item_matrix().shape == (0, 0)
+
+    def test_statistics_are_computed_after_unpickling(self) -> None:
+        unpickled = pickle.loads(pickle.dumps(Interactions(self.df)))
+        assert unpickled.n_users == 3
+        np.testing.assert_equal(unpickled.get_item_counts(), [2, 2])
+
+    def test_compact_creation(self) -> None:
+        interactions = Interactions(self.df.copy(), compact=True)
+        expected_dtypes = {
+            Columns.User: np.uint32,
+            Columns.Item: np.uint32,
+            Columns.Weight: np.float32,
+            Columns.Datetime: np.int32,
+        }
+        assert interactions.df.dtypes.to_dict() == expected_dtypes
+        assert interactions.df[Columns.Datetime].tolist() == [int(pd.Timestamp(2021, 9, 8).timestamp())] * 4
+        assert interactions.time_range == (pd.Timestamp(2021, 9, 8), pd.Timestamp(2021, 9, 8))
+        assert_sparse_matrix_equal(interactions.get_user_item_matrix(), Interactions(self.df).get_user_item_matrix())
+
+    def test_compact_creation_with_int_datetime(self) -> None:
+        df = self.df.copy()
+        df[Columns.Datetime] = [0, 2**40, 1, 2]
+        interactions = Interactions(df, compact=True)
+        assert interactions.df[Columns.Datetime].dtype == np.int64
+        assert interactions.time_range == (pd.Timestamp(0, unit="s"), pd.Timestamp(2**40, unit="s"))
+
+    def test_compact_from_raw_and_to_external(self) -> None:
+        user_id_map = IdMap.from_values(["u1", "u2", "u3"])
+        item_id_map = IdMap.from_values(["i1", "i2"])
+        raw_df = pd.DataFrame(
+            {
+                Columns.User: ["u2", "u3", "u2", "u2"],
+                Columns.Item: ["i1", "i2", "i1", "i2"],
+                Columns.Weight: [5, 7.0, 4, 1],
+                Columns.Datetime: pd.date_range("2021-09-08", periods=4, freq="H"),
+            }
+        )
+        interactions = Interactions.from_raw(raw_df, user_id_map, item_id_map, compact=True)
+        assert interactions.compact
+        assert interactions.df[Columns.User].dtype == np.uint32
+        pd.testing.assert_frame_equal(
+            interactions.to_external(user_id_map, item_id_map),
+            raw_df.astype({Columns.Weight: np.float32}),
+        )
+
+    def test_compact_creation_raises_when_ids_are_too_big(self) -> None:
+        df = self.df.copy()
+        df.loc[0, Columns.Item] = 2**32
+        with pytest.raises(ValueError, match="must be <="):
+            Interactions(df, compact=True)
+
+    @pytest.mark.parametrize("compact", (True, False))
+    def test_convert_datetime(self, compact: bool) -> None:
+        interactions = Interactions(self.df.copy(), compact=compact)
+        series = interactions.df[Columns.Datetime]
+        for dt, n_later in (
+            (datetime(2021, 9, 7, 23, 59, 59, 500), 4),
+            (datetime(2021, 9, 8), 4),
+            (datetime(2021, 9, 8, 0, 0, 0, 1), 0),
+        ):
+            assert (series >= interactions.convert_datetime(dt)).sum() == n_later
+            assert (series < interactions.convert_datetime(dt)).sum() == 4 - n_later
+
+    @pytest.mark.parametrize("compact", (True, False))
+    def test_append(self, compact: bool) -> None:
+        new_df = pd.DataFrame(
+            {
+                Columns.User: [3, 1],
+                Columns.Item: [0, 2],
+                Columns.Weight: [2, 3],
+                Columns.Datetime: [datetime(2021, 9, 10), datetime(2021, 9, 7)],
+            }
+        )
+        interactions = Interactions(self.df.copy(), compact)
+        matrix = interactions.get_user_item_matrix()
+        interactions.get_item_user_matrix(include_weights=False)
+        interactions.get_user_counts()
+
+        actual = interactions.append(new_df)
+        expected = Interactions(pd.concat([self.df, new_df], ignore_index=True), compact)
+
+        pd.testing.assert_frame_equal(actual.df, expected.df)
+        assert actual.compact == compact
+        assert (actual.n_users, actual.n_items, actual.time_range) == (4, 3, expected.time_range)
+        np.testing.assert_equal(actual.get_user_counts(), [0, 4, 1, 1])
+        np.testing.assert_equal(actual.get_item_counts(), [3, 2, 1])
+        assert_sparse_matrix_equal(actual.get_user_item_matrix(), expected.get_user_item_matrix())
+        assert_sparse_matrix_equal(actual.get_item_user_matrix(False), expected.get_item_user_matrix(False))
+
+        assert len(interactions.df) == 4
+        assert interactions.get_user_item_matrix() is matrix
+        assert interactions.n_users == 3
+
+    def test_append_shares_buffers(self) -> None:
+        interactions = Interactions(self.df).append(self.df.iloc[:1])
+        appended = interactions.append(self.df.iloc[1:2])
+        assert np.shares_memory(appended.df[Columns.User].values, interactions.df[Columns.User].values)
+
+        # Buffer is already used by `appended`, so it's copied here
+        other = interactions.append(self.df.iloc[2:3])
+        assert not np.shares_memory(other.df[Columns.User].values, interactions.df[Columns.User].values)
+        assert appended.df[Columns.Item].tolist() == [0, 1, 0, 1, 0, 1]
+        assert other.df[Columns.Item].tolist() == [0, 1, 0, 1, 0, 0]
+
+    def test_append_raises_when_ids_are_negative(self) -> None:
+        df = self.df.copy()
+        df.loc[0, Columns.User] = -1
+        with pytest.raises(ValueError, match=">= 0"):
+            Interactions(self.df).append(df)
+
     def test_raises_when_weight_not_numeric(self) -> None:
         df = self.df
         df.loc[1, Columns.Weight] = "w"
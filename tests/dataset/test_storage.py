@@ -0,0 +1,153 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import typing as tp
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from rectools import Columns
+from rectools.dataset import CompactStringIdMap, DenseFeatures, Features, IdMap, Interactions, SparseFeatures
+from rectools.dataset.features import DIRECT_FEATURE_VALUE
+from rectools.dataset.storage import (
+    load_features,
+    load_id_map,
+    load_interactions,
+    save_features,
+    save_id_map,
+    save_interactions,
+    save_meta,
+)
+from tests.testing_utils import assert_feature_set_equal, assert_id_map_equal
+
+
+def is_memory_mapped(arr: tp.Any) -> bool:
+    # Memory-mapped arrays may be wrapped into `np.ndarray` views
+    while isinstance(arr, np.ndarray):
+        if isinstance(arr, np.memmap):
+            return True
+        arr = arr.base
+    return False
+
+
+class TestIdMapStorage:
+    @pytest.mark.parametrize("mmap", (True, False))
+    @pytest.mark.parametrize(
+        "external_ids",
+        (
+            np.array([10, 3, 7]),
+            np.array([1.5, 2.5]),
+            np.array(["b", "a", "юникод"], dtype="O"),
+            np.array(["b", 1, (2, 3)], dtype="O"),
+        ),
+    )
+    def test_save_load(self, tmp_path: Path, external_ids: np.ndarray, mmap: bool) -> None:
+        id_map = IdMap(external_ids)
+        save_id_map(id_map, tmp_path / "map")
+        loaded = load_id_map(tmp_path / "map", mmap)
+        assert isinstance(loaded, IdMap)
+        assert_id_map_equal(loaded, id_map)
+        assert loaded.external_ids.dtype == external_ids.dtype
+        assert is_memory_mapped(loaded.external_ids) == (mmap and external_ids.dtype.kind != "O")
+
+    def test_save_load_compact_string_id_map(self, tmp_path: Path) -> None:
+        id_map = CompactStringIdMap.from_values(["b", "a", "юникод"])
+        save_id_map(id_map, tmp_path)
+        loaded = load_id_map(tmp_path, mmap=True)
+        assert isinstance(loaded, CompactStringIdMap)
+        np.testing.assert_equal(loaded.external_ids, id_map.external_ids)
+        assert is_memory_mapped(loaded.data)
+
+    def test_overwrite(self, tmp_path: Path) -> None:
+        save_id_map(IdMap(np.array([1, 2])), tmp_path)
+        with pytest.raises(FileExistsError):
+            save_id_map(IdMap(np.array([3])), tmp_path)
+        save_id_map(IdMap(np.array([3])), tmp_path, overwrite=True)
+        assert_id_map_equal(load_id_map(tmp_path), IdMap(np.array([3])))
+
+
+class TestInteractionsStorage:
+    @pytest.fixture
+    def df(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                Columns.User: [1, 2, 1],
+                Columns.Item: [0, 1, 0],
+                Columns.Weight: [5, 7.0, 4],
+                Columns.Datetime: [datetime(2021, 9, 8), datetime(2021, 9, 9), datetime(2021, 9, 10)],
+            }
+        )
+
+    @pytest.mark.parametrize("compact", (True, False))
+    @pytest.mark.parametrize("mmap", (True, False))
+    def test_save_load(self, tmp_path: Path, df: pd.DataFrame, compact: bool, mmap: bool) -> None:
+        interactions = Interactions(df, compact)
+        save_interactions(interactions, tmp_path)
+        loaded = load_interactions(tmp_path, mmap)
+        assert loaded.compact == compact
+        pd.testing.assert_frame_equal(loaded.df, interactions.df)
+        assert is_memory_mapped(loaded.df[Columns.User].values) == mmap
+        assert (loaded.n_users, loaded.n_items, loaded.time_range) == (
+            3,
+            2,
+            (datetime(2021, 9, 8), datetime(2021, 9, 10)),
+        )
+
+    def test_columns_are_not_scanned_on_load(
+        self, tmp_path: Path, df: pd.DataFrame, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        save_interactions(Interactions(df), tmp_path)
+
+        def fail(*args: tp.Any) -> None:
+            raise AssertionError("Columns must not be scanned")
+
+        monkeypatch.setattr(Interactions, "_check_columns_present", fail)
+        monkeypatch.setattr(Interactions, "_convert_weight_and_datetime_types", fail)
+        monkeypatch.setattr(Interactions, "_count_ids", fail)
+        monkeypatch.setattr(Interactions, "_calc_time_range", fail)
+        loaded = load_interactions(tmp_path, mmap=True)
+        assert (loaded.n_users, loaded.n_items) == (3, 2)
+
+    def test_load_without_saved_stats(self, tmp_path: Path, df: pd.DataFrame) -> None:
+        interactions = Interactions(df)
+        save_interactions(interactions, tmp_path)
+        save_meta(tmp_path, {"compact": False}, overwrite=True)
+        loaded = load_interactions(tmp_path)
+        pd.testing.assert_frame_equal(loaded.df, interactions.df)
+        assert (loaded.n_users, loaded.n_items, loaded.time_range) == (3, 2, interactions.time_range)
+
+
+class TestFeaturesStorage:
+    @pytest.mark.parametrize("mmap", (True, False))
+    @pytest.mark.parametrize(
+        "features",
+        (
+            DenseFeatures(np.array([[1.0, 2.0], [3.0, 4.0]], dtype=np.float32), ("f1", "f2")),
+            SparseFeatures(
+                sparse.csr_matrix([[1, 0, 0], [0, 2, 1]], dtype=np.float32),
+                (("f1", 1), ("f1", "a"), ("f2", DIRECT_FEATURE_VALUE)),
+            ),
+        ),
+    )
+    def test_save_load(self, tmp_path: Path, features: Features, mmap: bool) -> None:
+        save_features(features, tmp_path)
+        loaded = load_features(tmp_path, mmap)
+        assert_feature_set_equal(loaded, features)
+        loaded_values: tp.Any = loaded.values
+        arrays = (loaded_values,) if isinstance(loaded, DenseFeatures) else (loaded_values.data, loaded_values.indices)
+        assert all(is_memory_mapped(arr) == mmap for arr in arrays)
@@ -160,9 +160,9 @@ class TestCrossValidate:
                 None,
                 [
                     {"model": "popular", "i_split": 0, "precision@2": 0.5, "recall@1": 0.5},
-                    {"model": "random", "i_split": 0, "precision@2": 0.5, "recall@1": 1.0},
+                    {"model": "random", "i_split": 0, "precision@2": 0.5, "recall@1": 0.0},
                     {"model": "popular", "i_split": 1, "precision@2": 0.375, "recall@1": 0.25},
-                    {"model": "random", "i_split": 1, "precision@2": 0.375, "recall@1": 0.5},
+                    {"model": "random", "i_split": 1, "precision@2": 0.375, "recall@1": 0.25},
                 ],
             ),
             (
@@ -222,6 +222,19 @@ class TestCrossValidate:
 
         assert actual == expected
 
+    def test_compact_interactions(self) -> None:
+        interactions_df = self.dataset.get_raw_interactions()
+        # Make datetimes differ by days, not by nanoseconds, since compact interactions keep only seconds
+        interactions_df[Columns.Datetime] = pd.to_datetime(interactions_df[Columns.Datetime].astype("int64"), unit="D")
+        dataset = Dataset.construct(interactions_df)
+        compact_dataset = Dataset.construct(interactions_df, compact_interactions=True)
+        splitter = LastNSplitter(n=1, n_splits=2, filter_cold_items=False, filter_already_seen=False)
+        kwargs = {"splitter": splitter, "metrics": self.metrics, "models": self.models, "k": 2, "filter_viewed": True}
+
+        actual = cross_validate(dataset=compact_dataset, **kwargs)  # type: ignore
+        expected = cross_validate(dataset=dataset, **kwargs)  # type: ignore
+        assert actual == expected
+
     @pytest.mark.parametrize("prefer_warm_inference_over_cold", (True, False))
     def test_happy_path_with_features(self, prefer_warm_inference_over_cold: bool) -> None:
         splitter = LastNSplitter(n=1, n_splits=2, filter_cold_items=False, filter_already_seen=False)
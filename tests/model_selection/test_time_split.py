@@ -87,6 +87,19 @@ class TestTimeRangeSplitter:
         assert sorted(actual[1][0]) == to_shuffled([0, 1, 2, 3, 4, 5, 6, 7])
         assert sorted(actual[1][1]) == to_shuffled([8, 9, 10])
 
+    def test_compact_interactions(self, interactions: Interactions) -> None:
+        compact_interactions = Interactions(interactions.df.copy(), compact=True)
+        splitter = TimeRangeSplitter("2D", 2, True, True, True)
+        actual = list(splitter.split(compact_interactions, collect_fold_stats=True))
+        expected = list(splitter.split(interactions, collect_fold_stats=True))
+        assert len(actual) == len(expected)
+        for (actual_train, actual_test, actual_info), (expected_train, expected_test, expected_info) in zip(
+            actual, expected
+        ):
+            np.testing.assert_equal(actual_train, expected_train)
+            np.testing.assert_equal(actual_test, expected_test)
+            assert actual_info == expected_info
+
     def test_filter_cold_users(self, interactions: Interactions, to_shuffled: Converter) -> None:
         splitter = TimeRangeSplitter(
             "2D",
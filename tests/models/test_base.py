@@ -15,15 +15,18 @@
 # pylint: disable=attribute-defined-outside-init
 
 import typing as tp
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
 import pytest
 from pytest_mock import MockerFixture
+from scipy import sparse
 
 from rectools import Columns
 from rectools.dataset import Dataset
 from rectools.exceptions import NotFittedError
+from rectools.models import CandidatesMatrix
 from rectools.models.base import (
     FixedColdRecoModelMixin,
     InternalRecoTriplet,
@@ -210,6 +213,117 @@ class TestRecommendWithInternalIds:
                 assume_external_ids=False,
             )
 
+    @pytest.mark.parametrize(
+        "items_to_recommend, expected_items_to_recommend",
+        ((None, [0, 2, 3, 5]), ([0, 1, 2], [0, 2])),
+    )
+    @pytest.mark.parametrize("kind", ("u2i", "i2i"))
+    def test_items_to_exclude_are_removed_from_whitelist(
+        self,
+        mocker: MockerFixture,
+        items_to_recommend: tp.Optional[tp.List[int]],
+        expected_items_to_recommend: tp.List[int],
+        kind: str,
+    ) -> None:
+        model = self.model
+        if kind == "u2i":
+            spy = mocker.spy(model, "_recommend_u2i")
+            model.recommend(
+                users=[0, 1],
+                dataset=DATASET,
+                k=2,
+                filter_viewed=False,
+                items_to_recommend=items_to_recommend,
+                assume_external_ids=False,
+                items_to_exclude=[4, 1, 10],
+            )
+        else:
+            spy = mocker.spy(model, "_recommend_i2i")
+            model.recommend_to_items(
+                target_items=[0, 1],
+                dataset=DATASET,
+                k=2,
+                items_to_recommend=items_to_recommend,
+                assume_external_ids=False,
+                items_to_exclude=[4, 1, 10],
+            )
+
+        args, kwargs = spy.call_args
+        assert list(args[-1]) == expected_items_to_recommend
+        assert not kwargs
+
+    @pytest.mark.parametrize("kind", ("u2i", "i2i"))
+    def test_items_to_exclude_are_passed_to_supporting_model(self, mocker: MockerFixture, kind: str) -> None:
+        class SupportingModel(ModelBase):
+            supports_items_to_exclude = True
+
+            def _recommend_u2i(
+                self,
+                user_ids: np.ndarray,
+                dataset: Dataset,
+                k: int,
+                filter_viewed: bool,
+                sorted_item_ids_to_recommend: tp.Optional[np.ndarray],
+                sorted_item_ids_to_exclude: tp.Optional[np.ndarray] = None,
+            ) -> tp.Tuple[InternalIds, InternalIds, Scores]:
+                return [0], [0], [0.1]
+
+            def _recommend_i2i(
+                self,
+                target_ids: np.ndarray,
+                dataset: Dataset,
+                k: int,
+                sorted_item_ids_to_recommend: tp.Optional[np.ndarray],
+                sorted_item_ids_to_exclude: tp.Optional[np.ndarray] = None,
+            ) -> tp.Tuple[InternalIds, InternalIds, Scores]:
+                return [0], [0], [0.1]
+
+        model = SupportingModel()
+        model.is_fitted = True
+        if kind == "u2i":
+            spy = mocker.spy(model, "_recommend_u2i")
+            model.recommend(
+                users=[10, 20],
+                dataset=DATASET,
+                k=2,
+                filter_viewed=False,
+                items_to_exclude=[17, 12, 100],
+            )
+        else:
+            spy = mocker.spy(model, "_recommend_i2i")
+            model.recommend_to_items(
+                target_items=[11, 12],
+                dataset=DATASET,
+                k=2,
+                items_to_exclude=[17, 12, 100],
+            )
+
+        args, kwargs = spy.call_args
+        assert args[-1] is None
+        np.testing.assert_equal(kwargs["sorted_item_ids_to_exclude"], [1, 5])
+
+    def test_candidates_raise_for_not_supporting_model(self) -> None:
+        candidates = CandidatesMatrix(sparse.csr_matrix((4, 6)))
+        with pytest.raises(ValueError, match="doesn't support per-user candidates"):
+            self.model.recommend(
+                users=[0, 1],
+                dataset=DATASET,
+                k=2,
+                filter_viewed=False,
+                assume_external_ids=False,
+                candidates=candidates,
+            )
+
+    def test_candidates_raise_for_not_hot_users(self) -> None:
+        class ColdModel(self.model.__class__):  # type: ignore
+            supports_candidates = True
+            recommends_for_cold = True
+
+        model = ColdModel().fit(DATASET)
+        candidates = CandidatesMatrix(sparse.csr_matrix((4, 6)))
+        with pytest.raises(ValueError, match="supported only for hot users"):
+            model.recommend(users=[10, 100], dataset=DATASET, k=2, filter_viewed=False, candidates=candidates)
+
 
 class TestHotWarmCold:
     def setup(self) -> None:
@@ -468,6 +582,58 @@ class TestHotWarmCold:
         with pytest.raises(ValueError, match="doesn't support recommendations for cold"):
             self._get_reco(targets, "hot_warm", "no_features", kind)
 
+    @pytest.mark.parametrize("dataset_key", ("no_features", "with_features"))
+    @pytest.mark.parametrize("chunk_size", (1, 2, 10))
+    def test_recommend_chunks_same_as_recommend(self, dataset_key: str, chunk_size: int) -> None:
+        users = [60, 10, 50, 20, 70, 40]
+        dataset = self.datasets[dataset_key]
+        expected = self.hot_warm_cold_model.recommend(users, dataset, k=2, filter_viewed=False)
+        chunks = list(
+            self.hot_warm_cold_model.recommend_chunks(users, dataset, k=2, filter_viewed=False, chunk_size=chunk_size)
+        )
+        # Every chunk contains users of one type: hot, warm or cold
+        assert len(chunks) >= -(-len(users) // chunk_size)
+        assert all(chunk[Columns.User].nunique() <= chunk_size for chunk in chunks)
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+    def test_recommend_chunks_for_no_users(self) -> None:
+        chunks = list(self.hot_model.recommend_chunks([], DATASET, k=2, filter_viewed=False))
+        assert len(chunks) == 1
+        pd.testing.assert_frame_equal(chunks[0], self.hot_model.recommend([], DATASET, k=2, filter_viewed=False))
+
+    def test_recommend_chunks_checks_arguments_on_call(self) -> None:
+        with pytest.raises(ValueError, match="doesn't support recommendations for cold"):
+            self.hot_model.recommend_chunks(self.colds["u2i"], DATASET, k=2, filter_viewed=False)
+        with pytest.raises(ValueError, match="`chunk_size` must be positive"):
+            self.hot_model.recommend_chunks(self.hots["u2i"], DATASET, k=2, filter_viewed=False, chunk_size=0)
+
+    def test_recommend_to_parquet(self, tmp_path: Path) -> None:
+        pytest.importorskip("pyarrow")
+        users = [60, 10, 50, 20]
+        dataset = self.datasets["with_features"]
+        path = tmp_path / "reco.parquet"
+        n_rows = self.hot_warm_cold_model.recommend_to_parquet(
+            str(path), users, dataset, k=2, filter_viewed=False, chunk_size=1
+        )
+        expected = self.hot_warm_cold_model.recommend(users, dataset, k=2, filter_viewed=False)
+        assert n_rows == len(expected)
+        pd.testing.assert_frame_equal(pd.read_parquet(path), expected)
+
+
+@pytest.mark.parametrize(
+    "targets,expected",
+    (
+        ([], []),
+        ([10, 10, 20, 30, 30, 30], [1, 2, 1, 1, 2, 3]),
+        (["b", "a", "a"], [1, 1, 2]),
+        ([10, 20, 10, 10], [1, 1, 2, 3]),
+    ),
+)
+def test_rank_column(targets: tp.List[tp.Any], expected: tp.List[int]) -> None:
+    reco = (np.array(targets), np.zeros(len(targets), dtype=np.int64), np.zeros(len(targets), dtype=np.float32))
+    reco_df = ModelBase._make_reco_table(reco, Columns.User, add_rank_col=True)  # pylint: disable=protected-access
+    np.testing.assert_equal(reco_df[Columns.Rank].values, expected)
+
 
 class TestFixedColdRecoModelMixin:
     def test_cold_reco_works(self) -> None:
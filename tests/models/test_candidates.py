@@ -0,0 +1,93 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from rectools import Columns
+from rectools.models import CandidatesMatrix, GroupCandidates
+
+from .data import DATASET
+
+
+class TestCandidatesMatrix:
+    def test_from_dataframe_with_external_ids(self) -> None:
+        candidates_df = pd.DataFrame(
+            {
+                Columns.User: [10, 10, 30, 30, 100],
+                Columns.Item: [12, 17, 11, 100, 11],
+            }
+        )
+        candidates = CandidatesMatrix.from_dataframe(candidates_df, DATASET)
+        expected = np.zeros((4, 6))
+        expected[0, [1, 5]] = 1
+        expected[2, 0] = 1
+        np.testing.assert_equal(candidates.matrix.toarray(), expected)
+
+    def test_from_dataframe_with_internal_ids(self) -> None:
+        candidates_df = pd.DataFrame({Columns.User: [0, 3, 10], Columns.Item: [2, 1, 1]})
+        candidates = CandidatesMatrix.from_dataframe(candidates_df, DATASET, assume_external_ids=False)
+        assert candidates.matrix.nnz == 2
+        assert candidates.matrix[0, 2] == 1
+        assert candidates.matrix[3, 1] == 1
+
+    def test_get_user_items(self) -> None:
+        matrix = sparse.csr_matrix([[1, 0, 1], [0, 1, 0]])
+        candidates = CandidatesMatrix(matrix)
+        actual = candidates.get_user_items(np.array([1, 5, 0, 1]), n_items=4)
+        expected = np.array([[0, 1, 0, 0], [0, 0, 0, 0], [1, 0, 1, 0], [0, 1, 0, 0]])
+        np.testing.assert_equal(actual.toarray(), expected)
+
+    def test_get_user_items_raises_on_too_many_items(self) -> None:
+        candidates = CandidatesMatrix(sparse.csr_matrix([[1, 0, 1]]))
+        with pytest.raises(ValueError, match="bigger than number of items"):
+            candidates.get_user_items(np.array([0]), n_items=2)
+
+    def test_get_user_groups(self) -> None:
+        candidates = CandidatesMatrix(sparse.csr_matrix([[1, 0, 1]]))
+        assert candidates.get_user_groups(np.array([0])) is None
+
+
+class TestGroupCandidates:
+    def test_from_dataframes(self) -> None:
+        user_groups = pd.DataFrame({Columns.User: [10, 20, 30, 100], "group": ["a", "b", "c", "a"]})
+        group_items = pd.DataFrame({"group": ["a", "a", "b", "b"], Columns.Item: [11, 12, 15, 100]})
+        candidates = GroupCandidates.from_dataframes(user_groups, group_items, DATASET)
+        np.testing.assert_equal(candidates.user_groups, [0, 1, -1, -1])
+        expected_group_items = np.zeros((2, 6))
+        expected_group_items[0, [0, 1]] = 1
+        expected_group_items[1, 4] = 1
+        np.testing.assert_equal(candidates.group_items.toarray(), expected_group_items)
+
+    def test_from_dataframes_raises_on_duplicated_users(self) -> None:
+        user_groups = pd.DataFrame({Columns.User: [10, 10], "group": ["a", "b"]})
+        group_items = pd.DataFrame({"group": ["a", "b"], Columns.Item: [11, 12]})
+        with pytest.raises(ValueError, match="only one group"):
+            GroupCandidates.from_dataframes(user_groups, group_items, DATASET)
+
+    def test_get_user_items(self) -> None:
+        candidates = GroupCandidates(np.array([1, -1, 0]), sparse.csr_matrix([[1, 1, 0], [0, 0, 1]]))
+        actual = candidates.get_user_items(np.array([0, 1, 2, 3, 0]), n_items=3)
+        expected = np.array([[0, 0, 1], [0, 0, 0], [1, 1, 0], [0, 0, 0], [0, 0, 1]])
+        np.testing.assert_equal(actual.toarray(), expected)
+
+    def test_get_user_groups(self) -> None:
+        group_items = sparse.csr_matrix([[1, 1, 0], [0, 0, 1]])
+        candidates = GroupCandidates(np.array([1, -1, 0]), group_items)
+        actual = candidates.get_user_groups(np.array([0, 1, 2, 3]))
+        assert actual is not None
+        np.testing.assert_equal(actual[0], [1, -1, 0, -1])
+        assert actual[1] is group_items
@@ -205,6 +205,20 @@ class TestDSSMModel:
         np.testing.assert_equal(vectors_reco, reco_item_ids)
         np.testing.assert_almost_equal(vectors_scores, reco_scores, decimal=5)
 
+    def test_users_factors_by_ids(self, dataset: Dataset) -> None:  # pylint: disable=protected-access
+        model = DSSMModel(
+            dataset_type=DSSMDataset,  # type: ignore
+            max_epochs=1,
+            batch_size=4,
+            dataloader_num_workers=0,
+            callbacks=None,
+        )
+        model.fit(dataset=dataset)
+        user_ids = np.array([3, 0, 3])
+        full_factors = model._get_users_factors(dataset)
+        actual = model._get_users_factors_by_ids(dataset, user_ids)
+        np.testing.assert_almost_equal(actual.embeddings, full_factors.embeddings[user_ids], decimal=5)
+
     def test_raises_when_get_vectors_from_not_fitted(self, dataset: Dataset) -> None:
         base_model = DSSM(
             n_factors_item=32,
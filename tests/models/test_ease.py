@@ -23,7 +23,11 @@ from rectools.dataset import Dataset
 from rectools.models import EASEModel
 
 from .data import DATASET, INTERACTIONS
-from .utils import assert_second_fit_refits_model
+from .utils import (
+    assert_candidates_work_as_per_user_whitelist,
+    assert_items_to_exclude_work_as_whitelist,
+    assert_second_fit_refits_model,
+)
 
 
 class TestEASEModel:
@@ -58,8 +62,11 @@ class TestEASEModel:
             ),
         ),
     )
-    def test_basic(self, dataset: Dataset, filter_viewed: bool, expected: pd.DataFrame) -> None:
-        model = EASEModel(regularization=500).fit(dataset)
+    @pytest.mark.parametrize("recommend_batch_size", (None, 1))
+    def test_basic(
+        self, dataset: Dataset, filter_viewed: bool, expected: pd.DataFrame, recommend_batch_size: tp.Optional[int]
+    ) -> None:
+        model = EASEModel(regularization=500, recommend_batch_size=recommend_batch_size).fit(dataset)
         actual = model.recommend(
             users=np.array([10, 20]),
             dataset=dataset,
@@ -167,6 +174,14 @@ class TestEASEModel:
         model = EASEModel()
         assert_second_fit_refits_model(model, dataset)
 
+    def test_with_items_to_exclude(self, dataset: Dataset) -> None:
+        model = EASEModel().fit(dataset)
+        assert_items_to_exclude_work_as_whitelist(model, dataset, [11, 15, 100])
+
+    def test_with_candidates(self, dataset: Dataset) -> None:
+        model = EASEModel(recommend_batch_size=2).fit(dataset)
+        assert_candidates_work_as_per_user_whitelist(model, dataset)
+
     @pytest.mark.parametrize(
         "user_features, error_match",
         (
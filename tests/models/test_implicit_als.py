@@ -30,7 +30,11 @@ from rectools.models.implicit_als import AnyAlternatingLeastSquares, GPUAlternat
 from rectools.models.utils import recommend_from_scores
 
 from .data import DATASET
-from .utils import assert_second_fit_refits_model
+from .utils import (
+    assert_candidates_work_as_per_user_whitelist,
+    assert_items_to_exclude_work_as_whitelist,
+    assert_second_fit_refits_model,
+)
 
 
 @pytest.mark.filterwarnings("ignore:Converting sparse features to dense")
@@ -82,6 +86,7 @@ class TestImplicitALSWrapperModel:
         ),
     )
     @pytest.mark.parametrize("fit_features_together", (False, True))
+    @pytest.mark.parametrize("recommend_batch_size", (None, 1))
     def test_basic(
         self,
         dataset: Dataset,
@@ -89,10 +94,13 @@ class TestImplicitALSWrapperModel:
         filter_viewed: bool,
         expected: pd.DataFrame,
         use_gpu: bool,
+        recommend_batch_size: tp.Optional[int],
     ) -> None:
         base_model = AlternatingLeastSquares(factors=2, num_threads=2, iterations=100)
         self._init_model_factors_inplace(base_model, dataset)
-        model = ImplicitALSWrapperModel(model=base_model, fit_features_together=fit_features_together).fit(dataset)
+        model = ImplicitALSWrapperModel(
+            model=base_model, fit_features_together=fit_features_together, recommend_batch_size=recommend_batch_size
+        ).fit(dataset)
         actual = model.recommend(
             users=np.array([10, 20]),
             dataset=dataset,
@@ -326,6 +334,16 @@ class TestImplicitALSWrapperModel:
         model = ImplicitALSWrapperModel(model=base_model)
         assert_second_fit_refits_model(model, dataset)
 
+    def test_with_items_to_exclude(self, use_gpu: bool, dataset: Dataset) -> None:
+        base_model = AlternatingLeastSquares(factors=8, num_threads=2, use_gpu=use_gpu, random_state=1)
+        model = ImplicitALSWrapperModel(model=base_model).fit(dataset)
+        assert_items_to_exclude_work_as_whitelist(model, dataset, [11, 15, 100])
+
+    def test_with_candidates(self, use_gpu: bool, dataset: Dataset) -> None:
+        base_model = AlternatingLeastSquares(factors=8, num_threads=2, use_gpu=use_gpu, random_state=1)
+        model = ImplicitALSWrapperModel(model=base_model).fit(dataset)
+        assert_candidates_work_as_per_user_whitelist(model, dataset)
+
     def test_u2i_with_cold_users(self, use_gpu: bool, dataset: Dataset) -> None:
         base_model = AlternatingLeastSquares(use_gpu=use_gpu)
         model = ImplicitALSWrapperModel(model=base_model).fit(dataset)
@@ -24,7 +24,7 @@ from rectools.dataset import Dataset
 from rectools.models import ImplicitItemKNNWrapperModel
 
 from .data import DATASET, INTERACTIONS
-from .utils import assert_second_fit_refits_model
+from .utils import assert_items_to_exclude_work_as_whitelist, assert_second_fit_refits_model
 
 
 class TestImplicitItemKNNWrapperModel:
@@ -169,11 +169,27 @@ class TestImplicitItemKNNWrapperModel:
             actual,
         )
 
+    @pytest.mark.parametrize("filter_viewed", (True, False))
+    @pytest.mark.parametrize("num_threads", (1, 2))
+    def test_batches_give_the_same_results(self, dataset: Dataset, filter_viewed: bool, num_threads: int) -> None:
+        base_model = TFIDFRecommender(K=5, num_threads=num_threads)
+        model = ImplicitItemKNNWrapperModel(model=base_model).fit(dataset)
+        users = [40, 10, 30, 10, 20]
+        expected = model.recommend(users, dataset, k=3, filter_viewed=filter_viewed, items_to_recommend=[11, 13, 15])
+        model.recommend_batch_size = 2
+        actual = model.recommend(users, dataset, k=3, filter_viewed=filter_viewed, items_to_recommend=[11, 13, 15])
+        pd.testing.assert_frame_equal(actual, expected)
+
     def test_second_fit_refits_model(self, dataset: Dataset) -> None:
         base_model = TFIDFRecommender(K=5, num_threads=2)
         model = ImplicitItemKNNWrapperModel(model=base_model)
         assert_second_fit_refits_model(model, dataset)
 
+    def test_with_items_to_exclude(self, dataset: Dataset) -> None:
+        base_model = TFIDFRecommender(K=5, num_threads=2)
+        model = ImplicitItemKNNWrapperModel(model=base_model).fit(dataset)
+        assert_items_to_exclude_work_as_whitelist(model, dataset, [11, 15, 100])
+
     @pytest.mark.parametrize(
         "user_features, error_match",
         (
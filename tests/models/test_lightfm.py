@@ -13,7 +13,9 @@
 #  limitations under the License.
 
 import typing as tp
+from copy import deepcopy
 
+import attr
 import numpy as np
 import pandas as pd
 import pytest
@@ -158,9 +160,12 @@ class TestLightFMWrapperModel:
             ),
         ),
     )
-    def test_with_whitelist(self, dataset: Dataset, filter_viewed: bool, expected: pd.DataFrame) -> None:
+    @pytest.mark.parametrize("recommend_batch_size", (None, 1))
+    def test_with_whitelist(
+        self, dataset: Dataset, filter_viewed: bool, expected: pd.DataFrame, recommend_batch_size: tp.Optional[int]
+    ) -> None:
         base_model = DeterministicLightFM(no_components=2, loss="logistic")
-        model = LightFMWrapperModel(model=base_model, epochs=50).fit(dataset)
+        model = LightFMWrapperModel(model=base_model, epochs=50, recommend_batch_size=recommend_batch_size).fit(dataset)
         actual = model.recommend(
             users=np.array([20]),
             dataset=dataset,
@@ -232,6 +237,44 @@ class TestLightFMWrapperModel:
         np.testing.assert_equal(vectors_reco, reco_item_ids)
         np.testing.assert_almost_equal(vectors_scores, reco_scores, decimal=5)
 
+    @pytest.mark.parametrize("use_features", (True, False))
+    def test_users_factors_by_ids(
+        self, dataset: Dataset, dataset_with_features: Dataset, use_features: bool
+    ) -> None:  # pylint: disable=protected-access
+        ds = dataset_with_features if use_features else dataset
+        model = LightFMWrapperModel(model=LightFM(no_components=2, loss="logistic")).fit(ds)
+        user_ids = np.array([3, 0, 3])
+        full_factors = model._get_users_factors(ds)
+        actual = model._get_users_factors_by_ids(ds, user_ids)
+        np.testing.assert_almost_equal(actual.embeddings, full_factors.embeddings[user_ids], decimal=5)
+        np.testing.assert_almost_equal(actual.biases, full_factors.biases[user_ids], decimal=5)  # type: ignore
+
+    def test_items_factors_are_reused_for_same_features(
+        self, dataset_with_features: Dataset
+    ) -> None:  # pylint: disable=protected-access
+        model = LightFMWrapperModel(model=DeterministicLightFM(no_components=2, loss="logistic")).fit(
+            dataset_with_features
+        )
+        expected = model.recommend(np.array([10, 20]), dataset_with_features, k=3, filter_viewed=False)
+        n_calls = 0
+        get_items_factors = model._get_items_factors
+
+        def get_items_factors_spy(dataset: Dataset) -> tp.Any:
+            nonlocal n_calls
+            n_calls += 1
+            return get_items_factors(dataset)
+
+        model._get_items_factors = get_items_factors_spy  # type: ignore
+        actual = model.recommend(np.array([20]), dataset_with_features, k=3, filter_viewed=False)
+        model.recommend_to_items(np.array([11]), dataset_with_features, k=2)
+        assert n_calls == 0
+        pd.testing.assert_frame_equal(actual, expected[expected[Columns.User] == 20].reset_index(drop=True))
+
+        new_dataset = attr.evolve(dataset_with_features, item_features=deepcopy(dataset_with_features.item_features))
+        actual = model.recommend(np.array([20]), new_dataset, k=3, filter_viewed=False)
+        assert n_calls == 1
+        pd.testing.assert_frame_equal(actual, expected[expected[Columns.User] == 20].reset_index(drop=True))
+
     def test_raises_when_get_vectors_from_not_fitted(self, dataset: Dataset) -> None:
         model = LightFMWrapperModel(model=LightFM())
         with pytest.raises(NotFittedError):
@@ -0,0 +1,95 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import typing as tp
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from rectools import Columns
+from rectools.dataset import Dataset
+from rectools.exceptions import NotFittedError
+from rectools.models import CandidatesMatrix, PopularModel, PureSVDModel, recommend_parallel
+from rectools.models.base import ModelBase
+from rectools.models.parallel import _order_users_by_hot_warm_cold, load_model_with_mmap, save_model_for_mmap
+
+from .data import DATASET, INTERACTIONS
+
+
+class TestRecommendParallel:
+    @pytest.mark.parametrize("model", (PopularModel(), PureSVDModel(factors=2)))
+    @pytest.mark.parametrize(
+        "kwargs",
+        (
+            {},
+            {"items_to_recommend": [11, 12, 13, 15], "add_rank_col": False},
+            {"items_to_exclude": [0], "assume_external_ids": False},
+        ),
+    )
+    def test_same_as_recommend(self, model: ModelBase, kwargs: tp.Dict[str, tp.Any]) -> None:
+        model.fit(DATASET)
+        users = [40, 10, 30, 20] if kwargs.get("assume_external_ids", True) else [3, 0, 2, 1]
+        expected = model.recommend(users, DATASET, k=3, filter_viewed=True, **kwargs)
+        actual = recommend_parallel(model, users, DATASET, k=3, filter_viewed=True, n_jobs=2, shard_size=1, **kwargs)
+        pd.testing.assert_frame_equal(actual, expected)
+
+    def test_with_candidates(self) -> None:
+        model = PureSVDModel(factors=2).fit(DATASET)
+        candidates = CandidatesMatrix(sparse.csr_matrix(np.eye(4, 6)))
+        expected = model.recommend([10, 20, 30], DATASET, k=3, filter_viewed=False, candidates=candidates)
+        actual = recommend_parallel(
+            model, [10, 20, 30], DATASET, k=3, filter_viewed=False, candidates=candidates, n_jobs=2, shard_size=2
+        )
+        pd.testing.assert_frame_equal(actual, expected)
+
+    def test_hot_warm_cold_order(self) -> None:
+        user_features = pd.DataFrame({Columns.User: [40, 50], "feature": ["f1", "f1"], "value": [1, 2]})
+        dataset = Dataset.construct(INTERACTIONS, user_features_df=user_features)
+        actual = _order_users_by_hot_warm_cold([60, 50, 10, 70, 40], dataset, assume_external_ids=True)
+        np.testing.assert_equal(actual, [10, 40, 50, 60, 70])
+        actual = _order_users_by_hot_warm_cold([6, 4, 1], dataset, assume_external_ids=False)
+        np.testing.assert_equal(actual, [1, 4, 6])
+
+    def test_raises_when_not_fitted(self) -> None:
+        with pytest.raises(NotFittedError):
+            recommend_parallel(PopularModel(), [10], DATASET, k=3, filter_viewed=False)
+
+    @pytest.mark.parametrize(
+        "kwargs,match",
+        (
+            ({"n_jobs": 0}, "`n_jobs` must be positive"),
+            ({"shard_size": 0}, "`shard_size` must be positive"),
+            ({"k": 0}, "`k` must be positive"),
+        ),
+    )
+    def test_raises_on_incorrect_arguments(self, kwargs: tp.Dict[str, tp.Any], match: str) -> None:
+        model = PopularModel().fit(DATASET)
+        with pytest.raises(ValueError, match=match):
+            recommend_parallel(model, [10], DATASET, **{"k": 3, "filter_viewed": False, **kwargs})
+
+
+def test_model_mmap_saving(tmp_path: Path) -> None:
+    model = PureSVDModel(factors=2).fit(DATASET)
+    save_model_for_mmap(model, tmp_path / "model")
+    loaded = load_model_with_mmap(tmp_path / "model")
+    assert isinstance(loaded, PureSVDModel)
+    assert not loaded.user_factors.flags.owndata
+    np.testing.assert_equal(loaded.user_factors, model.user_factors)
+    pd.testing.assert_frame_equal(
+        loaded.recommend([10, 20], DATASET, k=2, filter_viewed=True),
+        model.recommend([10, 20], DATASET, k=2, filter_viewed=True),
+    )
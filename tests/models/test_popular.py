@@ -22,7 +22,11 @@ import pytest
 from rectools import Columns
 from rectools.dataset import Dataset, IdMap, Interactions
 from rectools.models import PopularModel
-from tests.models.utils import assert_second_fit_refits_model
+from tests.models.utils import (
+    assert_candidates_work_as_per_user_whitelist,
+    assert_items_to_exclude_work_as_whitelist,
+    assert_second_fit_refits_model,
+)
 
 
 class TestPopularModel:
@@ -132,6 +136,17 @@ class TestPopularModel:
         expected_scores = [[6, 5, 2], [6, 5, 2]]
         self.assert_reco(expected_items, expected_scores, [10, 70], Columns.User, actual)
 
+    @pytest.mark.parametrize(
+        "model",
+        (PopularModel(period=timedelta(days=7)), PopularModel(begin_from=datetime(2021, 11, 23))),
+    )
+    def test_time_filtering_with_compact_interactions(self, dataset: Dataset, model: PopularModel) -> None:
+        compact_interactions = Interactions(dataset.interactions.df.copy(), compact=True)
+        compact_dataset = Dataset(dataset.user_id_map, dataset.item_id_map, compact_interactions)
+        expected = model.fit(dataset).recommend(users=[10, 70], dataset=dataset, k=3, filter_viewed=False)
+        actual = model.fit(compact_dataset).recommend(users=[10, 70], dataset=compact_dataset, k=3, filter_viewed=False)
+        pd.testing.assert_frame_equal(actual, expected)
+
     # FIXME: change 60 to 80 when added support for warm and cold
     def test_with_items_whitelist(self, dataset: Dataset) -> None:
         model = PopularModel().fit(dataset)
@@ -216,3 +231,20 @@ class TestPopularModel:
     def test_second_fit_refits_model(self, dataset: Dataset) -> None:
         model = PopularModel()
         assert_second_fit_refits_model(model, dataset)
+
+    def test_with_items_to_exclude(self, dataset: Dataset) -> None:
+        model = PopularModel().fit(dataset)
+        assert_items_to_exclude_work_as_whitelist(model, dataset, [11, 15, 100])
+
+    def test_with_candidates(self, dataset: Dataset) -> None:
+        model = PopularModel().fit(dataset)
+        assert_candidates_work_as_per_user_whitelist(model, dataset)
+
+    @pytest.mark.parametrize("filter_viewed", (True, False))
+    def test_batches_give_the_same_results(self, dataset: Dataset, filter_viewed: bool) -> None:
+        model = PopularModel().fit(dataset)
+        users = [60, 10, 40, 10, 20]
+        expected = model.recommend(users, dataset, k=3, filter_viewed=filter_viewed)
+        model.recommend_batch_size = 2
+        actual = model.recommend(users, dataset, k=3, filter_viewed=filter_viewed)
+        pd.testing.assert_frame_equal(actual, expected)
@@ -22,7 +22,11 @@ import pytest
 from rectools import Columns
 from rectools.dataset import Dataset
 from rectools.models import PopularInCategoryModel
-from tests.models.utils import assert_second_fit_refits_model
+from tests.models.utils import (
+    assert_candidates_work_as_per_user_whitelist,
+    assert_items_to_exclude_work_as_whitelist,
+    assert_second_fit_refits_model,
+)
 
 
 @pytest.mark.filterwarnings("ignore")
@@ -433,3 +437,22 @@ class TestPopularInCategoryModel:
             ratio_strategy="proportional",
         )
         assert_second_fit_refits_model(model, dataset)
+
+    @pytest.mark.parametrize("mixing_strategy", ("group", "rotate"))
+    def test_with_items_to_exclude(self, dataset: Dataset, mixing_strategy: str) -> None:
+        model = PopularInCategoryModel(category_feature="f2", mixing_strategy=mixing_strategy).fit(dataset)
+        assert_items_to_exclude_work_as_whitelist(model, dataset, [11, 15, 100])
+
+    def test_with_candidates(self, dataset: Dataset) -> None:
+        model = PopularInCategoryModel(category_feature="f2").fit(dataset)
+        assert_candidates_work_as_per_user_whitelist(model, dataset)
+
+    @pytest.mark.parametrize("mixing_strategy", ("group", "rotate"))
+    @pytest.mark.parametrize("filter_viewed", (True, False))
+    def test_batches_give_the_same_results(self, dataset: Dataset, mixing_strategy: str, filter_viewed: bool) -> None:
+        model = PopularInCategoryModel(category_feature="f2", mixing_strategy=mixing_strategy).fit(dataset)
+        users = [10, 20, 30, 40, 50, 60, 70]
+        expected = model.recommend(users, dataset, k=3, filter_viewed=filter_viewed)
+        model.recommend_batch_size = 4  # one user per batch for 3 categories
+        actual = model.recommend(users, dataset, k=3, filter_viewed=filter_viewed)
+        pd.testing.assert_frame_equal(actual, expected)
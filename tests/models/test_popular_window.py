@@ -0,0 +1,177 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import typing as tp
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rectools import Columns
+from rectools.dataset import Dataset
+from rectools.exceptions import NotFittedError
+from rectools.models import PopularModel, SlidingWindowPopularModel
+
+
+def make_interactions(seed: int, n_interactions: int, start: str, n_days: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    # Interactions are at midnight, so buckets of whole days end exactly where `PopularModel` window starts
+    days = rng.integers(0, n_days, n_interactions)
+    return pd.DataFrame(
+        {
+            Columns.User: rng.integers(0, 300, n_interactions),
+            Columns.Item: rng.zipf(1.5, n_interactions) % 40,
+            Columns.Weight: rng.integers(1, 5, n_interactions),
+            Columns.Datetime: pd.Timestamp(start) + pd.to_timedelta(days, unit="D"),
+        }
+    )
+
+
+def get_popularity(model: PopularModel, dataset: Dataset) -> tp.Dict[int, float]:
+    items, scores = model.popularity_list
+    return dict(zip(dataset.item_id_map.convert_to_external(items), scores))
+
+
+class TestSlidingWindowPopularModel:
+    @pytest.mark.parametrize("popularity", ("n_interactions", "mean_weight", "sum_weight"))
+    @pytest.mark.parametrize(
+        "period,n_buckets", ((timedelta(days=1), 1), (timedelta(days=3), 3), (timedelta(days=3), 6))
+    )
+    def test_same_as_popular_model_with_period(self, popularity: str, period: timedelta, n_buckets: int) -> None:
+        dataset = Dataset.construct(make_interactions(0, 500, "2021-11-01", 10))
+        model = SlidingWindowPopularModel(period, popularity, n_buckets=n_buckets).fit(dataset)
+        for i, start in enumerate(("2021-11-09", "2021-11-10", "2021-11-20", "2021-11-21")):
+            dataset = dataset.append_interactions(make_interactions(i + 1, 100, start, 2))
+            model.update(dataset)
+            expected = get_popularity(PopularModel(popularity, period=period).fit(dataset), dataset)
+            actual = get_popularity(model, dataset)
+            assert actual.keys() == expected.keys()
+            np.testing.assert_allclose([actual[item] for item in expected], list(expected.values()))
+            assert np.all(np.diff(model.popularity_list[1]) <= 0)
+
+    def test_n_users_is_approximated(self) -> None:
+        period = timedelta(days=3)
+        dataset = Dataset.construct(make_interactions(0, 2000, "2021-11-01", 10))
+        model = SlidingWindowPopularModel(period, "n_users", n_registers=1024).fit(dataset)
+        dataset = dataset.append_interactions(make_interactions(1, 1000, "2021-11-11", 2))
+        model.update(dataset)
+        expected = get_popularity(PopularModel("n_users", period=period).fit(dataset), dataset)
+        actual = get_popularity(model, dataset)
+        assert actual.keys() == expected.keys()
+        np.testing.assert_allclose([actual[item] for item in expected], list(expected.values()), rtol=0.1)
+
+    @pytest.mark.parametrize("n_registers", (16, 64, 4096))
+    def test_n_users_estimate_for_many_users(self, n_registers: int) -> None:
+        register_ids, ranks = SlidingWindowPopularModel._hash_users(  # pylint: disable=protected-access
+            np.arange(200_000), n_registers
+        )
+        registers = np.zeros((1, n_registers), dtype=np.uint8)
+        np.maximum.at(registers[0], register_ids, ranks)
+        estimate = SlidingWindowPopularModel._estimate_n_users(registers)  # pylint: disable=protected-access
+        np.testing.assert_allclose(estimate, 200_000, rtol=4 * 1.04 / np.sqrt(n_registers))
+
+    def test_window_moves_with_current_time(self) -> None:
+        dataset = Dataset.construct(make_interactions(0, 100, "2021-11-01", 2))
+        model = SlidingWindowPopularModel(timedelta(days=1), "n_interactions").fit(dataset)
+        model.update(dataset, current_time=datetime(2021, 11, 2, 12))
+        assert model.popularity_list[0].size > 0
+        model.update(dataset, current_time=datetime(2021, 11, 4))
+        assert model.popularity_list[0].size == 0
+        assert len(model.recommend(dataset.user_id_map.external_ids[:2], dataset, k=3, filter_viewed=False)) == 0
+
+        # Window doesn't move back, so old interactions are ignored
+        model.update(dataset.append_interactions(make_interactions(1, 100, "2021-11-01", 2)))
+        assert model.popularity_list[0].size == 0
+
+    def test_new_items_are_recommended(self) -> None:
+        dataset = Dataset.construct(make_interactions(0, 100, "2021-11-01", 2))
+        model = SlidingWindowPopularModel(timedelta(days=1), "n_users").fit(dataset)
+        new_interactions = pd.DataFrame(
+            {
+                Columns.User: np.arange(400, 500),
+                Columns.Item: 1000,
+                Columns.Weight: 1,
+                Columns.Datetime: pd.Timestamp("2021-11-02"),
+            }
+        )
+        dataset = dataset.append_interactions(new_interactions)
+        model.update(dataset)
+        reco = model.recommend([400], dataset, k=1, filter_viewed=False)
+        assert reco[Columns.Item].tolist() == [1000]
+
+    @pytest.mark.parametrize("popularity", ("n_users", "mean_weight"))
+    def test_update_estimates_only_changed_items(self, popularity: str, monkeypatch: pytest.MonkeyPatch) -> None:
+        dataset = Dataset.construct(make_interactions(0, 500, "2021-11-01", 3))
+        model = SlidingWindowPopularModel(timedelta(days=5), popularity).fit(dataset)
+        n_items = model.popularity_list[0].size
+        estimated_item_ids = []
+        calc_items_scores = model._calc_items_scores  # pylint: disable=protected-access
+
+        def calc_items_scores_spy(item_ids: np.ndarray) -> np.ndarray:
+            estimated_item_ids.extend(item_ids.tolist())
+            return calc_items_scores(item_ids)
+
+        monkeypatch.setattr(model, "_calc_items_scores", calc_items_scores_spy)
+        new_interactions = make_interactions(1, 3, "2021-11-03", 1)
+        dataset = dataset.append_interactions(new_interactions)
+        model.update(dataset)
+
+        changed_item_ids = dataset.item_id_map.convert_to_internal(new_interactions[Columns.Item].unique())
+        assert sorted(estimated_item_ids) == sorted(changed_item_ids)
+        items, scores = model.popularity_list
+        assert items.size == n_items
+        assert np.all(np.lexsort((items, -scores)) == np.arange(n_items))
+
+    def test_compact_interactions(self) -> None:
+        interactions_df = make_interactions(0, 200, "2021-11-01", 5)
+        dataset = Dataset.construct(interactions_df)
+        compact_dataset = Dataset.construct(interactions_df, compact_interactions=True)
+        model = SlidingWindowPopularModel(timedelta(days=2), "sum_weight")
+        assert get_popularity(model.fit(compact_dataset), compact_dataset) == get_popularity(
+            model.fit(dataset), dataset
+        )
+
+    def test_second_fit_refits_model(self) -> None:
+        dataset = Dataset.construct(make_interactions(0, 200, "2021-11-01", 5))
+        model = SlidingWindowPopularModel(timedelta(days=2)).fit(dataset)
+        expected = get_popularity(model, dataset)
+        model.fit(Dataset.construct(make_interactions(1, 200, "2021-11-01", 5)))
+        assert get_popularity(model.fit(dataset), dataset) == expected
+
+    def test_raises_when_not_fitted(self) -> None:
+        dataset = Dataset.construct(make_interactions(0, 10, "2021-11-01", 2))
+        with pytest.raises(NotFittedError):
+            SlidingWindowPopularModel(timedelta(days=1)).update(dataset)
+
+    def test_raises_when_dataset_has_less_interactions(self) -> None:
+        model = SlidingWindowPopularModel(timedelta(days=1)).fit(
+            Dataset.construct(make_interactions(0, 20, "2021-11-01", 2))
+        )
+        with pytest.raises(ValueError, match="model has already seen 20"):
+            model.update(Dataset.construct(make_interactions(0, 10, "2021-11-01", 2)))
+
+    @pytest.mark.parametrize(
+        "kwargs,match",
+        (
+            ({"period": timedelta(0)}, "`period` must be positive"),
+            ({"n_buckets": 0}, "`n_buckets` must be positive"),
+            ({"n_registers": 8}, "`n_registers` must be a power of 2"),
+            ({"n_registers": 100}, "`n_registers` must be a power of 2"),
+            ({"popularity": "strange"}, "`popularity` must be one of"),
+        ),
+    )
+    def test_raises_on_incorrect_arguments(self, kwargs: tp.Dict[str, tp.Any], match: str) -> None:
+        with pytest.raises(ValueError, match=match):
+            SlidingWindowPopularModel(**{"period": timedelta(days=1), **kwargs})
@@ -25,7 +25,11 @@ from rectools.models.pure_svd import PureSVDModel
 from rectools.models.utils import recommend_from_scores
 
 from .data import DATASET, INTERACTIONS
-from .utils import assert_second_fit_refits_model
+from .utils import (
+    assert_candidates_work_as_per_user_whitelist,
+    assert_items_to_exclude_work_as_whitelist,
+    assert_second_fit_refits_model,
+)
 
 
 class TestPureSVDModel:
@@ -58,13 +62,15 @@ class TestPureSVDModel:
             ),
         ),
     )
+    @pytest.mark.parametrize("recommend_batch_size", (None, 1))
     def test_basic(
         self,
         dataset: Dataset,
         filter_viewed: bool,
         expected: pd.DataFrame,
+        recommend_batch_size: tp.Optional[int],
     ) -> None:
-        model = PureSVDModel(factors=2).fit(dataset)
+        model = PureSVDModel(factors=2, recommend_batch_size=recommend_batch_size).fit(dataset)
         actual = model.recommend(
             users=np.array([10, 20]),
             dataset=dataset,
@@ -117,6 +123,25 @@ class TestPureSVDModel:
             actual,
         )
 
+    def test_with_quantization(self, dataset: Dataset) -> None:
+        expected = PureSVDModel(factors=2).fit(dataset).recommend(np.array([10, 20]), dataset, k=3, filter_viewed=False)
+        model = PureSVDModel(factors=2, recommend_quantization="int8", recommend_rerank_factor=2).fit(dataset)
+        actual = model.recommend(np.array([10, 20]), dataset, k=3, filter_viewed=False)
+        pd.testing.assert_frame_equal(actual.drop(columns=Columns.Score), expected.drop(columns=Columns.Score))
+        np.testing.assert_allclose(actual[Columns.Score], expected[Columns.Score], rtol=1e-5)
+
+    def test_with_hnsw_backend(self, dataset: Dataset) -> None:
+        pytest.importorskip("nmslib")
+        expected = PureSVDModel(factors=2).fit(dataset).recommend(np.array([10, 20]), dataset, k=3, filter_viewed=True)
+        model = PureSVDModel(
+            factors=2,
+            recommend_backend="hnsw",
+            recommend_backend_params={"index_query_time_params": {"efSearch": 100}, "max_overfetch_ratio": 1.0},
+        ).fit(dataset)
+        actual = model.recommend(np.array([10, 20]), dataset, k=3, filter_viewed=True)
+        pd.testing.assert_frame_equal(actual.drop(columns=Columns.Score), expected.drop(columns=Columns.Score))
+        np.testing.assert_allclose(actual[Columns.Score], expected[Columns.Score], rtol=1e-5)
+
     def test_get_vectors(self, dataset: Dataset) -> None:
         model = PureSVDModel(factors=2).fit(dataset)
         user_embeddings, item_embeddings = model.get_vectors()
@@ -198,6 +223,14 @@ class TestPureSVDModel:
         model = PureSVDModel(factors=3)
         assert_second_fit_refits_model(model, dataset)
 
+    def test_with_items_to_exclude(self, dataset: Dataset) -> None:
+        model = PureSVDModel(factors=3).fit(dataset)
+        assert_items_to_exclude_work_as_whitelist(model, dataset, [11, 15, 100])
+
+    def test_with_candidates(self, dataset: Dataset) -> None:
+        model = PureSVDModel(factors=3).fit(dataset)
+        assert_candidates_work_as_per_user_whitelist(model, dataset)
+
     @pytest.mark.parametrize(
         "user_features, error_match",
         (
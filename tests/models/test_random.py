@@ -23,7 +23,7 @@ from rectools.dataset import Dataset
 from rectools.models import RandomModel
 
 from .data import DATASET, INTERACTIONS
-from .utils import assert_second_fit_refits_model
+from .utils import assert_items_to_exclude_work_as_whitelist, assert_second_fit_refits_model
 
 
 class TestRandomModel:
@@ -103,6 +103,72 @@ class TestRandomModel:
         reco_2 = model.recommend(users=np.array([10, 20]), dataset=dataset, k=5, filter_viewed=False)
         pd.testing.assert_frame_equal(reco_1, reco_2)
 
+    def test_different_seeds_give_different_users_streams(self) -> None:
+        # Internal ids of users are the same as external ones
+        interactions = pd.DataFrame(
+            {Columns.User: np.arange(100), Columns.Item: np.arange(100) % 50, Columns.Weight: 1, Columns.Datetime: 1}
+        )
+        dataset = Dataset.construct(interactions)
+        reco_0 = (
+            RandomModel(random_state=0).fit(dataset).recommend(np.arange(1, 100), dataset, k=5, filter_viewed=False)
+        )
+        reco_1 = RandomModel(random_state=1).fit(dataset).recommend(np.arange(99), dataset, k=5, filter_viewed=False)
+        # Recommendations of user `i + 1` with seed 0 are compared to recommendations of user `i` with seed 1
+        items_0 = reco_0.groupby(Columns.User)[Columns.Item].apply(tuple).values
+        items_1 = reco_1.groupby(Columns.User)[Columns.Item].apply(tuple).values
+        assert (items_0 == items_1).sum() <= 1
+
+    @pytest.mark.parametrize("k", (3, 100))
+    def test_same_results_for_any_users_batches(self, k: int) -> None:
+        rng = np.random.default_rng(0)
+        interactions = pd.DataFrame(
+            {
+                Columns.User: rng.integers(0, 30, 300),
+                Columns.Item: rng.integers(0, 1000, 300),
+                Columns.Weight: 1,
+                Columns.Datetime: 1,
+            }
+        )
+        dataset = Dataset.construct(interactions)
+        model = RandomModel(random_state=7).fit(dataset)
+        users = dataset.user_id_map.external_ids
+        expected = model.recommend(users, dataset, k=k, filter_viewed=True)
+
+        model.recommend_batch_size = 4
+        actual = model.recommend(users[::-1], dataset, k=k, filter_viewed=True)
+        actual = actual.sort_values([Columns.User, Columns.Rank]).reset_index(drop=True)
+        pd.testing.assert_frame_equal(actual, expected.sort_values([Columns.User, Columns.Rank]).reset_index(drop=True))
+        for user in users[:3]:
+            single = model.recommend([user], dataset, k=k, filter_viewed=True)
+            pd.testing.assert_frame_equal(single, expected[expected[Columns.User] == user].reset_index(drop=True))
+
+        assert (expected.groupby(Columns.User)[Columns.Item].nunique() == k).all()
+        viewed = set(zip(interactions[Columns.User], interactions[Columns.Item]))
+        assert not viewed & set(zip(expected[Columns.User], expected[Columns.Item]))
+
+    @pytest.mark.parametrize("n_items", (20, 100))
+    def test_items_are_sampled_uniformly(self, n_items: int) -> None:
+        interactions = pd.DataFrame(
+            {
+                Columns.User: np.arange(n_items * 200),
+                Columns.Item: np.arange(n_items * 200) % n_items,
+                Columns.Weight: 1,
+                Columns.Datetime: 1,
+            }
+        )
+        dataset = Dataset.construct(interactions)
+        reco = RandomModel(random_state=1).fit(dataset).recommend(interactions[Columns.User], dataset, 1, False)
+        counts = reco[Columns.Item].value_counts()
+        assert counts.size == n_items
+        assert counts.min() > 150 and counts.max() < 250
+
+    def test_global_random_state_is_not_changed(self, dataset: Dataset) -> None:
+        np.random.seed(5)
+        expected = np.random.random()
+        np.random.seed(5)
+        RandomModel(random_state=1).fit(dataset).recommend([10, 20], dataset, k=2, filter_viewed=False)
+        assert np.random.random() == expected
+
     @pytest.mark.parametrize("filter_itself", (True, False))
     @pytest.mark.parametrize("whitelist", (None, np.array([11, 12, 13])))
     def test_i2i(self, dataset: Dataset, filter_itself: bool, whitelist: tp.Optional[np.ndarray]) -> None:
@@ -130,6 +196,10 @@ class TestRandomModel:
         model = RandomModel(random_state=1)
         assert_second_fit_refits_model(model, dataset)
 
+    def test_with_items_to_exclude(self, dataset: Dataset) -> None:
+        model = RandomModel(random_state=1).fit(dataset)
+        assert_items_to_exclude_work_as_whitelist(model, dataset, [11, 15, 100])
+
     @pytest.mark.parametrize(
         "user_features",
         (
@@ -19,6 +19,8 @@ import numpy as np
 import pytest
 from scipy import sparse
 
+from rectools.models import rank as rank_module
+from rectools.models.candidates import CandidatesMatrix, GroupCandidates, UserCandidates
 from rectools.models.rank import Distance, ImplicitRanker
 
 T = tp.TypeVar("T")
@@ -77,19 +79,27 @@ class TestImplicitRanker:  # pylint: disable=protected-access
 
         implicit_ranker = ImplicitRanker(Distance.DOT, subjects_factors=subject_factors, objects_factors=object_factors)
         neginf = implicit_ranker._get_neginf_score()
-        scores = np.array([7, 6, 0, 0], dtype=np.float32)
-
+        scores = np.array(
+            [
+                [7, 6, 0, 0, 0, 0],
+                [7, 6, 0, 0, neginf, neginf],
+                [7, 6, 0, 0, neginf * 0.99, neginf * 0.99],
+                [neginf, 7, 6, 0, 0, 0],
+                [neginf] * 6,
+            ],
+            dtype=np.float32,
+        )
+        expected = np.array(
+            [
+                [True] * 6,
+                [True] * 4 + [False] * 2,
+                [True] * 6,
+                [True] * 6,
+                [False] * 6,
+            ]
+        )
         actual = implicit_ranker._get_mask_for_correct_scores(scores)
-        assert actual == [True] * 4
-
-        actual = implicit_ranker._get_mask_for_correct_scores(np.append(scores, [neginf] * 2))
-        assert actual == [True] * 4 + [False] * 2
-
-        actual = implicit_ranker._get_mask_for_correct_scores(np.append(scores, [neginf * 0.99] * 2))
-        assert actual == [True] * 6
-
-        actual = implicit_ranker._get_mask_for_correct_scores(np.insert(scores, 0, neginf))
-        assert actual == [True] * 5
+        np.testing.assert_equal(actual, expected)
 
     @pytest.mark.parametrize(
         "distance, expected_recs, expected_scores, dense",
@@ -215,3 +225,179 @@ class TestImplicitRanker:  # pylint: disable=protected-access
         subject_factors = sparse.csr_matrix(subject_factors)
         with pytest.raises(ValueError):
             ImplicitRanker(distance=distance, subjects_factors=subject_factors, objects_factors=object_factors)
+
+    @pytest.mark.parametrize("distance", (Distance.DOT, Distance.COSINE, Distance.EUCLIDEAN))
+    @pytest.mark.parametrize("use_whitelist", (True, False))
+    @pytest.mark.parametrize("batch_size", (1, 2, 3, 100))
+    def test_rank_in_batches(self, distance: Distance, use_whitelist: bool, batch_size: int) -> None:
+        rng = np.random.default_rng(0)
+        subject_factors = rng.normal(size=(7, 4))
+        object_factors = rng.normal(size=(10, 4))
+        filter_pairs_csr = sparse.random(5, 10, density=0.3, format="csr", random_state=1)
+        subject_ids = np.array([6, 0, 3, 2, 5])
+        whitelist = np.array([0, 2, 3, 5, 7, 8]) if use_whitelist else None
+
+        ranker = ImplicitRanker(distance, subject_factors, object_factors)
+        expected = ranker.rank(subject_ids, k=4, filter_pairs_csr=filter_pairs_csr, sorted_object_whitelist=whitelist)
+        actual = ranker.rank(
+            subject_ids,
+            k=4,
+            filter_pairs_csr=filter_pairs_csr,
+            sorted_object_whitelist=whitelist,
+            batch_size=batch_size,
+        )
+        np.testing.assert_equal(actual[0], expected[0])
+        np.testing.assert_equal(actual[1], expected[1])
+        np.testing.assert_almost_equal(actual[2], expected[2])
+
+    def test_rank_no_subjects(self, subject_factors: np.ndarray, object_factors: np.ndarray) -> None:
+        ranker = ImplicitRanker(Distance.DOT, subject_factors, object_factors)
+        actual = ranker.rank(np.array([], dtype=int), k=3, batch_size=2)
+        for arr in actual:
+            assert np.asarray(arr).size == 0
+
+    @pytest.mark.parametrize("batch_size", (0, -1))
+    def test_rank_raises_on_incorrect_batch_size(
+        self, subject_factors: np.ndarray, object_factors: np.ndarray, batch_size: int
+    ) -> None:
+        ranker = ImplicitRanker(Distance.DOT, subject_factors, object_factors)
+        with pytest.raises(ValueError, match="`batch_size` must be positive"):
+            ranker.rank([0, 1], k=3, batch_size=batch_size)
+
+    @pytest.mark.parametrize("distance", (Distance.DOT, Distance.COSINE, Distance.EUCLIDEAN))
+    def test_prepared_objects_are_reused(self, distance: Distance) -> None:
+        rng = np.random.default_rng(0)
+        subject_factors = rng.normal(size=(4, 3)).astype(np.float32)
+        object_factors = rng.normal(size=(6, 3)).astype(np.float32)
+        ranker = ImplicitRanker(distance, subject_factors, object_factors)
+        assert ranker.subjects_factors is subject_factors
+        assert ranker.objects_factors is object_factors
+
+        expected = ranker.rank(np.array([0, 2]), k=3, sorted_object_whitelist=np.array([1, 3, 4]))
+        prepared_objects = ranker._objects_cache["prepared_objects"]
+        actual = ranker.rank(np.array([0, 2]), k=3, sorted_object_whitelist=np.array([1, 3, 4]))
+        assert ranker._objects_cache["prepared_objects"] is prepared_objects
+        for actual_part, expected_part in zip(actual, expected):
+            np.testing.assert_equal(actual_part, expected_part)
+
+    @pytest.mark.parametrize("distance", (Distance.DOT, Distance.COSINE, Distance.EUCLIDEAN))
+    def test_with_subjects(self, distance: Distance) -> None:
+        rng = np.random.default_rng(0)
+        subject_factors = rng.normal(size=(4, 3))
+        object_factors = rng.normal(size=(6, 3))
+        ranker = ImplicitRanker(distance, subject_factors, object_factors)
+        ranker.rank(np.array([0]), k=3)
+
+        new_ranker = ranker.with_subjects(subject_factors[[2, 1]])
+        assert new_ranker._objects_cache is ranker._objects_cache
+        actual = new_ranker.rank(np.array([1, 0]), k=3)
+        expected = ranker.rank(np.array([1, 2]), k=3)
+        np.testing.assert_equal(actual[0], [1, 1, 1, 0, 0, 0])
+        np.testing.assert_equal(actual[1], expected[1])
+        np.testing.assert_almost_equal(actual[2], expected[2])
+
+    @pytest.mark.parametrize("distance", (Distance.DOT, Distance.COSINE, Distance.EUCLIDEAN))
+    @pytest.mark.parametrize("whitelist", (None, np.array([0, 2, 3, 5, 7, 8])))
+    @pytest.mark.parametrize("batch_size", (None, 2))
+    def test_rank_with_objects_blacklist(
+        self, distance: Distance, whitelist: tp.Optional[np.ndarray], batch_size: tp.Optional[int]
+    ) -> None:
+        rng = np.random.default_rng(0)
+        subject_factors = rng.normal(size=(5, 4))
+        object_factors = rng.normal(size=(10, 4))
+        filter_pairs_csr = sparse.csr_matrix(rng.random((5, 10)) > 0.7)
+        blacklist = np.array([2, 4, 8])
+        allowed = np.setdiff1d(whitelist if whitelist is not None else np.arange(10), blacklist)
+
+        ranker = ImplicitRanker(distance, subject_factors, object_factors)
+        expected = ranker.rank([0, 1, 2, 3, 4], k=8, filter_pairs_csr=filter_pairs_csr, sorted_object_whitelist=allowed)
+        actual = ranker.rank(
+            [0, 1, 2, 3, 4],
+            k=8,
+            filter_pairs_csr=filter_pairs_csr,
+            sorted_object_whitelist=whitelist,
+            batch_size=batch_size,
+            sorted_object_blacklist=blacklist,
+        )
+        np.testing.assert_equal(actual[0], expected[0])
+        np.testing.assert_equal(actual[1], expected[1])
+        np.testing.assert_almost_equal(actual[2], expected[2])
+
+    @pytest.mark.parametrize("distance", (Distance.DOT, Distance.COSINE, Distance.EUCLIDEAN))
+    @pytest.mark.parametrize("whitelist", (None, np.array([0, 2, 3, 5, 7, 8])))
+    @pytest.mark.parametrize("blacklist", (None, np.array([2, 4])))
+    @pytest.mark.parametrize("by_groups", (False, True))
+    def test_rank_with_subject_candidates(
+        self,
+        distance: Distance,
+        whitelist: tp.Optional[np.ndarray],
+        blacklist: tp.Optional[np.ndarray],
+        by_groups: bool,
+    ) -> None:
+        rng = np.random.default_rng(0)
+        subject_factors = rng.normal(size=(6, 4))
+        object_factors = rng.normal(size=(10, 4))
+        subject_ids = np.array([5, 0, 3, 2, 4])
+        filter_pairs_csr = sparse.csr_matrix(rng.random((5, 10)) > 0.8)
+        if by_groups:
+            user_groups = np.array([1, -1, 0, 1, 2, 0])  # subject 1 without candidates
+            group_items = sparse.csr_matrix(rng.random((3, 10)) > 0.5)
+            candidates: UserCandidates = GroupCandidates(user_groups, group_items)
+            allowed = candidates.get_user_items(np.arange(6), 10)
+        else:
+            allowed = sparse.csr_matrix(rng.random((6, 10)) > 0.5)
+            allowed[1] = 0  # subject without candidates
+            candidates = CandidatesMatrix(allowed)
+
+        ranker = ImplicitRanker(distance, subject_factors, object_factors)
+        actual = ranker.rank(
+            subject_ids,
+            k=4,
+            filter_pairs_csr=filter_pairs_csr,
+            sorted_object_whitelist=whitelist,
+            batch_size=2,
+            sorted_object_blacklist=blacklist,
+            subject_candidates=candidates,
+        )
+
+        expected: tp.List[tp.List[tp.Any]] = [[], [], []]
+        for pos, subject_id in enumerate(subject_ids):
+            subject_whitelist = allowed[subject_id].indices
+            if whitelist is not None:
+                subject_whitelist = np.intersect1d(subject_whitelist, whitelist)
+            if blacklist is not None:
+                subject_whitelist = np.setdiff1d(subject_whitelist, blacklist)
+            if subject_whitelist.size == 0:
+                continue
+            subject_reco = ranker.rank(
+                [subject_id],
+                k=4,
+                filter_pairs_csr=filter_pairs_csr[pos],
+                sorted_object_whitelist=np.sort(subject_whitelist),
+            )
+            for part, values in zip(expected, subject_reco):
+                part.extend(values)
+
+        np.testing.assert_equal(actual[0], expected[0])
+        np.testing.assert_equal(actual[1], expected[1])
+        np.testing.assert_almost_equal(actual[2], expected[2], decimal=5)
+
+    def test_chunks_with_subject_candidates_are_limited(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        rng = np.random.default_rng(0)
+        ranker = ImplicitRanker(Distance.DOT, rng.normal(size=(6, 4)), rng.normal(size=(10, 4)))
+        candidates = CandidatesMatrix(sparse.csr_matrix(rng.random((6, 10)) > 0.5))
+        expected = ranker.rank(np.arange(6), k=4, subject_candidates=candidates)
+
+        calc_scores = ranker._calc_scores
+        chunk_sizes = []
+
+        def calc_scores_with_check(subject_ids: np.ndarray, *args: tp.Any) -> np.ndarray:
+            chunk_sizes.append(subject_ids.size)
+            return calc_scores(subject_ids, *args)
+
+        monkeypatch.setattr(rank_module, "MAX_CANDIDATES_CHUNK_SCORES", 25)
+        monkeypatch.setattr(ranker, "_calc_scores", calc_scores_with_check)
+        actual = ranker.rank(np.arange(6), k=4, subject_candidates=candidates)
+        assert chunk_sizes == [2, 2, 2]
+        for actual_part, expected_part in zip(actual, expected):
+            np.testing.assert_equal(actual_part, expected_part)
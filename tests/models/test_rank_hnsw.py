@@ -0,0 +1,124 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import typing as tp
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+from rectools.models.candidates import CandidatesMatrix
+from rectools.models.rank import Distance, ImplicitRanker
+
+pytest.importorskip("nmslib")
+
+from rectools.models.rank_hnsw import HnswRanker  # noqa: E402  # pylint: disable=wrong-import-position
+
+# Index with big `efSearch` on small data is exact, all subjects are ranked with index
+INDEX_PARAMS: tp.Dict[str, tp.Any] = {
+    "create_index_params": {"M": 32, "efConstruction": 400, "post": 0},
+    "index_query_time_params": {"efSearch": 400},
+    "max_overfetch_ratio": 1.0,
+}
+
+
+class TestHnswRanker:  # pylint: disable=protected-access
+    @pytest.fixture
+    def subject_factors(self) -> np.ndarray:
+        return np.random.default_rng(0).normal(size=(20, 8))
+
+    @pytest.fixture
+    def object_factors(self) -> np.ndarray:
+        return np.random.default_rng(1).normal(size=(100, 8))
+
+    @pytest.mark.parametrize("distance", (Distance.DOT, Distance.COSINE, Distance.EUCLIDEAN))
+    @pytest.mark.parametrize("filter_viewed", (True, False))
+    @pytest.mark.parametrize("whitelist", (None, np.arange(0, 100, 3)))
+    @pytest.mark.parametrize("blacklist", (None, np.array([2, 3, 10])))
+    def test_same_as_exact_ranking(
+        self,
+        subject_factors: np.ndarray,
+        object_factors: np.ndarray,
+        distance: Distance,
+        filter_viewed: bool,
+        whitelist: tp.Optional[np.ndarray],
+        blacklist: tp.Optional[np.ndarray],
+    ) -> None:
+        subject_ids = np.array([5, 0, 19, 7])
+        kwargs: tp.Dict[str, tp.Any] = {
+            "subject_ids": subject_ids,
+            "k": 5,
+            "filter_pairs_csr": (
+                sparse.csr_matrix(np.random.default_rng(2).random((4, 100)) > 0.8) if filter_viewed else None
+            ),
+            "sorted_object_whitelist": whitelist,
+            "sorted_object_blacklist": blacklist,
+        }
+        expected = ImplicitRanker(distance, subject_factors, object_factors).rank(**kwargs)
+        ranker = HnswRanker(distance, subject_factors, object_factors, **INDEX_PARAMS)
+        actual = ranker.rank(batch_size=3, **kwargs)
+        np.testing.assert_equal(actual[0], expected[0])
+        np.testing.assert_equal(actual[1], expected[1])
+        np.testing.assert_almost_equal(actual[2], expected[2], decimal=4)
+
+    @pytest.mark.parametrize("distance", (Distance.DOT, Distance.COSINE, Distance.EUCLIDEAN))
+    def test_subjects_with_many_filtered_objects(
+        self, subject_factors: np.ndarray, object_factors: np.ndarray, distance: Distance
+    ) -> None:
+        subject_ids = np.arange(20)
+        # Subjects have from 0 to 57 viewed objects, so they need different numbers of neighbours
+        n_viewed = np.arange(20) * 3
+        viewed = np.arange(100)[np.newaxis, :] < n_viewed[:, np.newaxis]
+        filter_pairs_csr = sparse.csr_matrix(np.random.default_rng(2).permuted(viewed, axis=1))
+        kwargs: tp.Dict[str, tp.Any] = {"subject_ids": subject_ids, "k": 5, "filter_pairs_csr": filter_pairs_csr}
+        expected = ImplicitRanker(distance, subject_factors, object_factors).rank(**kwargs)
+
+        ranker = HnswRanker(distance, subject_factors, object_factors, **{**INDEX_PARAMS, "max_overfetch_ratio": 0.3})
+        queried_numbers = []
+        query_index = ranker._query_index
+
+        def query_index_with_check(subject_ids: np.ndarray, n_neighbours: int, num_threads: int) -> np.ndarray:
+            queried_numbers.append((subject_ids.size, n_neighbours))
+            return query_index(subject_ids, n_neighbours, num_threads)
+
+        ranker._query_index = query_index_with_check  # type: ignore
+        actual = ranker.rank(**kwargs)
+        # Subjects need ``5 + 3 * i`` neighbours, ones that need more than 30 neighbours are ranked exactly
+        assert queried_numbers == [(2, 8), (2, 16), (5, 32)]
+        np.testing.assert_equal(actual[0], expected[0])
+        np.testing.assert_equal(actual[1], expected[1])
+        np.testing.assert_almost_equal(actual[2], expected[2], decimal=4)
+
+    def test_index_is_built_once(self, subject_factors: np.ndarray, object_factors: np.ndarray) -> None:
+        ranker = HnswRanker(Distance.DOT, subject_factors, object_factors, **INDEX_PARAMS)
+        ranker.rank(np.array([0, 1]), k=3)
+        index = ranker._objects_cache["index"]
+        ranker.rank(np.array([2]), k=3)
+        ranker.with_subjects(subject_factors[:2]).rank(np.array([1]), k=3)
+        assert ranker._objects_cache["index"] is index
+
+    def test_with_subject_candidates(self, subject_factors: np.ndarray, object_factors: np.ndarray) -> None:
+        allowed = sparse.csr_matrix(np.random.default_rng(3).random((20, 100)) > 0.5)
+        ranker = HnswRanker(Distance.DOT, subject_factors, object_factors, **INDEX_PARAMS)
+        target_ids, reco_ids, _ = ranker.rank(np.array([0, 4]), k=5, subject_candidates=CandidatesMatrix(allowed))
+        assert all(allowed[target_id, reco_id] for target_id, reco_id in zip(target_ids, reco_ids))
+
+    def test_when_all_objects_are_filtered(self, subject_factors: np.ndarray, object_factors: np.ndarray) -> None:
+        ranker = HnswRanker(Distance.DOT, subject_factors, object_factors, **INDEX_PARAMS)
+        target_ids, reco_ids, scores = ranker.rank(np.array([0]), k=5, sorted_object_blacklist=np.arange(100))
+        assert np.asarray(target_ids).size == np.asarray(reco_ids).size == np.asarray(scores).size == 0
+
+    def test_raises_on_sparse_subjects(self, object_factors: np.ndarray) -> None:
+        with pytest.raises(ValueError, match="not supported"):
+            HnswRanker(Distance.DOT, sparse.csr_matrix(np.ones((2, 8))), object_factors)
@@ -0,0 +1,112 @@
+#  Copyright 2024 MTS (Mobile Telesystems)
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import typing as tp
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+from rectools.models.candidates import CandidatesMatrix
+from rectools.models.rank import Distance, ImplicitRanker
+from rectools.models.rank_quantized import QuantizedRanker
+
+
+class TestQuantizedRanker:  # pylint: disable=protected-access
+    @pytest.fixture
+    def subject_factors(self) -> np.ndarray:
+        return np.random.default_rng(0).normal(size=(20, 8))
+
+    @pytest.fixture
+    def object_factors(self) -> np.ndarray:
+        return np.random.default_rng(1).normal(size=(50, 8))
+
+    @pytest.mark.parametrize("distance", (Distance.DOT, Distance.COSINE, Distance.EUCLIDEAN))
+    @pytest.mark.parametrize("dtype", ("float16", "int8"))
+    @pytest.mark.parametrize("whitelist", (None, np.arange(0, 50, 2)))
+    @pytest.mark.parametrize("blacklist", (None, np.array([2, 3, 10])))
+    def test_rerank_gives_exact_results(
+        self,
+        subject_factors: np.ndarray,
+        object_factors: np.ndarray,
+        distance: Distance,
+        dtype: str,
+        whitelist: tp.Optional[np.ndarray],
+        blacklist: tp.Optional[np.ndarray],
+    ) -> None:
+        subject_ids = np.array([5, 0, 19, 7])
+        filter_pairs_csr = sparse.csr_matrix(np.random.default_rng(2).random((4, 50)) > 0.7)
+        kwargs: tp.Dict[str, tp.Any] = {
+            "subject_ids": subject_ids,
+            "k": 5,
+            "filter_pairs_csr": filter_pairs_csr,
+            "sorted_object_whitelist": whitelist,
+            "sorted_object_blacklist": blacklist,
+        }
+        expected = ImplicitRanker(distance, subject_factors, object_factors).rank(**kwargs)
+        ranker = QuantizedRanker(distance, subject_factors, object_factors, dtype, block_size=7, rerank_factor=4)
+        actual = ranker.rank(batch_size=3, **kwargs)
+        np.testing.assert_equal(actual[0], expected[0])
+        np.testing.assert_equal(actual[1], expected[1])
+        np.testing.assert_almost_equal(actual[2], expected[2], decimal=4)
+
+    @pytest.mark.parametrize("distance", (Distance.DOT, Distance.COSINE, Distance.EUCLIDEAN))
+    @pytest.mark.parametrize("dtype,decimal", (("float16", 2), ("int8", 1)))
+    def test_approximate_scores(
+        self, subject_factors: np.ndarray, object_factors: np.ndarray, distance: Distance, dtype: str, decimal: int
+    ) -> None:
+        exact_ranker = ImplicitRanker(distance, subject_factors, object_factors)
+        ranker = QuantizedRanker(distance, subject_factors, object_factors, dtype, block_size=16)
+        target_ids, reco_ids, scores = ranker.rank(np.array([3, 1]), k=10)
+        expected_scores = exact_ranker._calc_scores(np.array([3, 1]), *exact_ranker._prepare_objects(None))
+        row_ids = np.repeat([0, 1], 10)
+        if distance == Distance.COSINE:
+            expected_scores /= exact_ranker._calc_norms(subject_factors[[3, 1]])[:, np.newaxis]
+        if distance == Distance.EUCLIDEAN:
+            expected_scores = np.sqrt((subject_factors[[3, 1]] ** 2).sum(axis=1)[:, np.newaxis] - expected_scores)
+        np.testing.assert_equal(target_ids, [3] * 10 + [1] * 10)
+        np.testing.assert_almost_equal(scores, expected_scores[row_ids, reco_ids], decimal=decimal)
+
+    def test_with_subject_candidates(self, subject_factors: np.ndarray, object_factors: np.ndarray) -> None:
+        allowed = sparse.csr_matrix(np.random.default_rng(3).random((20, 50)) > 0.5)
+        ranker = QuantizedRanker(Distance.DOT, subject_factors, object_factors, "float16")
+        target_ids, reco_ids, _ = ranker.rank(
+            np.array([0, 4]), k=5, subject_candidates=CandidatesMatrix(allowed), batch_size=1
+        )
+        assert all(allowed[target_id, reco_id] for target_id, reco_id in zip(target_ids, reco_ids))
+
+    @pytest.mark.parametrize("dtype,itemsize", (("float16", 2), ("int8", 1)))
+    def test_objects_nbytes(
+        self, subject_factors: np.ndarray, object_factors: np.ndarray, dtype: str, itemsize: int
+    ) -> None:
+        ranker = QuantizedRanker(Distance.DOT, subject_factors, object_factors, dtype, block_size=16)
+        assert ranker.objects_nbytes == 50 * 8 * itemsize + 50 * 2 * 4
+
+    @pytest.mark.parametrize(
+        "kwargs,match",
+        (
+            ({"dtype": "int4"}, "Unexpected dtype"),
+            ({"block_size": 0}, "`block_size` must be positive"),
+            ({"rerank_factor": 0}, "`rerank_factor` must be positive"),
+        ),
+    )
+    def test_raises(
+        self, subject_factors: np.ndarray, object_factors: np.ndarray, kwargs: tp.Dict[str, tp.Any], match: str
+    ) -> None:
+        with pytest.raises(ValueError, match=match):
+            QuantizedRanker(Distance.DOT, subject_factors, object_factors, **kwargs)
+
+    def test_raises_on_sparse_subjects(self, object_factors: np.ndarray) -> None:
+        with pytest.raises(ValueError, match="not supported"):
+            QuantizedRanker(Distance.DOT, sparse.csr_matrix(np.ones((2, 8))), object_factors)
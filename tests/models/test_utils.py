@@ -18,7 +18,15 @@ import numpy as np
 import pytest
 from scipy import sparse
 
-from rectools.models.utils import get_viewed_item_ids, recommend_from_scores
+from rectools.models.utils import (
+    get_descending_scores_order_in_rows,
+    get_first_k_in_rows_mask,
+    get_positions_in_rows,
+    get_stored_pairs_mask,
+    get_viewed_item_ids,
+    recommend_from_scores,
+    splitmix64,
+)
 
 _ui = [
     [0, 1, 3],
@@ -42,6 +50,60 @@ def test_get_viewed_item_ids(user_items: tp.List[tp.List[int]], user_id: int, ex
     np.testing.assert_equal(expected, actual)
 
 
+@pytest.mark.parametrize(
+    "rows,cols,expected",
+    (
+        ([0, 0, 1, 3, 3, 2], [1, 0, 0, 2, 1, 1], [True, False, True, True, True, False]),
+        ([3, 1], [5, 2], [False, True]),
+        ([], [], []),
+    ),
+)
+def test_get_stored_pairs_mask(rows: tp.List[int], cols: tp.List[int], expected: tp.List[bool]) -> None:
+    matrix = sparse.csr_matrix(_ui)
+    matrix.data[0] = 0  # explicit zeros are stored as well
+    actual = get_stored_pairs_mask(matrix, np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64))
+    np.testing.assert_equal(actual, expected)
+
+
+def test_get_stored_pairs_mask_with_unsorted_indices() -> None:
+    matrix = sparse.csr_matrix((np.ones(3), np.array([2, 0, 1]), np.array([0, 2, 3])), shape=(2, 3))
+    actual = get_stored_pairs_mask(matrix, np.array([0, 0, 0, 1]), np.array([0, 1, 2, 1]))
+    np.testing.assert_equal(actual, [True, False, True, True])
+
+
+@pytest.mark.parametrize(
+    "k,expected",
+    (
+        (1, [True, False, False, False, True, False, True]),
+        (2, [True, False, True, False, True, False, True]),
+        (3, [True, False, True, False, True, False, True]),
+    ),
+)
+def test_get_first_k_in_rows_mask(k: int, expected: tp.List[bool]) -> None:
+    rows = np.array([0, 0, 0, 1, 1, 2, 4])
+    mask = np.array([True, False, True, False, True, False, True])
+    np.testing.assert_equal(get_first_k_in_rows_mask(rows, mask, k), expected)
+
+
+def test_get_positions_in_rows() -> None:
+    np.testing.assert_equal(get_positions_in_rows(np.array([0, 0, 0, 1, 1, 2, 4])), [0, 1, 2, 0, 1, 0, 0])
+    np.testing.assert_equal(get_positions_in_rows(np.array([], dtype=int)), [])
+
+
+def test_get_descending_scores_order_in_rows() -> None:
+    rows = np.array([1, 0, 0, 1, 0, 0, 2, 0])
+    scores = np.array([0.5, -1.5, 2.0, -0.5, 0.0, -1.5, 3.0, 1e-30])
+    expected = [2, 7, 4, 1, 5, 0, 3, 6]
+    np.testing.assert_equal(get_descending_scores_order_in_rows(rows, scores), expected)
+    np.testing.assert_equal(get_descending_scores_order_in_rows(rows[:0], scores[:0]), [])
+
+
+def test_splitmix64() -> None:
+    # The first outputs of reference SplitMix64 generator for seeds 0 and 1
+    actual = splitmix64(np.array([[0], [1]]))
+    np.testing.assert_equal(actual, np.array([[0xE220A8397B1DCDAF], [0x910A2DEC89025CC1]], dtype=np.uint64))
+
+
 class TestRecommendFromScores:
     @pytest.mark.parametrize(
         "blacklist,whitelist,all_expected_ids",
@@ -14,13 +14,17 @@
 
 import typing as tp
 
+import attr
 import numpy as np
 import pandas as pd
 import pytest
+from scipy import sparse
 
 from rectools import Columns
-from rectools.dataset import Dataset
+from rectools.dataset import Dataset, DenseFeatures
+from rectools.models.candidates import CandidatesMatrix
 from rectools.models.rank import Distance
+from rectools.models.rank_quantized import QuantizedRanker
 from rectools.models.vector import Factors, VectorModel
 
 T = tp.TypeVar("T")
@@ -53,11 +57,13 @@ class TestVectorModel:  # pylint: disable=protected-access, attribute-defined-ou
         item_factors: tp.Optional[Factors] = None,
         u2i_distance: Distance = Distance.DOT,
         i2i_distance: Distance = Distance.COSINE,
+        depend_on_dataset: bool = True,
     ) -> VectorModel:
         class SomeVectorModel(VectorModel):
 
             u2i_dist = u2i_distance
             i2i_dist = i2i_distance
+            factors_depend_on_dataset = depend_on_dataset
 
             def _fit(self, dataset: Dataset, *args: tp.Any, **kwargs: tp.Any) -> None:
                 pass
@@ -80,14 +86,17 @@ class TestVectorModel:  # pylint: disable=protected-access, attribute-defined-ou
         ),
     )
     @pytest.mark.parametrize("method", ("u2i", "i2i"))
+    @pytest.mark.parametrize("recommend_batch_size", (None, 1))
     def test_without_biases(
         self,
         distance: Distance,
         expected_reco: tp.List[tp.List[int]],
         expected_scores: tp.List[tp.List[float]],
         method: str,
+        recommend_batch_size: tp.Optional[int],
     ) -> None:
         model = self.make_model(self.user_factors, self.item_factors, u2i_distance=distance, i2i_distance=distance)
+        model.recommend_batch_size = recommend_batch_size
         if method == "u2i":
             _, reco, scores = model._recommend_u2i(np.array([0, 1]), self.stub_dataset, 5, False, None)
         else:  # i2i
@@ -130,3 +139,142 @@ class TestVectorModel:  # pylint: disable=protected-access, attribute-defined-ou
             else:
                 m = self.make_model(self.user_biased_factors, self.item_biased_factors, i2i_distance=7)  # type: ignore
                 m._get_i2i_vectors(self.stub_dataset)
+
+    @pytest.mark.parametrize("factors_depend_on_dataset", (True, False))
+    @pytest.mark.parametrize("method", ("u2i", "i2i"))
+    def test_rankers_caching(self, factors_depend_on_dataset: bool, method: str) -> None:
+        model = self.make_model(
+            self.user_biased_factors, self.item_biased_factors, depend_on_dataset=factors_depend_on_dataset
+        )
+        get_vectors: tp.Callable[..., tp.Tuple[np.ndarray, np.ndarray]]
+        if method == "u2i":
+            get_vectors = model._get_u2i_vectors
+        else:
+            get_vectors = model._get_i2i_vectors
+        n_calls = 0
+
+        def counting_get_vectors(*args: tp.Any) -> tp.Tuple[np.ndarray, np.ndarray]:
+            nonlocal n_calls
+            n_calls += 1
+            return get_vectors(*args)
+
+        setattr(model, f"_get_{method}_vectors", counting_get_vectors)
+
+        def recommend() -> tp.Tuple[tp.Any, ...]:
+            if method == "u2i":
+                return model._recommend_u2i(np.array([0, 1]), self.stub_dataset, 5, False, None)
+            return model._recommend_i2i(np.array([0, 1]), self.stub_dataset, 5, None)
+
+        expected = recommend()
+        actual = recommend()
+        for actual_part, expected_part in zip(actual, expected):
+            np.testing.assert_equal(actual_part, expected_part)
+        assert n_calls == (2 if factors_depend_on_dataset else 1)
+
+        model.fit(self.stub_dataset)
+        recommend()
+        assert n_calls == (3 if factors_depend_on_dataset else 2)
+
+    def test_cached_rankers_are_not_serialized(self) -> None:
+        model = self.make_model(self.user_factors, self.item_factors, depend_on_dataset=False)
+        model._recommend_u2i(np.array([0, 1]), self.stub_dataset, 5, False, None)
+        assert model._rankers
+        assert model.__getstate__()["_rankers"] == {}
+
+    @pytest.mark.parametrize("distance", (Distance.DOT, Distance.COSINE, Distance.EUCLIDEAN))
+    def test_lazy_users_factors_with_candidates(self, distance: Distance) -> None:
+        candidates = CandidatesMatrix(sparse.csr_matrix([[1, 0, 1], [0, 1, 1]]))
+        user_ids = np.array([1, 0, 1])
+        expected = self.make_model(
+            self.user_biased_factors, self.item_biased_factors, u2i_distance=distance, depend_on_dataset=False
+        )._recommend_u2i(user_ids, self.stub_dataset, 5, False, None, user_candidates=candidates)
+        model = self.make_model(
+            self.user_biased_factors, self.item_biased_factors, u2i_distance=distance, depend_on_dataset=True
+        )
+        actual = model._recommend_u2i(user_ids, self.stub_dataset, 5, False, None, user_candidates=candidates)
+        np.testing.assert_equal(actual[0], expected[0])
+        np.testing.assert_equal(actual[1], expected[1])
+        np.testing.assert_almost_equal(actual[2], expected[2], decimal=5)
+
+    def test_items_factors_caching(self) -> None:
+        model = self.make_model(self.user_factors, self.item_factors, depend_on_dataset=True)
+        get_items_factors = model._get_items_factors
+        n_calls = 0
+
+        def counting_get_items_factors(dataset: Dataset) -> Factors:
+            nonlocal n_calls
+            n_calls += 1
+            return get_items_factors(dataset)
+
+        model._get_items_factors = counting_get_items_factors  # type: ignore
+        model._recommend_u2i(np.array([0]), self.stub_dataset, 5, False, None)
+        model._recommend_i2i(np.array([0]), self.stub_dataset, 5, None)
+        assert n_calls == 1
+
+        item_features = DenseFeatures.from_iterables([[1], [2]], ["f"])
+        model._recommend_i2i(np.array([0]), attr.evolve(self.stub_dataset, item_features=item_features), 5, None)
+        assert n_calls == 2
+
+        model.fit(self.stub_dataset)
+        model._recommend_i2i(np.array([0]), self.stub_dataset, 5, None)
+        assert n_calls == 3
+
+    @pytest.mark.parametrize("depend_on_dataset", (True, False))
+    @pytest.mark.parametrize("method", ("u2i", "i2i"))
+    def test_quantized_recommendations(self, depend_on_dataset: bool, method: str) -> None:
+        def recommend(model: VectorModel) -> tp.Tuple[tp.Any, ...]:
+            if method == "u2i":
+                return model._recommend_u2i(np.array([0, 1]), self.stub_dataset, 5, False, None)
+            return model._recommend_i2i(np.array([0, 1]), self.stub_dataset, 5, None)
+
+        expected = recommend(
+            self.make_model(self.user_biased_factors, self.item_biased_factors, depend_on_dataset=depend_on_dataset)
+        )
+        model = self.make_model(self.user_biased_factors, self.item_biased_factors, depend_on_dataset=depend_on_dataset)
+        model.recommend_quantization = "int8"
+        model.recommend_rerank_factor = 2
+        actual = recommend(model)
+        np.testing.assert_equal(actual[0], expected[0])
+        np.testing.assert_equal(actual[1], expected[1])
+        np.testing.assert_almost_equal(actual[2], expected[2], decimal=5)
+        assert all(isinstance(ranker, QuantizedRanker) for _, ranker in model._rankers.values())
+
+        model.recommend_quantization = None
+        recommend(model)
+        assert len(model._rankers) == 2
+
+    def test_prepared_items_are_reused_for_other_users(self) -> None:
+        model = self.make_model(self.user_biased_factors, self.item_biased_factors, depend_on_dataset=True)
+        model._recommend_u2i(np.array([0]), self.stub_dataset, 5, False, None)
+        ((_, ranker),) = model._rankers.values()
+        prepared_objects = ranker._objects_cache["prepared_objects"]
+
+        actual = model._recommend_u2i(np.array([1, 0]), self.stub_dataset, 5, False, None)
+        expected = self.make_model(
+            self.user_biased_factors, self.item_biased_factors, depend_on_dataset=False
+        )._recommend_u2i(np.array([1, 0]), self.stub_dataset, 5, False, None)
+        ((_, new_ranker),) = model._rankers.values()
+        assert new_ranker is ranker
+        assert ranker._objects_cache["prepared_objects"] is prepared_objects
+        np.testing.assert_equal(actual[0], expected[0])
+        np.testing.assert_equal(actual[1], expected[1])
+        np.testing.assert_almost_equal(actual[2], expected[2], decimal=5)
+
+    @pytest.mark.parametrize(
+        "kwargs,match",
+        (
+            ({"recommend_backend": "faiss"}, "Unexpected recommend backend"),
+            ({"recommend_quantization": "int4"}, "Unexpected recommend quantization"),
+            ({"recommend_backend": "hnsw", "recommend_quantization": "int8"}, "not supported with `hnsw`"),
+            ({"recommend_backend": "hnsw", "recommend_rerank_factor": 2}, "not supported with `hnsw`"),
+        ),
+    )
+    def test_raises_on_incorrect_recommend_settings(self, kwargs: tp.Dict[str, tp.Any], match: str) -> None:
+        with pytest.raises(ValueError, match=match):
+            VectorModel(**kwargs)
+
+    def test_raises_on_unexpected_backend(self) -> None:
+        model = self.make_model(self.user_factors, self.item_factors)
+        model.recommend_backend = "faiss"
+        with pytest.raises(ValueError, match="Unexpected recommend backend"):
+            model._recommend_u2i(np.array([0]), self.stub_dataset, 5, False, None)
@@ -1,10 +1,16 @@
 import typing as tp
 from copy import deepcopy
 
+import attr
+import numpy as np
 import pandas as pd
+from scipy import sparse
 
-from rectools.dataset import Dataset
+from rectools import Columns
+from rectools.dataset import Dataset, DenseFeatures
+from rectools.models import CandidatesMatrix
 from rectools.models.base import ModelBase
+from rectools.types import ExternalIds
 
 
 def assert_second_fit_refits_model(model: ModelBase, dataset: Dataset) -> None:
@@ -20,3 +26,76 @@ def assert_second_fit_refits_model(model: ModelBase, dataset: Dataset) -> None:
     reco_i2i_1 = model_1.recommend_to_items(dataset.item_id_map.external_ids, dataset, k, False)
     reco_i2i_2 = model_2.recommend_to_items(dataset.item_id_map.external_ids, dataset, k, False)
     pd.testing.assert_frame_equal(reco_i2i_1, reco_i2i_2, **tol_kwargs)  # pylint: disable = unexpected-keyword-arg
+
+
+def assert_items_to_exclude_work_as_whitelist(
+    model: ModelBase, dataset: Dataset, items_to_exclude: ExternalIds
+) -> None:
+    items_to_recommend = np.setdiff1d(dataset.item_id_map.external_ids, np.asarray(items_to_exclude))
+    users = dataset.user_id_map.external_ids[: dataset.n_hot_users]
+    items = dataset.item_id_map.external_ids[: dataset.n_hot_items]
+    k = items.size
+    tol_kwargs: tp.Dict[str, float] = {"check_less_precise": 3} if pd.__version__ < "1" else {"atol": 0.001}
+
+    for filter_viewed in (True, False):
+        expected = model.recommend(users, dataset, k, filter_viewed, items_to_recommend=items_to_recommend)
+        actual = model.recommend(users, dataset, k, filter_viewed, items_to_exclude=items_to_exclude)
+        pd.testing.assert_frame_equal(actual, expected, **tol_kwargs)  # pylint: disable = unexpected-keyword-arg
+
+    expected = model.recommend_to_items(items, dataset, k, items_to_recommend=items_to_recommend)
+    actual = model.recommend_to_items(items, dataset, k, items_to_exclude=items_to_exclude)
+    pd.testing.assert_frame_equal(actual, expected, **tol_kwargs)  # pylint: disable = unexpected-keyword-arg
+
+    # Warm item (e.g. out of stock one) can be excluded as well, it's not recommended for hot targets anyway
+    warm_item = "warm_item" if isinstance(items[0], str) else int(np.max(dataset.item_id_map.external_ids)) + 1000
+    dataset_with_warm_item = add_warm_item(dataset, warm_item)
+    items_to_exclude_with_warm_item = list(items_to_exclude) + [warm_item]
+    for filter_viewed in (True, False):
+        actual = model.recommend(
+            users, dataset_with_warm_item, k, filter_viewed, items_to_exclude=items_to_exclude_with_warm_item
+        )
+        expected = model.recommend(users, dataset, k, filter_viewed, items_to_recommend=items_to_recommend)
+        pd.testing.assert_frame_equal(actual, expected, **tol_kwargs)  # pylint: disable = unexpected-keyword-arg
+
+    actual = model.recommend_to_items(
+        items, dataset_with_warm_item, k, items_to_exclude=items_to_exclude_with_warm_item
+    )
+    expected = model.recommend_to_items(items, dataset, k, items_to_recommend=items_to_recommend)
+    pd.testing.assert_frame_equal(actual, expected, **tol_kwargs)  # pylint: disable = unexpected-keyword-arg
+
+
+def add_warm_item(dataset: Dataset, item: tp.Any) -> Dataset:
+    """Add item without interactions and with zero features (if dataset has item features) to dataset."""
+    item_features = dataset.item_features
+    if isinstance(item_features, DenseFeatures):
+        zeros = np.zeros((1, item_features.values.shape[1]), dtype=item_features.values.dtype)
+        item_features = attr.evolve(item_features, values=np.vstack((item_features.values, zeros)))
+    elif item_features is not None:
+        zeros = sparse.csr_matrix((1, item_features.values.shape[1]), dtype=item_features.values.dtype)
+        item_features = attr.evolve(item_features, values=sparse.vstack((item_features.values, zeros), format="csr"))
+    return attr.evolve(dataset, item_id_map=dataset.item_id_map.add_ids([item]), item_features=item_features)
+
+
+def assert_candidates_work_as_per_user_whitelist(model: ModelBase, dataset: Dataset) -> None:
+    users = dataset.user_id_map.external_ids[: dataset.n_hot_users]
+    items = dataset.item_id_map.external_ids[: dataset.n_hot_items]
+    k = items.size
+    candidates_df = pd.DataFrame(
+        {
+            Columns.User: np.repeat(users, 2),
+            Columns.Item: np.tile(items[[0, -1]], users.size),
+        }
+    ).iloc[1:]
+    candidates = CandidatesMatrix.from_dataframe(candidates_df, dataset)
+    tol_kwargs: tp.Dict[str, float] = {"check_less_precise": 3} if pd.__version__ < "1" else {"atol": 0.001}
+
+    for filter_viewed in (True, False):
+        actual = model.recommend(users, dataset, k, filter_viewed, candidates=candidates)
+        expected = pd.concat(
+            [
+                model.recommend([user], dataset, k, filter_viewed, items_to_recommend=user_items[Columns.Item])
+                for user, user_items in candidates_df.groupby(Columns.User, sort=False)
+            ]
+        )
+        expected = expected.astype({Columns.User: actual[Columns.User].dtype}).reset_index(drop=True)
+        pd.testing.assert_frame_equal(actual, expected, **tol_kwargs)  # pylint: disable = unexpected-keyword-arg
@@ -18,7 +18,8 @@ import numpy as np
 import pandas as pd
 from scipy import sparse
 
-from rectools.dataset import DenseFeatures, Features, IdMap, Interactions, SparseFeatures
+from rectools.dataset import DenseFeatures, Features, Interactions, SparseFeatures
+from rectools.dataset.storage import AnyIdMap
 
 
 def assert_sparse_matrix_equal(actual: sparse.spmatrix, expected: sparse.spmatrix) -> None:
@@ -26,7 +27,7 @@ def assert_sparse_matrix_equal(actual: sparse.spmatrix, expected: sparse.spmatri
     np.testing.assert_equal(actual.toarray(), expected.toarray())
 
 
-def assert_id_map_equal(actual: IdMap, expected: IdMap) -> None:
+def assert_id_map_equal(actual: AnyIdMap, expected: AnyIdMap) -> None:
     assert isinstance(actual, type(expected))
     pd.testing.assert_series_equal(actual.to_internal, expected.to_internal)
 